@@ -6,18 +6,24 @@ This module handles:
 - Password hashing and verification
 - JWT access token creation and validation
 - Role-based access control (admin vs user)
+- Caching of authenticated user records
 """
 
+import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 
-from app.database import get_db
+from app.cache import MISSING, TTLCache
+from app.database import get_async_db
 from app.models import User
+from app.passwords import hash_password_async, verify_password_async
 from app.schemas import LoginRequest, RegisterRequest, TokenResponse
 
 # -------------------------------------------------------------------
@@ -28,7 +34,6 @@ router = APIRouter(prefix="/api/auth", tags=["Auth"])
 # -------------------------------------------------------------------
 # Security configuration
 # -------------------------------------------------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 # NOTE:
@@ -38,29 +43,95 @@ SECRET_KEY = "CHANGE_ME_TO_A_LONG_RANDOM_SECRET"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 1
 
+# -------------------------------------------------------------------
+# Authentication mode
+# -------------------------------------------------------------------
+# "database": look the user up by email on every request.
+# "claims":   trust the verified `uid` / `ver` token claims and resolve
+#             the user through an in-process cache, hitting the
+#             database only on a cache miss.
+AUTH_MODE = os.getenv("SWEETSHOP_AUTH_MODE", "database")
+USER_CACHE_SIZE = int(os.getenv("SWEETSHOP_USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("SWEETSHOP_USER_CACHE_TTL", "300"))
+
 
 # -------------------------------------------------------------------
-# Password utilities
+# User cache
 # -------------------------------------------------------------------
-def hash_password(password: str) -> str:
-    """Hash a plaintext password."""
-    return pwd_context.hash(password)
+@dataclass(frozen=True)
+class CachedUser:
+    """
+    Immutable snapshot of a user record, safe to share across requests.
+    """
+    id: int
+    email: str
+    is_admin: bool
+    token_version: int
+
+    @classmethod
+    def from_model(cls, user: User) -> "CachedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_admin=user.is_admin,
+            token_version=user.token_version,
+        )
+
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user's cached record so the next request reloads it."""
+    user_cache.invalidate(user_id)
 
 
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify a plaintext password against its hash."""
-    return pwd_context.verify(password, hashed_password)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _record_changed_user(mapper, connection, target: User) -> None:
+    """Note a user changed through the ORM, to invalidate on commit."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    """
+    Keep the user cache honest once user changes are committed.
+
+    Invalidating at flush time instead would let a request reload and
+    cache the old row before the commit.
+    """
+    for user_id in session.info.pop("changed_users", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    """Drop the user changes of a rolled back transaction."""
+    session.info.pop("changed_users", None)
+
+
+async def revoke_user_tokens(db: AsyncSession, user: User) -> None:
+    """
+    Invalidate every token previously issued to `user`.
+    """
+    user.token_version += 1
+    await db.commit()
+    invalidate_user(user.id)
 
 
 # -------------------------------------------------------------------
 # JWT utilities
 # -------------------------------------------------------------------
-def create_access_token(email: str, is_admin: bool) -> str:
+def create_access_token(user: User | CachedUser) -> str:
     """
     Create a JWT access token.
 
     The token contains:
     - subject (user email)
+    - user ID and token version
     - admin flag
     - expiration time
     """
@@ -68,20 +139,43 @@ def create_access_token(email: str, is_admin: bool) -> str:
         hours=ACCESS_TOKEN_EXPIRE_HOURS
     )
     payload = {
-        "sub": email,
-        "is_admin": is_admin,
+        "sub": user.email,
+        "uid": user.id,
+        "ver": user.token_version,
+        "is_admin": user.is_admin,
         "exp": expire,
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT access token and return its claims.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+        )
+
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+        )
+
+    return payload
+
+
 # -------------------------------------------------------------------
 # Auth endpoints
 # -------------------------------------------------------------------
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     payload: RegisterRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Register a new user.
@@ -89,23 +183,26 @@ def register(
     The first user in an empty database automatically becomes an admin.
     Subsequent users are created as normal users.
     """
-    if db.query(User).filter(User.email == payload.email).first():
+    if await db.scalar(select(User.id).where(User.email == payload.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User already exists",
         )
 
-    is_first_user = db.query(User).count() == 0
+    # Hand the connection back to the pool while bcrypt runs.
+    await db.rollback()
+    hashed_password = await hash_password_async(payload.password)
+
+    is_first_user = await db.scalar(select(func.count(User.id))) == 0
 
     user = User(
         email=payload.email,
-        password=hash_password(payload.password),
+        password=hashed_password,
         is_admin=is_first_user,
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
     return {
         "id": user.id,
@@ -115,22 +212,33 @@ def register(
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     payload: LoginRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Authenticate a user and return a JWT access token.
     """
-    user = db.query(User).filter(User.email == payload.email).first()
+    user = await db.scalar(select(User).where(User.email == payload.email))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password",
+        )
+
+    # Snapshot the user and hand the connection back to the pool while
+    # bcrypt runs.
+    hashed_password = user.password
+    user = CachedUser.from_model(user)
+    await db.rollback()
 
-    if not user or not verify_password(payload.password, user.password):
+    if not await verify_password_async(payload.password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
 
-    token = create_access_token(user.email, user.is_admin)
+    token = create_access_token(user)
 
     return {
         "access_token": token,
@@ -143,42 +251,81 @@ def login(
 # -------------------------------------------------------------------
 # Authorization dependencies
 # -------------------------------------------------------------------
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_async_db),
+) -> User | CachedUser:
     """
     Retrieve the currently authenticated user from the JWT token.
     """
-    token = credentials.credentials
+    return await authenticate(credentials.credentials, db)
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
-    except JWTError:
+
+async def get_current_user_from_query(
+    access_token: str = Query(description="JWT access token"),
+    db: AsyncSession = Depends(get_async_db),
+) -> User | CachedUser:
+    """
+    Retrieve the current user from an `access_token` query parameter.
+
+    Only for endpoints consumed by browser APIs that cannot send an
+    Authorization header, such as EventSource.
+    """
+    return await authenticate(access_token, db)
+
+
+async def authenticate(token: str, db: AsyncSession) -> User | CachedUser:
+    """
+    Resolve the user an access token belongs to.
+
+    In "claims" mode the user is resolved from the cache by the `uid`
+    claim; otherwise it is loaded from the database by email.
+    """
+    payload = decode_access_token(token)
+
+    if AUTH_MODE == "claims" and "uid" in payload:
+        user = await get_cached_user(db, payload["uid"])
+    else:
+        user = await db.scalar(select(User).where(User.email == payload["sub"]))
+
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
+            detail="User not found",
         )
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
+    if payload.get("ver", 0) != user.token_version:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Token has been revoked",
         )
 
     return user
 
 
-def get_current_admin(
-    user: User = Depends(get_current_user),
-) -> User:
+async def get_cached_user(db: AsyncSession, user_id: int) -> CachedUser | None:
+    """
+    Resolve a user by ID through the user cache.
+    """
+    cached = user_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+
+    # An invalidation landing while the row loads may be for a change
+    # the load did not see; then the loaded user is not cached.
+    generation = user_cache.generation()
+    user = await db.get(User, user_id)
+    if not user:
+        return None
+
+    cached = CachedUser.from_model(user)
+    user_cache.set(user_id, cached, generation)
+    return cached
+
+
+async def get_current_admin(
+    user: User | CachedUser = Depends(get_current_user),
+) -> User | CachedUser:
     """
     Ensure the current user has admin privileges.
     """
@@ -188,3 +335,18 @@ def get_current_admin(
             detail="Admin access required",
         )
     return user
+
+
+# -------------------------------------------------------------------
+# Token revocation
+# -------------------------------------------------------------------
+@router.post("/revoke")
+async def revoke_tokens(
+    user: User | CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Invalidate every token issued to the current user (log out everywhere).
+    """
+    await revoke_user_tokens(db, await db.get(User, user.id))
+    return {"detail": "Tokens revoked"}
@@ -0,0 +1,288 @@
+"""
+Bulk catalog import and export for the Sweet Shop API.
+
+This module contains admin-only endpoints to:
+- import sweets from a CSV or NDJSON upload
+- export the whole catalog as CSV or NDJSON
+
+Both directions stream, so neither ever holds the full catalog in
+memory: uploads are read twice in a worker thread, once to validate
+every row and once to insert them in batches, and exports are written
+from a server-side cursor.
+"""
+
+import asyncio
+import csv
+import io
+import json
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_admin
+from app.catalog_cache import catalog_cache
+from app.categories import category_cache, category_key
+from app.columnar import catalog_engine
+from app.database import AsyncSessionLocal, get_async_db
+from app.models import Sweet
+from app.schemas import SweetCreate
+
+router = APIRouter(prefix="/api/sweets", tags=["Sweets"])
+
+# -------------------------------------------------------------------
+# Bulk configuration
+# -------------------------------------------------------------------
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+# Import is all-or-nothing; stop after reporting this many bad rows.
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_COLUMNS = ("name", "category", "price", "quantity")
+EXPORT_COLUMNS = ("id", "name", "category", "price", "quantity")
+
+FORMAT_PATTERN = "^(csv|ndjson)$"
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+# -------------------------------------------------------------------
+# Helper utilities
+# -------------------------------------------------------------------
+def detect_format(upload: UploadFile, requested: str | None) -> str:
+    """
+    Work out whether an upload is CSV or NDJSON.
+
+    An explicit `format` wins; otherwise the file extension decides.
+    """
+    if requested:
+        return requested
+
+    filename = (upload.filename or "").lower()
+    if filename.endswith(".csv"):
+        return "csv"
+    if filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Cannot tell the upload format; pass format=csv or format=ndjson",
+    )
+
+
+def iter_upload_rows(text: io.TextIOBase, fmt: str) -> Iterator[tuple[int, object]]:
+    """
+    Yield `(line number, raw row)` pairs from an upload.
+
+    Rows that cannot even be parsed are yielded as exceptions so they
+    are reported alongside validation errors.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, exc
+
+
+def validate_row(raw: object) -> dict:
+    """
+    Validate one raw row against `SweetCreate`.
+
+    Raises ValueError with a readable message for invalid rows.
+    """
+    if isinstance(raw, Exception):
+        raise ValueError(f"Invalid JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+
+    try:
+        sweet = SweetCreate.model_validate(
+            {column: raw.get(column) for column in IMPORT_COLUMNS}
+        )
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        raise ValueError(f"{field}: {error['msg']}")
+
+    return sweet.model_dump()
+
+
+def check_upload(file: BinaryIO, fmt: str) -> tuple[list[dict], dict[str, str]]:
+    """
+    Validate every row of an upload; blocking, so run it in a thread.
+
+    Returns the errors (up to `MAX_REPORTED_ERRORS`) and, by category
+    key, the first spelling of each category used.
+    """
+    errors = []
+    categories = {}
+
+    file.seek(0)
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        for line_number, raw in iter_upload_rows(text, fmt):
+            try:
+                row = validate_row(raw)
+            except ValueError as exc:
+                errors.append({"line": line_number, "error": str(exc)})
+                if len(errors) >= MAX_REPORTED_ERRORS:
+                    break
+                continue
+            categories.setdefault(category_key(row["category"]), row["category"])
+    except UnicodeDecodeError:
+        errors.append({"line": None, "error": "File is not valid UTF-8"})
+    finally:
+        text.detach()
+
+    return errors, categories
+
+
+def upload_batches(file: BinaryIO, fmt: str) -> Iterator[list[dict]]:
+    """
+    Yield the rows of an upload that passed `check_upload`, validated,
+    `IMPORT_BATCH_SIZE` at a time.
+    """
+    file.seek(0)
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        batch = []
+        for _, raw in iter_upload_rows(text, fmt):
+            batch.append(validate_row(raw))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        text.detach()
+
+
+def encode_rows(rows, fmt: str) -> str:
+    """
+    Encode a batch of export rows as CSV or NDJSON text.
+    """
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows
+        )
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+# -------------------------------------------------------------------
+# Import (Admin only)
+# -------------------------------------------------------------------
+@router.post("/import")
+async def import_sweets(
+    file: UploadFile,
+    format: str | None = Query(None, pattern=FORMAT_PATTERN),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Import sweets from a CSV or NDJSON file (admin only).
+
+    CSV files need a `name,category,price,quantity` header; NDJSON
+    files hold one JSON object per line. Every row is validated like
+    `POST /api/sweets`, and categories are interned the same way. The
+    import is all-or-nothing: if any row is invalid nothing is inserted
+    and the bad rows are reported.
+
+    The upload is parsed in a worker thread, and fully validated before
+    the write transaction starts, so the transaction lasts only as long
+    as the inserts.
+    """
+    fmt = detect_format(file, format)
+
+    errors, spellings = await asyncio.to_thread(check_upload, file.file, fmt)
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={"message": "Import rejected", "errors": errors},
+        )
+
+    # Category key -> (ID, name), so each category is interned once.
+    categories = {}
+    for key, spelling in spellings.items():
+        categories[key] = await db.run_sync(category_cache.intern, spelling)
+
+    imported = 0
+    batches = upload_batches(file.file, fmt)
+    try:
+        while batch := await asyncio.to_thread(next, batches, None):
+            for row in batch:
+                row["category_id"], row["category"] = categories[
+                    category_key(row["category"])
+                ]
+            await db.execute(insert(Sweet), batch)
+            imported += len(batch)
+    finally:
+        batches.close()
+
+    with catalog_engine.change() as change:
+        await db.run_sync(change.stamp)
+        await db.commit()
+        change.reset()
+    catalog_cache.invalidate()
+
+    return {"imported": imported}
+
+
+# -------------------------------------------------------------------
+# Export (Admin only)
+# -------------------------------------------------------------------
+async def stream_export(fmt: str):
+    """
+    Yield the catalog in `fmt`, one batch of rows at a time.
+
+    Uses its own session because the response body is produced after
+    the request's dependencies have been cleaned up.
+    """
+    if fmt == "csv":
+        yield encode_rows([EXPORT_COLUMNS], "csv")
+
+    columns = [getattr(Sweet, column) for column in EXPORT_COLUMNS]
+    query = (
+        select(*columns)
+        .order_by(Sweet.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield encode_rows(rows, fmt)
+
+
+@router.get("/export")
+async def export_sweets(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    admin=Depends(get_current_admin),
+):
+    """
+    Download the whole catalog as CSV or NDJSON (admin only).
+    """
+    return StreamingResponse(
+        stream_export(format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="sweets.{format}"'
+        },
+    )
@@ -0,0 +1,98 @@
+"""
+In-process caching utilities for the Sweet Shop API.
+
+This module provides a small, thread-safe cache with:
+- a maximum number of entries (least recently used entries are evicted)
+- an optional time-to-live per entry
+
+It is intentionally dependency free so it can back any per-process
+cache in the application.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Sentinel used to tell a cached `None` apart from a cache miss.
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    A `ttl` of None keeps entries until they are evicted or invalidated.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; see `generation`.
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Return the cached value for `key`, or `default` on a miss.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def generation(self) -> int:
+        """
+        Return a counter that every `invalidate` and `clear` bumps.
+
+        Read it before loading a value and pass it to `set`, so a value
+        loaded before a concurrent invalidation is not stored.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        """
+        Store `value` under `key`, evicting the oldest entry if full.
+
+        With `generation`, nothing is stored if the cache has been
+        invalidated since that generation was read.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop a single entry if it is cached.
+        """
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drop every cached entry.
+        """
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,193 @@
+"""
+Read-through cache for catalog queries.
+
+Listing and search results are cached under keys that embed a catalog
+version number. Every mutating sweet endpoint bumps the version, which
+makes all previously cached results unreachable at once; stale entries
+are then evicted by the backend's LRU policy.
+
+The storage is pluggable through `CacheBackend`:
+- `LocalCacheBackend` keeps entries in process (the default)
+- `RedisCacheBackend` shares entries and the version between workers
+  using any Redis-compatible server
+
+Callers must build the key (and so read the version) *before* running
+the query they cache. A result computed from pre-write data is then
+stored under the old version and never served again.
+"""
+
+import json
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Hashable
+
+from app.cache import MISSING, TTLCache
+
+# -------------------------------------------------------------------
+# Cache configuration
+# -------------------------------------------------------------------
+CATALOG_CACHE_URL = os.getenv("SWEETSHOP_CATALOG_CACHE_URL", "local")
+CATALOG_CACHE_SIZE = int(os.getenv("SWEETSHOP_CATALOG_CACHE_SIZE", "1024"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("SWEETSHOP_CATALOG_CACHE_TTL", "300"))
+
+VERSION_KEY = "catalog:version"
+EPOCH_KEY = "catalog:epoch"
+
+
+# -------------------------------------------------------------------
+# Backends
+# -------------------------------------------------------------------
+class CacheBackend(ABC):
+    """
+    Minimal storage interface needed by the catalog cache.
+
+    Values are plain JSON-compatible data. Counters must never be
+    evicted, while regular entries may be.
+
+    `epoch` identifies the lifetime of the counters: it changes
+    whenever they may have been reset, so a version number is only
+    meaningful together with its epoch.
+    """
+
+    epoch: str
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the value stored under `key`, or MISSING."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`."""
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        """Return the counter stored under `key` (0 if unset)."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter and return its new value."""
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-process backend with size-bounded LRU eviction.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        # Counters live and die with the process.
+        self.epoch = uuid.uuid4().hex[:12]
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries.set(key, value)
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend for Redis-compatible servers, shared by all workers.
+
+    Eviction is left to the server; configure it with
+    `maxmemory-policy allkeys-lru` (or volatile-lru, as entries carry a
+    TTL) to bound memory use.
+    """
+
+    def __init__(self, client, ttl: float | None = None):
+        self.client = client
+        self.ttl = int(ttl) if ttl else None
+
+        # Shared by all workers; recreated if the server loses its data.
+        client.set(EPOCH_KEY, uuid.uuid4().hex[:12], nx=True)
+        self.epoch = client.get(EPOCH_KEY).decode()
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float | None = None) -> "RedisCacheBackend":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "The 'redis' package is required for a Redis catalog cache"
+            )
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(key, json.dumps(value), ex=self.ttl)
+
+    def get_counter(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+
+def create_backend(url: str) -> CacheBackend:
+    """
+    Create the backend described by `SWEETSHOP_CATALOG_CACHE_URL`.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend.from_url(url, CATALOG_CACHE_TTL_SECONDS)
+    return LocalCacheBackend(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL_SECONDS)
+
+
+# -------------------------------------------------------------------
+# Catalog cache
+# -------------------------------------------------------------------
+class CatalogCache:
+    """
+    Versioned cache of catalog query results.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def version(self) -> int:
+        """Return the current catalog version."""
+        return self.backend.get_counter(VERSION_KEY)
+
+    def key(self, kind: str, *params: Hashable) -> str:
+        """
+        Build a cache key for a query bound to the current version.
+        """
+        return f"catalog:{self.version()}:{kind}:{json.dumps(params)}"
+
+    def get(self, key: str) -> Any:
+        """Return a cached result, or MISSING."""
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache a query result."""
+        self.backend.set(key, value)
+
+    def etag(self) -> str:
+        """
+        Return a strong ETag for catalog responses at the current version.
+        """
+        return f'"{self.backend.epoch}-{self.version()}"'
+
+    def invalidate(self) -> int:
+        """
+        Bump the catalog version, dropping every cached result.
+        """
+        return self.backend.incr(VERSION_KEY)
+
+
+catalog_cache = CatalogCache(create_backend(CATALOG_CACHE_URL))
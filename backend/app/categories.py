@@ -0,0 +1,378 @@
+"""
+Interned sweet categories.
+
+Each category is stored once in `categories` and sweets refer to it by
+`category_id`. Names are normalized on the way in: a category given as
+"indian " when "Indian" exists is "Indian", so spellings cannot drift
+apart.
+
+Normalization is limited to what SQLite's built-in `trim` and `lower`
+do (ASCII whitespace and ASCII case), so the triggers below build the
+same keys as Python without any app-registered SQL function, and any
+SQLite client can write to `sweets`. "Éclair" and "ÉCLAIR" are two
+categories; the default (prefix) category filter still matches both.
+
+`category_cache` keeps the ID <-> name mapping in process. Categories
+are never renamed or deleted, so cached entries never go stale.
+Category filters are resolved against it to a list of IDs, which the
+search then matches through the `(category_id, price)` index.
+
+On SQLite, triggers on `sweets`:
+- assign a category to rows written without one (e.g. seeded rows)
+- keep `categories.sweet_count` current, for `GET /api/categories`
+
+Rows created before the categories table existed are assigned their
+category at startup by `migrate_categories`.
+"""
+
+import re
+import string
+import threading
+import unicodedata
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import search
+from app.auth import get_current_user
+from app.cache import MISSING
+from app.catalog_cache import catalog_cache
+from app.database import get_async_db
+from app.models import Category, Sweet
+from app.schemas import CategoryCount
+
+# -------------------------------------------------------------------
+# Name normalization and matching
+# -------------------------------------------------------------------
+# The whitespace `category_name` strips, and `CATEGORY_NAME_SQL` with it.
+CATEGORY_SPACES = " \t\n\r\f\v"
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def category_name(name: str) -> str:
+    """Return a category name as stored: without surrounding spaces."""
+    return name.strip(CATEGORY_SPACES)
+
+
+def category_key(name: str) -> str:
+    """Return the lookup key of a category name: its ASCII lowercase."""
+    return category_name(name).translate(ASCII_LOWER)
+
+
+def fold(text: str) -> str:
+    """Lowercase `text` and strip diacritics, like the FTS tokenizer."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def category_matcher(text: str, exact: bool = False):
+    """
+    Return a predicate telling which category names `text` matches.
+
+    By default it matches like `apply_text_search` matches names: every
+    word of `text` must prefix a word of the category ("choc" matches
+    "Dark Chocolate") when full-text search is enabled, and `text` must
+    be a substring of it otherwise. With `exact` the names must have
+    the same `category_key`.
+    """
+    if exact:
+        key = category_key(text)
+        return lambda category: category_key(category) == key
+
+    if not search.fts_enabled:
+        needle = text.lower()
+        return lambda category: needle in category.lower()
+
+    terms = re.findall(r"\w+", fold(text))
+
+    def matches(category: str) -> bool:
+        words = re.findall(r"\w+", fold(category))
+        return bool(terms) and all(
+            any(word.startswith(term) for word in words) for term in terms
+        )
+
+    return matches
+
+
+def dialect_insert(conn):
+    """Return the INSERT construct of `conn`'s dialect."""
+    dialect = getattr(conn, "dialect", None) or conn.get_bind().dialect
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+# -------------------------------------------------------------------
+# Intern cache
+# -------------------------------------------------------------------
+class CategoryCache:
+    """
+    In-process mapping between category IDs and names.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: dict[int, str] = {}
+        self._ids: dict[str, int] = {}
+
+    def load(self, conn) -> None:
+        """
+        Read the categories if any were created since the last load.
+
+        Categories are never deleted, so the cache is complete while it
+        holds as many as the table; otherwise every row is read again,
+        as IDs can commit out of order.
+
+        `conn` is a Connection or Session; from an AsyncSession use
+        `db.run_sync(category_cache.load)`. It must not have created
+        categories itself, or uncommitted ones could be cached.
+        """
+        count = conn.execute(select(func.count()).select_from(Category)).scalar_one()
+        with self._lock:
+            if count == len(self._names):
+                return
+
+        rows = conn.execute(select(Category.id, Category.name, Category.key)).all()
+        with self._lock:
+            for row in rows:
+                self._names[row.id] = row.name
+                self._ids[row.key] = row.id
+
+    def name(self, category_id: int) -> str | None:
+        """Return the name of a loaded category."""
+        return self._names.get(category_id)
+
+    def match(self, text: str, exact: bool = False) -> list[int]:
+        """
+        Return the IDs of the loaded categories `text` matches.
+
+        See `category_matcher`.
+        """
+        matches = category_matcher(text, exact)
+        with self._lock:
+            names = list(self._names.items())
+        return [category_id for category_id, name in names if matches(name)]
+
+    def intern(self, conn, name: str) -> tuple[int, str]:
+        """
+        Return the ID and normalized name of category `name`,
+        creating it in `conn`'s transaction if it is new.
+
+        `conn` is a Connection or Session; from an AsyncSession use
+        `db.run_sync(category_cache.intern, name)`. Categories created
+        here are only cached once committed, by a later `load`.
+        """
+        key = category_key(name)
+        with self._lock:
+            category_id = self._ids.get(key)
+            if category_id is not None:
+                return category_id, self._names[category_id]
+
+        insert = dialect_insert(conn)
+        conn.execute(
+            insert(Category)
+            .values(name=category_name(name), key=key, sweet_count=0)
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+        row = conn.execute(
+            select(Category.id, Category.name).where(Category.key == key)
+        ).one()
+        return row.id, row.name
+
+
+category_cache = CategoryCache()
+
+
+# -------------------------------------------------------------------
+# Triggers and migration
+# -------------------------------------------------------------------
+# `category_name` and `category_key` in SQL. `char(9, 10, 13, 12, 11)`
+# is the rest of `CATEGORY_SPACES`; `lower` only folds ASCII.
+CATEGORY_NAME_SQL = "trim(new.category, ' ' || char(9, 10, 13, 12, 11))"
+CATEGORY_KEY_SQL = f"lower({CATEGORY_NAME_SQL})"
+
+ASSIGN_CATEGORY_SQL = f"""
+    INSERT OR IGNORE INTO categories (name, key, sweet_count)
+    VALUES ({CATEGORY_NAME_SQL}, {CATEGORY_KEY_SQL}, 0);
+    -- Only `category_id`: the other triggers on `sweets` (e.g. the FTS
+    -- index's) may not have seen the row's `category` yet.
+    UPDATE sweets SET category_id = (
+        SELECT id FROM categories WHERE key = {CATEGORY_KEY_SQL}
+    )
+    WHERE id = new.id;
+"""
+
+# Recreated at every startup, replacing the versions that called
+# app-registered SQL functions.
+ASSIGN_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER categories_assign_insert AFTER INSERT ON sweets
+    WHEN new.category_id IS NULL
+    BEGIN
+        {ASSIGN_CATEGORY_SQL}
+    END
+    """,
+    # A category renamed without a new `category_id`, e.g. by raw SQL.
+    f"""
+    CREATE TRIGGER categories_assign_update AFTER UPDATE OF category ON sweets
+    WHEN old.category IS NOT new.category
+        AND old.category_id IS new.category_id
+    BEGIN
+        {ASSIGN_CATEGORY_SQL}
+    END
+    """,
+]
+
+COUNT_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER categories_count_insert AFTER INSERT ON sweets
+    WHEN new.category_id IS NOT NULL
+    BEGIN
+        UPDATE categories SET sweet_count = sweet_count + 1
+        WHERE id = new.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER categories_count_delete AFTER DELETE ON sweets
+    WHEN old.category_id IS NOT NULL
+    BEGIN
+        UPDATE categories SET sweet_count = sweet_count - 1
+        WHERE id = old.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER categories_count_update AFTER UPDATE OF category_id ON sweets
+    WHEN old.category_id IS NOT new.category_id
+    BEGIN
+        UPDATE categories SET sweet_count = sweet_count - 1
+        WHERE id = old.category_id;
+        UPDATE categories SET sweet_count = sweet_count + 1
+        WHERE id = new.category_id;
+    END
+    """,
+]
+
+# Set by `create_category_triggers` once the triggers are known to exist.
+triggers_enabled = False
+
+
+def migrate_categories(conn) -> int:
+    """
+    Assign a category to every sweet that has none.
+
+    Categories are created for their normalized names, the spelling of
+    the oldest sweet winning, and sweets whose category was spelled
+    another way are renamed to it. Returns the number of sweets migrated.
+    """
+    spellings = conn.execute(
+        select(Sweet.category)
+        .where(Sweet.category_id.is_(None))
+        .group_by(Sweet.category)
+        .order_by(func.min(Sweet.id))
+    ).scalars().all()
+
+    migrated = 0
+    interned = {}
+    for spelling in spellings:
+        key = category_key(spelling)
+        if key not in interned:
+            interned[key] = category_cache.intern(conn, spelling)
+        category_id, name = interned[key]
+        migrated += conn.execute(
+            update(Sweet)
+            .where(Sweet.category_id.is_(None), Sweet.category == spelling)
+            .values(category_id=category_id, category=name)
+        ).rowcount
+    return migrated
+
+
+def recount_categories(conn) -> None:
+    """Recompute every category's `sweet_count` from `sweets`."""
+    conn.execute(update(Category).values(sweet_count=(
+        select(func.count())
+        .where(Sweet.category_id == Category.id)
+        .scalar_subquery()
+    )))
+
+
+def create_category_triggers(bind: Engine) -> None:
+    """
+    Create the category triggers if needed and migrate older sweets.
+
+    Counts are recomputed when the triggers are first created, to count
+    the sweets that existed before them. The `(category, price)` index
+    used by category searches before is dropped.
+    """
+    global triggers_enabled
+
+    with bind.begin() as conn:
+        created = False
+        if bind.dialect.name == "sqlite":
+            for statement in ASSIGN_TRIGGERS_SQL:
+                name = statement.split()[2]
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+                conn.exec_driver_sql(statement)
+
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'trigger' AND name = 'categories_count_insert'"
+            ).first()
+            if not exists:
+                for statement in COUNT_TRIGGERS_SQL:
+                    conn.exec_driver_sql(statement)
+                created = True
+
+        # Replaced by `ix_sweets_category_id_price`.
+        conn.execute(text("DROP INDEX IF EXISTS ix_sweets_category_price"))
+
+        migrate_categories(conn)
+        if created:
+            recount_categories(conn)
+
+    triggers_enabled = bind.dialect.name == "sqlite"
+
+
+# -------------------------------------------------------------------
+# Category endpoints
+# -------------------------------------------------------------------
+router = APIRouter(prefix="/api/categories", tags=["Categories"])
+
+
+@router.get("", response_model=list[CategoryCount])
+async def list_categories(
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    """
+    List the categories that have sweets, with how many each has.
+
+    Counts are kept by triggers, and the list is served from the
+    catalog cache until the next write.
+    """
+    cache_key = catalog_cache.key("categories")
+    cached = catalog_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    if triggers_enabled:
+        query = (
+            select(Category.id, Category.name, Category.sweet_count.label("count"))
+            .where(Category.sweet_count > 0)
+        )
+    else:
+        query = (
+            select(Category.id, Category.name, func.count(Sweet.id).label("count"))
+            .join(Sweet, Sweet.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+        )
+
+    categories = [
+        dict(row)
+        for row in (await db.execute(query.order_by(Category.name))).mappings()
+    ]
+    catalog_cache.set(cache_key, categories)
+    return categories
@@ -0,0 +1,655 @@
+"""
+Columnar in-memory snapshot of the catalog.
+
+The snapshot holds `sweets` as NumPy columns, for search facets (see
+`app.facets`) and, with `SWEETSHOP_CATALOG_ENGINE=columnar`, to answer
+searches without a name filter instead of querying the database:
+- `ids` (sorted), `category_ids`, `prices` and `quantities`
+- names, UTF-8 encoded back to back in one buffer and located by
+  `name_starts` / `name_lengths`
+
+Category names are not held: filters are resolved to category IDs and
+IDs back to names through `category_cache`, as by the SQL search.
+
+Price-range, category and in-stock filters become one boolean mask,
+and sorting by price or quantity a stable argsort of the matches.
+Searches by name keep using the full-text index, which ranks matches
+by relevance.
+
+Every write to `sweets` runs inside `catalog_engine.change()` and
+describes its effect as deltas (`put`, `remove`, `adjust`), applied to
+the snapshot in place once it commits. Inside its transaction the
+write also takes the next "catalog" revision (`stamp`). Revisions
+order the deltas as their transactions committed, and tell which
+writes a freshly built snapshot already contains.
+
+Writes are tracked whichever engine serves searches, as facets always
+use the snapshot.
+
+Reads compare the stored revision with the snapshot's. While deltas of
+this process are still on their way the search falls back to SQL;
+otherwise a snapshot that is behind (e.g. another worker wrote) is
+rebuilt.
+"""
+
+import asyncio
+import os
+import threading
+from collections.abc import Callable
+from contextlib import contextmanager
+
+import numpy as np
+from sqlalchemy import insert, select, true, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.categories import category_cache
+from app.database import engine
+from app.models import CatalogRevision, Sweet
+
+# -------------------------------------------------------------------
+# Engine configuration
+# -------------------------------------------------------------------
+# "sql" (the default) or "columnar".
+CATALOG_ENGINE = os.getenv("SWEETSHOP_CATALOG_ENGINE", "sql")
+
+REVISION_NAME = "catalog"
+
+# Columns a search can be sorted by, descending with a "-" prefix.
+SORT_COLUMNS = ("price", "quantity")
+
+INITIAL_CAPACITY = 1024
+
+# Deltas held back by a revision gap (a write of another worker)
+# before the snapshot is given up and rebuilt by the next read.
+MAX_PENDING_CHANGES = 10_000
+
+
+def create_catalog_revision(bind: Engine) -> None:
+    """Create the catalog revision row if it does not exist."""
+    with bind.begin() as conn:
+        exists = conn.execute(
+            select(CatalogRevision.name)
+            .where(CatalogRevision.name == REVISION_NAME)
+        ).first()
+        if not exists:
+            conn.execute(
+                insert(CatalogRevision).values(name=REVISION_NAME, revision=0)
+            )
+
+
+def next_revision():
+    """Build an UPDATE taking the next catalog revision."""
+    return (
+        update(CatalogRevision)
+        .where(CatalogRevision.name == REVISION_NAME)
+        .values(revision=CatalogRevision.revision + 1)
+        .returning(CatalogRevision.revision)
+    )
+
+
+# -------------------------------------------------------------------
+# Snapshot
+# -------------------------------------------------------------------
+class CatalogSnapshot:
+    """
+    Columns of every sweet as of one catalog revision.
+
+    Columns are allocated with spare capacity so new sweets can be
+    appended in place; only the first `size` entries are in use.
+    Deleted sweets stay in the columns, cleared in `live`, until the
+    next rebuild. Renamed sweets get their new name appended to the
+    name buffer.
+    """
+
+    COLUMNS = (
+        "ids", "category_ids", "prices", "quantities",
+        "live", "name_starts", "name_lengths",
+    )
+
+    def __init__(self, revision: int, capacity: int = INITIAL_CAPACITY):
+        self.revision = revision
+        self.size = 0
+        self.ids = np.zeros(capacity, np.int64)
+        self.category_ids = np.zeros(capacity, np.int32)
+        self.prices = np.zeros(capacity, np.float64)
+        self.quantities = np.zeros(capacity, np.int64)
+        self.live = np.zeros(capacity, bool)
+        self.name_starts = np.zeros(capacity, np.int64)
+        self.name_lengths = np.zeros(capacity, np.int32)
+        self.names = bytearray()
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple], revision: int) -> "CatalogSnapshot":
+        """
+        Build a snapshot from `(id, name, category_id, price, quantity)`
+        rows sorted by ID.
+        """
+        count = len(rows)
+        snapshot = cls(revision, max(INITIAL_CAPACITY, count + count // 8))
+
+        encoded = [row[1].encode() for row in rows]
+        lengths = np.fromiter(map(len, encoded), np.int32, count)
+        snapshot.names = bytearray(b"".join(encoded))
+        snapshot.name_lengths[:count] = lengths
+        snapshot.name_starts[:count] = np.cumsum(lengths) - lengths
+
+        snapshot.category_ids[:count] = np.fromiter(
+            (row[2] for row in rows), np.int32, count
+        )
+        snapshot.ids[:count] = np.fromiter((row[0] for row in rows), np.int64, count)
+        snapshot.prices[:count] = np.fromiter(
+            (row[3] for row in rows), np.float64, count
+        )
+        snapshot.quantities[:count] = np.fromiter(
+            (row[4] for row in rows), np.int64, count
+        )
+        snapshot.live[:count] = True
+        snapshot.size = count
+        return snapshot
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.live[:self.size]))
+
+    def position(self, sweet_id: int) -> int | None:
+        """Return the column position of a sweet, live or deleted."""
+        i = int(np.searchsorted(self.ids[:self.size], sweet_id))
+        if i < self.size and self.ids[i] == sweet_id:
+            return i
+        return None
+
+    # ---------------------------------------------------------------
+    # Deltas
+    # ---------------------------------------------------------------
+    def put(self, row: dict) -> None:
+        """Insert a sweet, or replace every column of an existing one."""
+        i = self.position(row["id"])
+        if i is None:
+            i = self._insert_at(
+                int(np.searchsorted(self.ids[:self.size], row["id"]))
+            )
+
+        encoded = row["name"].encode()
+        start, length = self.name_starts[i], self.name_lengths[i]
+        if not self.live[i] or self.names[start:start + length] != encoded:
+            self.name_starts[i] = len(self.names)
+            self.name_lengths[i] = len(encoded)
+            self.names += encoded
+
+        self.ids[i] = row["id"]
+        self.category_ids[i] = row["category_id"]
+        self.prices[i] = row["price"]
+        self.quantities[i] = row["quantity"]
+        self.live[i] = True
+
+    def remove(self, sweet_id: int) -> None:
+        """Mark a sweet as deleted."""
+        i = self.position(sweet_id)
+        if i is not None:
+            self.live[i] = False
+
+    def adjust(self, sweet_id: int, amount: int) -> None:
+        """Add `amount` (negative for sales) to a sweet's stock."""
+        i = self.position(sweet_id)
+        if i is not None:
+            self.quantities[i] += amount
+
+    def apply(self, deltas: list[tuple]) -> None:
+        """Apply the deltas recorded by a `CatalogChange`."""
+        for method, *args in deltas:
+            getattr(self, method)(*args)
+
+    def _insert_at(self, i: int) -> int:
+        """
+        Open an empty slot at position `i`, growing the columns if full.
+
+        New sweets normally have the highest ID, so this appends.
+        """
+        if self.size == len(self.ids):
+            capacity = 2 * len(self.ids)
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+
+        if i < self.size:
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[i + 1:self.size + 1] = column[i:self.size]
+        self.live[i] = False
+        self.size += 1
+        return i
+
+    # ---------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------
+    def mask(
+        self,
+        category_ids=None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        in_stock: bool = False,
+        ids=None,
+    ) -> np.ndarray:
+        """
+        Return a boolean mask of the live sweets matching every filter.
+
+        `category_ids`, if given, are the categories a category filter
+        resolved to (see `CategoryCache.match`). `ids`, if given,
+        restricts the result to those sweet IDs (e.g. the matches of a
+        full-text name filter).
+        """
+        n = self.size
+        mask = self.live[:n].copy()
+
+        if category_ids is not None:
+            mask &= np.isin(
+                self.category_ids[:n], np.asarray(category_ids, dtype=np.int32)
+            )
+        if min_price is not None:
+            mask &= self.prices[:n] >= min_price
+        if max_price is not None:
+            mask &= self.prices[:n] <= max_price
+        if in_stock:
+            mask &= self.quantities[:n] > 0
+        if ids is not None:
+            mask &= np.isin(self.ids[:n], np.asarray(ids, dtype=np.int64))
+
+        return mask
+
+    def select(
+        self, mask: np.ndarray, category_name: Callable[[int], str],
+        sort: str | None = None,
+    ) -> "Matches":
+        """
+        Gather the masked sweets, ordered by `sort` and then by ID.
+
+        `category_name` resolves category IDs to names as the result
+        rows are built, e.g. `category_cache.name`. `sort` is a column of `SORT_COLUMNS`, prefixed with "-" for
+        descending order (by ID too, as in `build_search_query`);
+        without it matches are in ID order.
+        """
+        positions = np.flatnonzero(mask)
+        if sort:
+            column = {"price": self.prices, "quantity": self.quantities}[
+                sort.removeprefix("-")
+            ]
+            # Stable, so ties keep their ID order.
+            order = np.argsort(column.take(positions), kind="stable")
+            if sort.startswith("-"):
+                order = order[::-1]
+            positions = positions.take(order)
+
+        return Matches(
+            ids=self.ids.take(positions),
+            name_starts=self.name_starts.take(positions),
+            name_lengths=self.name_lengths.take(positions),
+            category_ids=self.category_ids.take(positions),
+            prices=self.prices.take(positions),
+            quantities=self.quantities.take(positions),
+            names=self.names,
+            category_name=category_name,
+        )
+
+    def facets(self, mask: np.ndarray, price_buckets: int) -> dict:
+        """
+        Count the masked sweets per category ID and per price bucket.
+
+        The price range `[min, max]` of the matching sweets is split
+        into `price_buckets` equal-width buckets.
+        """
+        # Gathering by position is several times faster than indexing
+        # each column with the boolean mask.
+        positions = np.flatnonzero(mask)
+        category_counts = np.bincount(self.category_ids.take(positions))
+        order = np.argsort(-category_counts, kind="stable")
+        categories = [
+            {"category_id": i, "count": int(category_counts[i])}
+            for i in order.tolist()
+            if category_counts[i]
+        ]
+
+        prices = self.prices.take(positions)
+        histogram = []
+        if len(prices):
+            low, high = float(prices.min()), float(prices.max())
+            width = (high - low) / price_buckets or 1.0
+            # Same buckets as `np.histogram`, without its sorting pass.
+            buckets = ((prices - low) / width).astype(np.intp)
+            np.minimum(buckets, price_buckets - 1, out=buckets)
+            counts = np.bincount(buckets, minlength=price_buckets)
+            histogram = [
+                {
+                    "min": round(low + i * width, 2),
+                    "max": round(min(low + (i + 1) * width, high), 2),
+                    "count": int(counts[i]),
+                }
+                for i in range(price_buckets)
+            ]
+
+        return {
+            "total": int(len(prices)),
+            "categories": categories,
+            "price_histogram": histogram,
+        }
+
+
+class Matches:
+    """
+    Columns of a search's matching sweets, in result order.
+
+    The columns are copies, so deltas applied to the snapshot later do
+    not change a result being streamed. The name buffer is shared; it is
+    only ever appended to.
+    """
+
+    def __init__(self, ids, name_starts, name_lengths, category_ids,
+                 prices, quantities, names, category_name):
+        self.ids = ids
+        self.name_starts = name_starts
+        self.name_lengths = name_lengths
+        self.category_ids = category_ids
+        self.prices = prices
+        self.quantities = quantities
+        self.names = names
+        self.category_name = category_name
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, start: int, stop: int) -> list[dict]:
+        """Return matches `start` to `stop` as sweet dicts."""
+        names, category_name = self.names, self.category_name
+        return [
+            {
+                "id": sweet_id,
+                "name": names[offset:offset + length].decode(),
+                "category": category_name(category_id),
+                "price": price,
+                "quantity": quantity,
+            }
+            for sweet_id, offset, length, category_id, price, quantity in zip(
+                self.ids[start:stop].tolist(),
+                self.name_starts[start:stop].tolist(),
+                self.name_lengths[start:stop].tolist(),
+                self.category_ids[start:stop].tolist(),
+                self.prices[start:stop].tolist(),
+                self.quantities[start:stop].tolist(),
+            )
+        ]
+
+    async def batches(self, size: int):
+        """Yield the matches as sweet dicts, `size` at a time."""
+        for start in range(0, len(self), size):
+            yield self.rows(start, start + size)
+
+
+# -------------------------------------------------------------------
+# Changes
+# -------------------------------------------------------------------
+class CatalogChange:
+    """
+    The effect of one write transaction on the catalog.
+
+    Call `stamp` inside the transaction, after its writes, and record
+    the changed sweets with `put`, `remove` and `adjust`. A write that
+    deltas cannot describe (e.g. a bulk import) calls `reset` instead,
+    and the snapshot is rebuilt.
+    """
+
+    def __init__(self):
+        self.revision: int | None = None
+        self.deltas: list[tuple] = []
+
+    def stamp(self, conn) -> None:
+        """
+        Take the next catalog revision in `conn`'s transaction.
+
+        `conn` is a Connection or Session; from an AsyncSession use
+        `db.run_sync(change.stamp)`.
+        """
+        self.revision = conn.execute(next_revision()).scalar_one()
+
+    def put(self, sweet) -> None:
+        """Record the current columns of a created or updated sweet."""
+        self.deltas.append(("put", {
+            "id": sweet.id,
+            "name": sweet.name,
+            "category_id": sweet.category_id,
+            "price": sweet.price,
+            "quantity": sweet.quantity,
+        }))
+
+    def remove(self, sweet_id: int) -> None:
+        """Record a deleted sweet."""
+        self.deltas.append(("remove", sweet_id))
+
+    def adjust(self, sweet_id: int, amount: int) -> None:
+        """Record a change of `amount` units in a sweet's stock."""
+        self.deltas.append(("adjust", sweet_id, amount))
+
+    def reset(self) -> None:
+        """Record a change the snapshot must be rebuilt for."""
+        self.deltas = None
+
+
+# -------------------------------------------------------------------
+# Catalog engine
+# -------------------------------------------------------------------
+class CatalogEngine:
+    """
+    Keeps a `CatalogSnapshot` in step with the catalog and searches it.
+
+    `enabled` only decides whether searches use the snapshot.
+    """
+
+    def __init__(self, bind: Engine, enabled: bool):
+        self.bind = bind
+        self.enabled = enabled
+        self._snapshot: CatalogSnapshot | None = None
+        # Committed deltas waiting for an earlier revision, by revision.
+        self._pending: dict[int, list | None] = {}
+        self._in_flight = 0
+        self._building = False
+        # Guards the snapshot's columns and the bookkeeping above.
+        self._mutex = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    @contextmanager
+    def change(self):
+        """
+        Track one write to `sweets` made inside the block.
+
+        Yields a `CatalogChange` to stamp and describe the write; its
+        deltas are applied to the snapshot when the block exits cleanly.
+        """
+        change = CatalogChange()
+        with self._mutex:
+            self._in_flight += 1
+        try:
+            yield change
+        except BaseException:
+            # Rolled back, or (rarely) failed after committing: then its
+            # revision is a gap, and the next read rebuilds.
+            with self._mutex:
+                self._in_flight -= 1
+            raise
+
+        with self._mutex:
+            self._in_flight -= 1
+            if change.revision is not None:
+                self._commit(change)
+
+    def discard(self) -> None:
+        """Drop the snapshot; the next search rebuilds it."""
+        with self._mutex:
+            self._snapshot = None
+            self._pending.clear()
+
+    def _commit(self, change: CatalogChange) -> None:
+        snapshot = self._snapshot
+        if snapshot is None and not self._building:
+            return
+        if snapshot is not None and change.revision <= snapshot.revision:
+            # Committed before the snapshot was read, so already in it.
+            return
+        self._pending[change.revision] = change.deltas
+        if len(self._pending) > MAX_PENDING_CHANGES:
+            self._snapshot = None
+            self._pending.clear()
+            return
+        self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Apply pending deltas for as long as revisions are contiguous."""
+        snapshot = self._snapshot
+        while snapshot is not None and snapshot.revision + 1 in self._pending:
+            deltas = self._pending.pop(snapshot.revision + 1)
+            if deltas is None:
+                self._snapshot = None
+                self._pending.clear()
+                return
+            snapshot.apply(deltas)
+            snapshot.revision += 1
+
+    async def current(
+        self, db: AsyncSession, in_flight_ok: bool = False
+    ) -> CatalogSnapshot | None:
+        """
+        Return a snapshot at least as recent as the stored revision.
+
+        Returns None while writes of this process have committed but not
+        reached the snapshot yet, unless `in_flight_ok`: then the current
+        snapshot is returned as is, missing only writes that committed
+        concurrently with this call.
+        """
+        revision = (await db.execute(
+            select(CatalogRevision.revision)
+            .where(CatalogRevision.name == REVISION_NAME)
+        )).scalar_one()
+
+        with self._mutex:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.revision >= revision:
+                return snapshot
+            if self._in_flight:
+                if not in_flight_ok:
+                    return None
+                if snapshot is not None:
+                    return snapshot
+
+        return await asyncio.to_thread(self._rebuild, revision)
+
+    def _rebuild(self, revision: int) -> CatalogSnapshot:
+        with self._build_lock:
+            with self._mutex:
+                # Another request may have rebuilt it while this one waited.
+                snapshot = self._snapshot
+                if snapshot is not None and snapshot.revision >= revision:
+                    return snapshot
+                self._building = True
+
+            try:
+                # One statement, so the revision matches the rows read.
+                with self.bind.connect() as conn:
+                    rows = conn.execute(
+                        select(
+                            CatalogRevision.revision,
+                            Sweet.id,
+                            Sweet.name,
+                            Sweet.category_id,
+                            Sweet.price,
+                            Sweet.quantity,
+                        )
+                        .select_from(CatalogRevision)
+                        .outerjoin(Sweet, true())
+                        .where(CatalogRevision.name == REVISION_NAME)
+                        .order_by(Sweet.id)
+                    ).all()
+                built = rows[0][0]
+                snapshot = CatalogSnapshot.from_rows(
+                    [row[1:] for row in rows if row[1] is not None], built
+                )
+            finally:
+                with self._mutex:
+                    self._building = False
+
+            with self._mutex:
+                # Writes up to the built revision are in the rows already.
+                for pending in [r for r in self._pending if r <= built]:
+                    del self._pending[pending]
+                self._snapshot = snapshot
+                self._catch_up()
+                return snapshot
+
+    async def facets(
+        self,
+        db: AsyncSession,
+        category: str | None,
+        min_price: float | None,
+        max_price: float | None,
+        in_stock: bool,
+        price_buckets: int,
+        exact: bool = False,
+        ids=None,
+    ) -> dict:
+        """
+        Compute search facets from the snapshot; see `CatalogSnapshot.facets`.
+
+        Facets are only counts, so they may miss writes committing
+        concurrently rather than fall back to SQL.
+        """
+        category_ids = await self._category_ids(db, category, exact)
+        snapshot = await self.current(db, in_flight_ok=True)
+
+        with self._mutex:
+            mask = snapshot.mask(
+                category_ids, min_price, max_price, in_stock, ids
+            )
+            facets = snapshot.facets(mask, price_buckets)
+
+        # Every category counted has committed by now.
+        await db.run_sync(category_cache.load)
+        for entry in facets["categories"]:
+            entry["category"] = category_cache.name(entry.pop("category_id"))
+        return facets
+
+    async def search(
+        self,
+        db: AsyncSession,
+        category: str | None,
+        min_price: float | None,
+        max_price: float | None,
+        in_stock: bool,
+        sort: str | None,
+        exact: bool = False,
+    ) -> Matches | None:
+        """
+        Search the snapshot, or return None if it cannot be used now.
+        """
+        category_ids = await self._category_ids(db, category, exact)
+        snapshot = await self.current(db)
+        if snapshot is None:
+            return None
+
+        with self._mutex:
+            mask = snapshot.mask(category_ids, min_price, max_price, in_stock)
+            matches = snapshot.select(mask, category_cache.name, sort)
+
+        # Names are resolved as rows are streamed, and every category
+        # selected has committed by now.
+        await db.run_sync(category_cache.load)
+        return matches
+
+    async def _category_ids(
+        self, db: AsyncSession, category: str | None, exact: bool
+    ) -> list[int] | None:
+        """Resolve a category filter to category IDs, like the SQL search."""
+        if not category:
+            return None
+        await db.run_sync(category_cache.load)
+        return category_cache.match(category, exact)
+
+
+catalog_engine = CatalogEngine(engine, CATALOG_ENGINE == "columnar")
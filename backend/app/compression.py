@@ -0,0 +1,223 @@
+"""
+Negotiated response compression for the Sweet Shop API.
+
+`CompressionMiddleware` compresses response bodies with brotli or gzip,
+whichever the client prefers in `Accept-Encoding` (brotli needs the
+optional `brotli` package). Bodies smaller than
+`SWEETSHOP_COMPRESSION_MIN_BYTES` are sent as they are.
+
+Streamed responses are compressed chunk by chunk and flushed as they
+go, so the middleware only ever buffers up to the size threshold.
+Server-sent events and already encoded responses are left untouched.
+"""
+
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# -------------------------------------------------------------------
+# Compression configuration
+# -------------------------------------------------------------------
+COMPRESSION_MIN_BYTES = int(os.getenv("SWEETSHOP_COMPRESSION_MIN_BYTES", "1024"))
+
+GZIP_LEVEL = 6
+# Brotli's fast qualities beat gzip on both size and speed.
+BROTLI_QUALITY = 4
+
+# Responses that must reach the client unbuffered.
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class GzipEncoder:
+    def __init__(self):
+        # wbits=31 selects the gzip container.
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+
+
+# -------------------------------------------------------------------
+# Helper utilities
+# -------------------------------------------------------------------
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the supported encoding the client prefers, if any.
+
+    Follows the `Accept-Encoding` q-values; ties go to brotli.
+    """
+    best, best_q = None, 0.0
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if name not in ENCODERS:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+
+        if q > best_q or (q == best_q and name == "br"):
+            best, best_q = name, q
+    return best
+
+
+def is_compressible(message) -> bool:
+    """Check whether a response start message may be compressed."""
+    if message["status"] < 200 or message["status"] in (204, 304):
+        return False
+
+    headers = dict(message.get("headers", []))
+    if b"content-encoding" in headers:
+        return False
+    content_type = headers.get(b"content-type", b"").decode("latin-1")
+    return not content_type.startswith(UNCOMPRESSED_TYPES)
+
+
+def compressed_headers(headers, encoding: str) -> list:
+    """
+    Adjust response headers for a body compressed with `encoding`.
+
+    The length is no longer known, and a strong ETag becomes weak
+    because the bytes differ from the uncompressed representation.
+    """
+    result = []
+    for name, value in headers:
+        if name == b"content-length":
+            continue
+        if name == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        result.append((name, value))
+    result.append((b"content-encoding", encoding.encode()))
+    return result
+
+
+# -------------------------------------------------------------------
+# Request middleware
+# -------------------------------------------------------------------
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses above a size threshold.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+
+        responder = CompressionResponder(
+            send, negotiate_encoding(accept), self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """
+    Compresses the messages of one response on their way to `send`.
+
+    The start message is held back until the body either reaches the
+    threshold (and gets compressed) or ends below it (and is sent as
+    is), because only then are the final headers known.
+    """
+
+    def __init__(self, send, encoding: str | None, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.buffer = b""
+        self.encoder = None
+        self.passthrough = False
+
+    async def send(self, message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            if not is_compressible(message):
+                self.passthrough = True
+                await self._send(message)
+                return
+            # Caches must not serve one encoding to every client.
+            message["headers"] = list(message.get("headers", [])) + [
+                (b"vary", b"Accept-Encoding"),
+            ]
+            if self.encoding is None:
+                self.passthrough = True
+                await self._send(message)
+                return
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            self.buffer += body
+            if len(self.buffer) < self.minimum_size:
+                if more_body:
+                    return
+                # Ended below the threshold: send it uncompressed.
+                await self._send(self.start)
+                await self._send({
+                    "type": "http.response.body", "body": self.buffer,
+                })
+                return
+
+            self.encoder = ENCODERS[self.encoding]()
+            self.start["headers"] = compressed_headers(
+                self.start["headers"], self.encoding
+            )
+            await self._send(self.start)
+            body, self.buffer = self.buffer, b""
+
+        data = self.encoder.compress(body)
+        if not more_body:
+            data += self.encoder.finish()
+        await self._send({
+            "type": "http.response.body", "body": data, "more_body": more_body,
+        })
@@ -2,38 +2,147 @@
 Database configuration and session management.
 
 This module is responsible for:
-- Creating the SQLAlchemy database engine
-- Providing a session factory
-- Exposing a dependency (`get_db`) for request-scoped DB sessions
+- Creating the SQLAlchemy database engines (sync and async)
+- Providing session factories
+- Exposing dependencies (`get_db`, `get_async_db`) for request-scoped
+  DB sessions
 
 This follows the Single Responsibility Principle:
 all database setup and lifecycle logic lives in one place.
 """
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # -------------------------------------------------------------------
-# Database path configuration
+# Database URL configuration
 # -------------------------------------------------------------------
 # Use an absolute path to avoid accidentally creating multiple SQLite
 # databases depending on where the app is launched from.
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'sweetshop.db')}"
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'sweetshop.db')}"
+
+DATABASE_URL = os.getenv("SWEETSHOP_DATABASE_URL", DEFAULT_DATABASE_URL)
+DATABASE_PROFILE = os.getenv("SWEETSHOP_DB_PROFILE", "default")
+
+# Async drivers used for each sync URL scheme.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Return the async driver equivalent of a sync database URL.
+    """
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = os.getenv(
+    "SWEETSHOP_ASYNC_DATABASE_URL", to_async_url(DATABASE_URL)
+)
+
+# -------------------------------------------------------------------
+# Engine profiles
+# -------------------------------------------------------------------
+# "default" keeps SQLite's stock behaviour apart from waiting on locks.
+# "production" switches to WAL so readers never block the writer,
+# relaxes fsyncs to once per checkpoint and gives each connection a
+# larger page cache and memory-mapped I/O.
+ENGINE_PROFILES = {
+    "default": {
+        "pragmas": {
+            "busy_timeout": 5000,
+        },
+        "pool": {},
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # negative values are KiB
+            "temp_store": "MEMORY",
+        },
+        "pool": {
+            "pool_size": 20,
+            "max_overflow": 20,
+            "pool_timeout": 10,
+        },
+    },
+}
+
+
+def get_engine_profile(name: str) -> dict:
+    """
+    Look up an engine profile by name.
+    """
+    try:
+        return ENGINE_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown database profile {name!r}; "
+            f"expected one of {', '.join(ENGINE_PROFILES)}"
+        )
+
+
+def apply_sqlite_pragmas(bind: Engine, pragmas: dict) -> None:
+    """
+    Run the given PRAGMA statements on every new connection of `bind`.
+    """
+    @event.listens_for(bind, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def build_engines(url: str, async_url: str, profile: str):
+    """
+    Create the sync and async engines for `url` using an engine profile.
+    """
+    settings = get_engine_profile(profile)
+    is_sqlite = url.startswith("sqlite")
+
+    # `check_same_thread=False` is required for SQLite when used with
+    # FastAPI because requests may be handled in different threads.
+    connect_args = {"check_same_thread": False} if is_sqlite else {}
+
+    sync_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        **settings["pool"],
+    )
+    async_engine = create_async_engine(async_url, **settings["pool"])
+
+    if is_sqlite:
+        apply_sqlite_pragmas(sync_engine, settings["pragmas"])
+        apply_sqlite_pragmas(async_engine.sync_engine, settings["pragmas"])
+
+    return sync_engine, async_engine
+
 
 # -------------------------------------------------------------------
-# SQLAlchemy engine
+# SQLAlchemy engines
 # -------------------------------------------------------------------
-# `check_same_thread=False` is required for SQLite when used with FastAPI
-# because requests may be handled in different threads.
-engine = create_engine(
+# The async engine serves API requests so handlers waiting on the
+# database do not hold a threadpool thread. The sync engine is kept for
+# schema setup, scripts and tests.
+engine, async_engine = build_engines(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    ASYNC_DATABASE_URL,
+    DATABASE_PROFILE,
 )
 
 # -------------------------------------------------------------------
-# Session factory
+# Session factories
 # -------------------------------------------------------------------
 # Each request will get its own database session.
 SessionLocal = sessionmaker(
@@ -42,12 +151,64 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+# Objects stay loaded after commit so handlers can return them without
+# triggering an (unsupported) implicit async refresh.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # -------------------------------------------------------------------
 # Base class for ORM models
 # -------------------------------------------------------------------
 # All SQLAlchemy models should inherit from this Base.
 Base = declarative_base()
 
+# -------------------------------------------------------------------
+# Schema upgrades
+# -------------------------------------------------------------------
+def add_missing_columns(bind) -> None:
+    """
+    Add model columns that are missing from existing tables.
+
+    `Base.metadata.create_all` only creates tables that do not exist yet,
+    so databases created by an older version of the app would otherwise
+    lack newly added columns. New columns must declare a
+    `server_default` (or be nullable) for this to work.
+    """
+    inspector = inspect(bind)
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                ddl += column.type.compile(dialect=bind.dialect)
+                if column.server_default is not None:
+                    default = str(column.server_default.arg).replace("'", "''")
+                    ddl += f" NOT NULL DEFAULT '{default}'"
+                conn.execute(text(ddl))
+
+
+def add_missing_indexes(bind) -> None:
+    """
+    Create model indexes that are missing from existing tables.
+
+    Like columns, indexes declared after a table was first created are
+    not picked up by `Base.metadata.create_all`.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
 # -------------------------------------------------------------------
 # Dependency: get_db
 # -------------------------------------------------------------------
@@ -66,3 +227,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# -------------------------------------------------------------------
+# Dependency: get_async_db
+# -------------------------------------------------------------------
+async def get_async_db():
+    """
+    FastAPI dependency that provides an async database session.
+
+    Yields:
+        AsyncSession: An active SQLAlchemy async session.
+
+    The async counterpart of `get_db`, used by the API routers.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,75 @@
+"""
+Search facets computed from the in-memory catalog snapshot.
+
+Facets are counted over the `CatalogSnapshot` that
+`app.columnar.catalog_engine` keeps in step with the catalog, whichever
+engine serves the search results themselves. Facet counts for a filter
+set are then a handful of vectorized operations (see
+`CatalogSnapshot.facets`): the snapshot's boolean mask for the filters,
+`bincount` for the category counts and a histogram for the price
+buckets. Over a million sweets that takes a few milliseconds.
+
+Name filters go through the full-text index: the matching IDs are
+fetched from the database and turned into a mask. Category, price and
+in-stock filters are the snapshot's own (see `CatalogSnapshot.mask`).
+"""
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import search
+from app.columnar import catalog_engine
+from app.models import CatalogRevision, Sweet
+
+# -------------------------------------------------------------------
+# Revision triggers of earlier versions
+# -------------------------------------------------------------------
+# Facets used to keep a snapshot of their own, following a "facets"
+# revision bumped by these triggers.
+REVISION_NAME = "facets"
+REVISION_TRIGGERS = (
+    "facets_revision_insert",
+    "facets_revision_delete",
+    "facets_revision_update",
+)
+
+
+def drop_facet_triggers(bind: Engine) -> None:
+    """Drop the "facets" revision and its triggers if they exist."""
+    if bind.dialect.name != "sqlite":
+        return
+
+    with bind.begin() as conn:
+        for name in REVISION_TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(
+            delete(CatalogRevision).where(CatalogRevision.name == REVISION_NAME)
+        )
+
+
+# -------------------------------------------------------------------
+# Facets
+# -------------------------------------------------------------------
+async def search_facets(
+    db: AsyncSession,
+    name: str | None,
+    category: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    price_buckets: int,
+    exact: bool = False,
+    in_stock: bool = False,
+) -> dict:
+    """
+    Compute the facets of a search's filter set.
+    """
+    ids = None
+    if name:
+        query = search.apply_text_search(select(Sweet.id), name)
+        ids = (await db.scalars(query.order_by(None))).all()
+
+    return await catalog_engine.facets(
+        db, category, min_price, max_price, in_stock, price_buckets, exact,
+        ids,
+    )
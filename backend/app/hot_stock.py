@@ -0,0 +1,446 @@
+"""
+Sharded in-memory stock for hot sweets.
+
+During a flash sale a few sweets take almost every purchase, and every
+one of those purchases updates the same `quantity` row. For sweets
+listed in `SWEETSHOP_HOT_SWEETS` the stock is instead held in memory,
+split across `SWEETSHOP_STOCK_SHARDS` sub-counters with their own
+locks:
+- purchases are routed round-robin to a shard that has enough stock
+- when no single shard can serve a purchase, the shards are rebalanced
+  by pooling their stock and splitting it evenly again
+- a background thread reconciles the net change of every hot sweet back
+  to `Sweet.quantity` in one transaction per interval
+
+Purchases and restocks are acknowledged once the reconciliation that
+includes them has committed, so the API contract and durability are
+the same as for the direct path; only the number of transactions drops.
+A purchase's sale is kept on its shard with the stock change and both
+are drained together, so they commit in the same transaction.
+
+Other stock changes (update, delete, checkout) run inside `exclusive`,
+which closes the counters of the affected sweets, reconciles them and
+reloads them from the database afterwards.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, ExitStack
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog_cache import catalog_cache
+from app.columnar import catalog_engine
+from app.database import engine
+from app.models import Sweet
+from app.sales import SaleLine, record_sales, utcnow
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Hot stock configuration
+# -------------------------------------------------------------------
+HOT_SWEET_IDS = {
+    int(sweet_id)
+    for sweet_id in os.getenv("SWEETSHOP_HOT_SWEETS", "").split(",")
+    if sweet_id.strip()
+}
+STOCK_SHARDS = int(os.getenv("SWEETSHOP_STOCK_SHARDS", "8"))
+RECONCILE_SECONDS = (
+    float(os.getenv("SWEETSHOP_STOCK_RECONCILE_MS", "5")) / 1000
+)
+
+
+class ShardsClosed(Exception):
+    """Raised when counters are used after `ShardedStock.close`."""
+
+
+class StockShard:
+    """
+    One sub-counter: its stock, and its net change and the sales taken
+    from it since reconciliation.
+    """
+
+    __slots__ = ("lock", "quantity", "delta", "sales")
+
+    def __init__(self, quantity: int):
+        self.lock = threading.Lock()
+        self.quantity = quantity
+        self.delta = 0
+        self.sales: list[SaleLine] = []
+
+
+class ShardedStock:
+    """
+    The stock of one sweet split across several sub-counters.
+    """
+
+    def __init__(self, quantity: int, shards: int):
+        base, extra = divmod(quantity, shards)
+        self.shards = [
+            StockShard(base + (index < extra)) for index in range(shards)
+        ]
+        self.closed = False
+
+    def total(self) -> int:
+        """Return the stock across all shards."""
+        return sum(shard.quantity for shard in self.shards)
+
+    def take(
+        self, amount: int, start: int, sale: SaleLine | None = None
+    ) -> bool:
+        """
+        Take `amount` units, starting the search at shard `start`.
+
+        `sale`, if given, is recorded under the same lock as the stock
+        change, to be drained with it. Returns False if there is not
+        enough stock in total.
+        """
+        count = len(self.shards)
+        for offset in range(count):
+            shard = self.shards[(start + offset) % count]
+            with shard.lock:
+                if self.closed:
+                    raise ShardsClosed
+                if shard.quantity >= amount:
+                    shard.quantity -= amount
+                    shard.delta -= amount
+                    if sale is not None:
+                        shard.sales.append(sale)
+                    return True
+
+        return self._rebalance_take(amount, sale)
+
+    def _rebalance_take(self, amount: int, sale: SaleLine | None) -> bool:
+        """
+        Pool every shard's stock, take `amount` and spread the rest.
+        """
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.lock)
+            if self.closed:
+                raise ShardsClosed
+
+            total = self.total()
+            if total < amount:
+                return False
+
+            base, extra = divmod(total - amount, len(self.shards))
+            for index, shard in enumerate(self.shards):
+                shard.quantity = base + (index < extra)
+            self.shards[0].delta -= amount
+            if sale is not None:
+                self.shards[0].sales.append(sale)
+            return True
+
+    def add(self, amount: int, start: int) -> None:
+        """Add `amount` units to shard `start`."""
+        shard = self.shards[start % len(self.shards)]
+        with shard.lock:
+            if self.closed:
+                raise ShardsClosed
+            shard.quantity += amount
+            shard.delta += amount
+
+    def drain(self) -> tuple[int, list[SaleLine]]:
+        """Return and reset the net change and sales since the last call."""
+        delta = 0
+        sales = []
+        for shard in self.shards:
+            with shard.lock:
+                delta += shard.delta
+                sales += shard.sales
+                shard.delta = 0
+                shard.sales = []
+        return delta, sales
+
+    def restore(self, delta: int, sales: list[SaleLine]) -> None:
+        """Put back a drained change that failed to commit."""
+        shard = self.shards[0]
+        with shard.lock:
+            shard.delta += delta
+            shard.sales = sales + shard.sales
+
+    def close(self) -> None:
+        """Reject further changes; pending deltas can still be drained."""
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.lock)
+            self.closed = True
+
+
+# -------------------------------------------------------------------
+# Hot stock engine
+# -------------------------------------------------------------------
+class HotStockEngine:
+    """
+    Serves purchases and restocks of hot sweets from sharded counters.
+    """
+
+    def __init__(self, bind: Engine, hot_ids: set[int], shards: int,
+                 interval: float):
+        self.bind = bind
+        self.hot_ids = set(hot_ids)
+        self.shards = shards
+        self.interval = interval
+
+        self._stocks: dict[int, ShardedStock] = {}
+        # Bumped whenever counters are dropped, to reject stale loads.
+        self._generation: dict[int, int] = {}
+        # Sweets currently being changed outside the counters.
+        self._fences: dict[int, int] = {}
+        self._next_shard = itertools.count()
+
+        self._waiters: list[Future] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def is_hot(self, sweet_id: int) -> bool:
+        return sweet_id in self.hot_ids
+
+    # ---------------------------------------------------------------
+    # Purchases and restocks
+    # ---------------------------------------------------------------
+    async def purchase(self, db: AsyncSession, sweet_id: int, amount: int) -> int:
+        """
+        Take `amount` units of a hot sweet.
+
+        Returns the remaining quantity once the change is committed.
+        Raises a 404 error for unknown sweets and a 409 error if there
+        is not enough stock.
+        """
+        while True:
+            stock = await self._get_stock(db, sweet_id)
+            try:
+                taken = stock.take(
+                    amount, next(self._next_shard),
+                    SaleLine(sweet_id, amount, utcnow()),
+                )
+                break
+            except ShardsClosed:
+                continue
+
+        if not taken:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Not enough stock",
+            )
+
+        remaining = stock.total()
+        await self._wait_for_reconcile()
+        return remaining
+
+    async def restock(self, db: AsyncSession, sweet_id: int, amount: int) -> int:
+        """
+        Add `amount` units to a hot sweet.
+
+        Returns the new quantity once the change is committed.
+        """
+        while True:
+            stock = await self._get_stock(db, sweet_id)
+            try:
+                stock.add(amount, next(self._next_shard))
+                break
+            except ShardsClosed:
+                continue
+
+        quantity = stock.total()
+        await self._wait_for_reconcile()
+        return quantity
+
+    async def _get_stock(self, db: AsyncSession, sweet_id: int) -> ShardedStock:
+        """
+        Return the counters of a sweet, loading them if needed.
+        """
+        while True:
+            with self._cond:
+                fenced = sweet_id in self._fences
+                stock = self._stocks.get(sweet_id)
+                generation = self._generation.get(sweet_id, 0)
+            if not fenced and stock is not None:
+                return stock
+
+            if fenced:
+                # Another stock change is in progress; wait for it.
+                await asyncio.sleep(self.interval)
+                continue
+
+            quantity = (await db.execute(
+                select(Sweet.quantity).where(Sweet.id == sweet_id)
+            )).scalar_one_or_none()
+            # Release the connection before waiting on reconciliation.
+            await db.rollback()
+
+            if quantity is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Sweet not found",
+                )
+
+            with self._cond:
+                if (
+                    self._generation.get(sweet_id, 0) == generation
+                    and sweet_id not in self._fences
+                ):
+                    self._stocks.setdefault(
+                        sweet_id, ShardedStock(quantity, self.shards)
+                    )
+
+    async def _wait_for_reconcile(self) -> None:
+        """
+        Wait until every change made so far is in the database.
+        """
+        with self._cond:
+            waiter: Future = Future()
+            self._waiters.append(waiter)
+            self._start()
+            self._cond.notify()
+        await asyncio.wrap_future(waiter)
+
+    # ---------------------------------------------------------------
+    # Coordination with other stock changes
+    # ---------------------------------------------------------------
+    @asynccontextmanager
+    async def exclusive(self, *sweet_ids: int):
+        """
+        Run a stock change on `sweet_ids` outside the counters.
+
+        Pending changes to those sweets are reconciled first, new ones
+        wait until the block exits, and the counters reload from the
+        database afterwards.
+        """
+        hot_ids = [sweet_id for sweet_id in sweet_ids if self.is_hot(sweet_id)]
+        if not hot_ids:
+            yield
+            return
+
+        with self._cond:
+            for sweet_id in hot_ids:
+                self._fences[sweet_id] = self._fences.get(sweet_id, 0) + 1
+                stock = self._stocks.get(sweet_id)
+                if stock is not None:
+                    stock.close()
+
+        try:
+            await self._wait_for_reconcile()
+            yield
+        finally:
+            with self._cond:
+                for sweet_id in hot_ids:
+                    self._fences[sweet_id] -= 1
+                    if not self._fences[sweet_id]:
+                        del self._fences[sweet_id]
+                    self._stocks.pop(sweet_id, None)
+                    self._generation[sweet_id] = (
+                        self._generation.get(sweet_id, 0) + 1
+                    )
+
+    # ---------------------------------------------------------------
+    # Background reconciliation
+    # ---------------------------------------------------------------
+    def _start(self) -> None:
+        """Start the reconciler thread if needed. Caller holds the lock."""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="hot-stock", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not (self._waiters or self._stopping):
+                    self._cond.wait()
+                if self._stopping and not self._waiters:
+                    break
+
+            # Let concurrent purchases join this reconciliation.
+            time.sleep(self.interval)
+
+            with self._cond:
+                waiters, self._waiters = self._waiters, []
+
+            try:
+                self.reconcile()
+            except Exception:
+                # The deltas were put back; the waiters retry next round.
+                logger.exception("Reconciling hot stock failed")
+                with self._cond:
+                    self._waiters.extend(waiters)
+                continue
+
+            for waiter in waiters:
+                waiter.set_result(None)
+
+    def reconcile(self) -> None:
+        """
+        Write the net change of every hot sweet to `Sweet.quantity`,
+        and record the sales taken since the last reconciliation.
+        """
+        with self._cond:
+            stocks = list(self._stocks.items())
+
+        deltas = {}
+        sales = []
+        for sweet_id, stock in stocks:
+            delta, stock_sales = stock.drain()
+            if delta or stock_sales:
+                deltas[sweet_id] = (stock, delta, stock_sales)
+                sales += stock_sales
+        if not deltas:
+            return
+
+        changes = {
+            sweet_id: delta for sweet_id, (_, delta, _) in deltas.items() if delta
+        }
+        try:
+            with catalog_engine.change() as change, self.bind.begin() as conn:
+                if changes:
+                    conn.execute(
+                        update(Sweet)
+                        .where(Sweet.id.in_(changes))
+                        .values(
+                            quantity=Sweet.quantity + case(changes, value=Sweet.id)
+                        )
+                    )
+                    change.stamp(conn)
+                    for sweet_id, delta in changes.items():
+                        change.adjust(sweet_id, delta)
+                record_sales(conn, sales)
+        except Exception:
+            for stock, delta, stock_sales in deltas.values():
+                stock.restore(delta, stock_sales)
+            raise
+
+        catalog_cache.invalidate()
+
+    def shutdown(self) -> None:
+        """
+        Reconcile outstanding changes and stop the reconciler thread.
+        """
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            self._thread = None
+
+
+hot_stock = HotStockEngine(
+    engine,
+    HOT_SWEET_IDS,
+    STOCK_SHARDS,
+    RECONCILE_SECONDS,
+)
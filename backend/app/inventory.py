@@ -0,0 +1,304 @@
+"""
+Inventory summary for the admin dashboard.
+
+Stock totals per category (SKUs, units, stock value and low-stock
+count) are kept in `inventory_totals` by SQLite triggers on `sweets`,
+the same way the search index is. Every write path - create, update,
+delete, purchase, checkout, restock, import and the journal / hot-stock
+appliers - therefore keeps them current in its own transaction, and
+the summary is read without scanning the catalog.
+
+The lowest-stock items come from the partial low-stock index, so they
+cost a short index range scan however large the catalog is.
+
+`rebuild_summary` recomputes the totals from `sweets` and reports any
+category that had drifted. On databases other than SQLite there are no
+triggers and the summary is aggregated from `sweets` on every request.
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import (
+    Integer,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_admin
+from app.database import engine, get_async_db
+from app.models import LOW_STOCK_THRESHOLD, InventoryTotals, Sweet
+
+# -------------------------------------------------------------------
+# Summary triggers
+# -------------------------------------------------------------------
+# The stock value of one sweet in cents, as stored in the totals.
+ROW_VALUE_SQL = "CAST(ROUND({row}.quantity * {row}.price * 100) AS INTEGER)"
+
+
+def add_row_sql(row: str, category: str) -> str:
+    """Statements adding a `sweets` row (`new` / `old`) to the totals."""
+    return f"""
+        INSERT OR IGNORE INTO inventory_totals
+            (category, skus, units, stock_value_cents, low_stock)
+        VALUES ({category}, 0, 0, 0, 0);
+        UPDATE inventory_totals SET
+            skus = skus + 1,
+            units = units + {row}.quantity,
+            stock_value_cents =
+                stock_value_cents + {ROW_VALUE_SQL.format(row=row)},
+            low_stock = low_stock + ({row}.quantity < {LOW_STOCK_THRESHOLD})
+        WHERE category = {category};
+    """
+
+
+def remove_row_sql(row: str) -> str:
+    """Statements removing a `sweets` row from the totals."""
+    return f"""
+        UPDATE inventory_totals SET
+            skus = skus - 1,
+            units = units - {row}.quantity,
+            stock_value_cents =
+                stock_value_cents - {ROW_VALUE_SQL.format(row=row)},
+            low_stock = low_stock - ({row}.quantity < {LOW_STOCK_THRESHOLD})
+        WHERE category = {row}.category;
+        DELETE FROM inventory_totals
+        WHERE category = {row}.category AND skus = 0;
+    """
+
+
+CREATE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER inventory_totals_insert AFTER INSERT ON sweets
+    BEGIN
+        {add_row_sql("new", "new.category")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER inventory_totals_delete AFTER DELETE ON sweets
+    BEGIN
+        {remove_row_sql("old")}
+    END
+    """,
+    # Purchases and restocks only change the quantity: one UPDATE.
+    f"""
+    CREATE TRIGGER inventory_totals_update
+    AFTER UPDATE OF category, price, quantity ON sweets
+    WHEN old.category = new.category
+    BEGIN
+        UPDATE inventory_totals SET
+            units = units + new.quantity - old.quantity,
+            stock_value_cents = stock_value_cents
+                + {ROW_VALUE_SQL.format(row="new")}
+                - {ROW_VALUE_SQL.format(row="old")},
+            low_stock = low_stock
+                + (new.quantity < {LOW_STOCK_THRESHOLD})
+                - (old.quantity < {LOW_STOCK_THRESHOLD})
+        WHERE category = new.category;
+    END
+    """,
+    f"""
+    CREATE TRIGGER inventory_totals_move
+    AFTER UPDATE OF category, price, quantity ON sweets
+    WHEN old.category <> new.category
+    BEGIN
+        {remove_row_sql("old")}
+        {add_row_sql("new", "new.category")}
+    END
+    """,
+]
+
+# Set by `create_summary_triggers` once the triggers are known to exist.
+triggers_enabled = False
+
+
+def create_summary_triggers(bind: Engine) -> None:
+    """
+    Create the triggers maintaining `inventory_totals` if needed.
+
+    Totals are rebuilt when the triggers are first created, to count
+    the sweets that existed before them.
+    """
+    global triggers_enabled
+
+    if bind.dialect.name != "sqlite":
+        return
+
+    with bind.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'trigger' AND name = 'inventory_totals_insert'"
+        ).first()
+        if not exists:
+            for statement in CREATE_TRIGGERS_SQL:
+                conn.exec_driver_sql(statement)
+            rebuild_totals(conn)
+
+    triggers_enabled = True
+
+
+# -------------------------------------------------------------------
+# Totals
+# -------------------------------------------------------------------
+TOTAL_COLUMNS = ("skus", "units", "stock_value_cents", "low_stock")
+
+
+def aggregate_query():
+    """Compute the totals of every category from `sweets`."""
+    return (
+        select(
+            Sweet.category,
+            func.count().label("skus"),
+            func.sum(Sweet.quantity).label("units"),
+            func.sum(
+                cast(func.round(Sweet.quantity * Sweet.price * 100), Integer)
+            ).label("stock_value_cents"),
+            func.sum(
+                case((Sweet.quantity < LOW_STOCK_THRESHOLD, 1), else_=0)
+            ).label("low_stock"),
+        )
+        .group_by(Sweet.category)
+    )
+
+
+def build_low_stock_query(limit: int):
+    """
+    Select the `limit` sweets lowest on stock below the threshold.
+
+    Compares against the literal threshold so the partial low-stock
+    index serves it.
+    """
+    return (
+        select(Sweet.id, Sweet.name, Sweet.category, Sweet.quantity)
+        .where(Sweet.quantity < literal_column(str(LOW_STOCK_THRESHOLD)))
+        .order_by(Sweet.quantity, Sweet.id)
+        .limit(limit)
+    )
+
+
+def rebuild_totals(conn) -> list[dict]:
+    """
+    Replace the stored totals with ones recomputed from `sweets`.
+
+    Deleting first takes the write lock, so no sweet changes between
+    reading the old totals and writing the new ones. Returns the
+    categories whose stored totals were wrong.
+    """
+    stored = {
+        row.category: row
+        for row in conn.execute(delete(InventoryTotals).returning(
+            InventoryTotals.category,
+            *(getattr(InventoryTotals, c) for c in TOTAL_COLUMNS),
+        ))
+    }
+
+    actual = {row.category: row for row in conn.execute(aggregate_query())}
+    if actual:
+        conn.execute(insert(InventoryTotals), [
+            row._asdict() for row in actual.values()
+        ])
+
+    drift = []
+    for category in sorted(stored.keys() | actual.keys()):
+        before, after = stored.get(category), actual.get(category)
+        values = {
+            column: (
+                getattr(before, column) if before else 0,
+                getattr(after, column) if after else 0,
+            )
+            for column in TOTAL_COLUMNS
+        }
+        changed = {
+            column: {"stored": old, "actual": new}
+            for column, (old, new) in values.items()
+            if old != new
+        }
+        if changed:
+            drift.append({"category": category, **changed})
+    return drift
+
+
+def rebuild_summary(bind: Engine = engine) -> list[dict]:
+    """
+    Check the stored totals against `sweets` and repair them.
+
+    Returns the categories that had drifted (normally none).
+    """
+    if not triggers_enabled:
+        return []
+    with bind.begin() as conn:
+        return rebuild_totals(conn)
+
+
+# -------------------------------------------------------------------
+# Summary endpoints (Admin only)
+# -------------------------------------------------------------------
+router = APIRouter(prefix="/api/admin/summary", tags=["Inventory"])
+
+
+@router.get("")
+async def inventory_summary(
+    low_stock_limit: int = Query(10, ge=0, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Summarize the inventory (admin only).
+
+    Returns total SKUs, units and stock value, the same per category,
+    and up to `low_stock_limit` sweets below the low-stock threshold,
+    lowest first.
+    """
+    if triggers_enabled:
+        query = select(
+            InventoryTotals.category,
+            *(getattr(InventoryTotals, c) for c in TOTAL_COLUMNS),
+        ).order_by(InventoryTotals.category)
+    else:
+        query = aggregate_query().order_by(Sweet.category)
+
+    rows = (await db.execute(query)).all()
+    categories = [
+        {
+            "category": row.category,
+            "skus": row.skus,
+            "units": row.units,
+            "stock_value": row.stock_value_cents / 100,
+            "low_stock": row.low_stock,
+        }
+        for row in rows
+    ]
+
+    lowest = [
+        dict(row)
+        for row in (
+            await db.execute(build_low_stock_query(low_stock_limit))
+        ).mappings()
+    ] if low_stock_limit else []
+
+    return {
+        "total_skus": sum(c["skus"] for c in categories),
+        "total_units": sum(c["units"] for c in categories),
+        "total_stock_value": sum(row.stock_value_cents for row in rows) / 100,
+        "low_stock_threshold": LOW_STOCK_THRESHOLD,
+        "low_stock_count": sum(c["low_stock"] for c in categories),
+        "categories": categories,
+        "lowest_stock": lowest,
+    }
+
+
+@router.post("/rebuild")
+def rebuild_inventory_summary(admin=Depends(get_current_admin)):
+    """
+    Rebuild the summary from the `sweets` table (admin only).
+
+    Reports every category whose running totals disagreed with the
+    catalog before the rebuild; an empty list means they were exact.
+    """
+    drift = rebuild_summary()
+    return {"consistent": not drift, "drift": drift}
@@ -8,17 +8,61 @@ This module:
 - Registers API routers
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.auth import router as auth_router
-from app.database import Base, engine
+from app.bulk import router as bulk_router
+from app.categories import create_category_triggers
+from app.categories import router as categories_router
+from app.columnar import create_catalog_revision
+from app.compression import COMPRESSION_MIN_BYTES, CompressionMiddleware
+from app.database import (
+    Base,
+    add_missing_columns,
+    add_missing_indexes,
+    async_engine,
+    engine,
+)
+from app.facets import drop_facet_triggers
+from app.hot_stock import hot_stock
+from app.inventory import create_summary_triggers
+from app.inventory import router as inventory_router
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.metrics import router as metrics_router
+from app.passwords import password_pool
+from app.profiling import ProfilerMiddleware
+from app.profiling import router as profiling_router
+from app.purchase_journal import purchase_journal
+from app.sales import router as sales_router
+from app.responses import FastJSONResponse
+from app.search import create_search_index
 from app.sweets import router as sweets_router
 
+# -------------------------------------------------------------------
+# Application lifespan
+# -------------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Release background resources when the application shuts down.
+    """
+    yield
+    password_pool.shutdown()
+    purchase_journal.shutdown()
+    hot_stock.shutdown()
+
+
 # -------------------------------------------------------------------
 # FastAPI application instance
 # -------------------------------------------------------------------
-app = FastAPI(title="Sweet Shop API")
+app = FastAPI(
+    title="Sweet Shop API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # -------------------------------------------------------------------
 # Database initialization
@@ -26,6 +70,34 @@ app = FastAPI(title="Sweet Shop API")
 # Create all database tables on application startup.
 # This is acceptable for small projects and demos.
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
+add_missing_indexes(engine)
+create_search_index(engine)
+create_summary_triggers(engine)
+drop_facet_triggers(engine)
+create_category_triggers(engine)
+create_catalog_revision(engine)
+
+# Apply purchases journaled before a crash or restart.
+purchase_journal.recover()
+
+# -------------------------------------------------------------------
+# Response compression
+# -------------------------------------------------------------------
+# Negotiates brotli or gzip for bodies above the size threshold,
+# compressing streamed responses as they are sent.
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+# -------------------------------------------------------------------
+# Metrics
+# -------------------------------------------------------------------
+# Counts SQL statements per request; see `/metrics`.
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+app.add_middleware(MetricsMiddleware)
+
+# Admin-only `?profile=1` request profiling; see `app.profiling`.
+app.add_middleware(ProfilerMiddleware)
 
 # -------------------------------------------------------------------
 # CORS configuration
@@ -47,7 +119,13 @@ app.add_middleware(
 # Router registration
 # -------------------------------------------------------------------
 app.include_router(auth_router)
+app.include_router(bulk_router)
 app.include_router(sweets_router)
+app.include_router(categories_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
+app.include_router(sales_router)
+app.include_router(inventory_router)
 
 # -------------------------------------------------------------------
 # Health check endpoint
@@ -0,0 +1,321 @@
+"""
+Request and database metrics for the Sweet Shop API.
+
+This module provides:
+- ASGI middleware recording per-route latency histograms, request
+  counts and in-flight requests
+- SQLAlchemy event hooks counting the statements each request issues
+  and the time spent running them
+- a Prometheus text-format `/metrics` endpoint
+
+With `SWEETSHOP_DEBUG_QUERIES=1` every response also carries
+`X-Query-Count` and `X-Query-Time-Ms` headers, which makes N+1 query
+patterns easy to spot (and to assert on in tests). Headers are sent
+before the body, so they only count the statements run before the
+response started: a streamed response's own queries are not included.
+The totals for the whole request, body included, are logged at INFO
+once the response is complete.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Metrics configuration
+# -------------------------------------------------------------------
+DEBUG_QUERY_HEADERS = os.getenv("SWEETSHOP_DEBUG_QUERIES", "0") == "1"
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Label used for requests that did not match any route.
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record one observation. Caller holds the registry lock."""
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        """Return the number of observations at or below each bucket."""
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class QueryStats:
+    """
+    Statements issued while serving one request.
+    """
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware for the duration of each request.
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of every metric exposed at `/metrics`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: dict[tuple, Histogram] = {}
+        self.requests: dict[tuple, int] = {}
+        # Scopes of the requests being served, by id.
+        self.active: dict[int, dict] = {}
+        self.queries: dict[tuple, Histogram] = {}
+        self.query_seconds: dict[tuple, float] = {}
+
+    def start(self, scope: dict) -> None:
+        with self._lock:
+            self.active[id(scope)] = scope
+
+    def finish(self, scope: dict, status: int, seconds: float,
+               stats: QueryStats) -> None:
+        with self._lock:
+            del self.active[id(scope)]
+
+            method, route = scope["method"], route_template(scope)
+            key = (method, route)
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.query_seconds[key] = 0.0
+            self.latency[key].observe(seconds)
+            self.queries[key].observe(stats.count)
+            self.query_seconds[key] += stats.seconds
+
+            counted = (method, route, str(status))
+            self.requests[counted] = self.requests.get(counted, 0) + 1
+
+    def in_flight(self) -> dict[tuple, int]:
+        """
+        Count the requests being served by method and route.
+
+        Computed from the live scopes because a request's route is only
+        known after routing. Caller holds the lock.
+        """
+        counts = {key: 0 for key in self.latency}
+        for scope in self.active.values():
+            key = (scope["method"], route_template(scope))
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            render_histograms(
+                lines,
+                "sweetshop_http_request_duration_seconds",
+                "HTTP request latency by route.",
+                self.latency,
+            )
+            lines.append(
+                "# HELP sweetshop_http_requests_total "
+                "HTTP requests by route and status."
+            )
+            lines.append("# TYPE sweetshop_http_requests_total counter")
+            for (method, route, status), value in sorted(self.requests.items()):
+                labels = format_labels(
+                    method=method, route=route, status=status
+                )
+                lines.append(f"sweetshop_http_requests_total{labels} {value}")
+
+            lines.append(
+                "# HELP sweetshop_http_requests_in_flight Requests being served."
+            )
+            lines.append("# TYPE sweetshop_http_requests_in_flight gauge")
+            for (method, route), value in sorted(self.in_flight().items()):
+                labels = format_labels(method=method, route=route)
+                lines.append(
+                    f"sweetshop_http_requests_in_flight{labels} {value}"
+                )
+
+            render_histograms(
+                lines,
+                "sweetshop_db_queries_per_request",
+                "SQL statements issued per request by route.",
+                self.queries,
+            )
+            lines.append(
+                "# HELP sweetshop_db_query_seconds_total "
+                "Time spent running SQL by route."
+            )
+            lines.append("# TYPE sweetshop_db_query_seconds_total counter")
+            for (method, route), value in sorted(self.query_seconds.items()):
+                labels = format_labels(method=method, route=route)
+                lines.append(
+                    f"sweetshop_db_query_seconds_total{labels} {value:.6f}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(**labels: str) -> str:
+    """Format Prometheus labels, escaping their values."""
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_histograms(lines: list[str], name: str, help_text: str,
+                      histograms: dict[tuple, Histogram]) -> None:
+    """Append one histogram family to `lines`."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.cumulative()):
+            labels = format_labels(method=method, route=route, le=str(bound))
+            lines.append(f"{name}_bucket{labels} {count}")
+        labels = format_labels(method=method, route=route, le="+Inf")
+        lines.append(f"{name}_bucket{labels} {histogram.count}")
+        labels = format_labels(method=method, route=route)
+        lines.append(f"{name}_sum{labels} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+
+registry = MetricsRegistry()
+
+
+# -------------------------------------------------------------------
+# SQL instrumentation
+# -------------------------------------------------------------------
+def instrument_engine(bind: Engine) -> None:
+    """
+    Count statements run on `bind` against the current request.
+    """
+    @event.listens_for(bind, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(bind, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - context.query_started
+
+
+# -------------------------------------------------------------------
+# Request middleware
+# -------------------------------------------------------------------
+def route_template(scope) -> str:
+    """
+    Return the path template of the route serving a request.
+
+    Labelling by template (`/api/sweets/{sweet_id}`) rather than by
+    path keeps the number of time series bounded. The route is only
+    known once the request has been routed.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and SQL use per route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry.start(scope)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if DEBUG_QUERY_HEADERS:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-query-count", str(stats.count).encode()),
+                        (b"x-query-time-ms",
+                         f"{stats.seconds * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            registry.finish(scope, status, time.perf_counter() - start, stats)
+            if DEBUG_QUERY_HEADERS:
+                logger.info(
+                    "%s %s: %d queries in %.2f ms",
+                    scope["method"], route_template(scope),
+                    stats.count, stats.seconds * 1000,
+                )
+
+
+# -------------------------------------------------------------------
+# Prometheus endpoint
+# -------------------------------------------------------------------
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Expose request and database metrics in the Prometheus text format.
+    """
+    return Response(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
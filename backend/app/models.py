@@ -5,9 +5,22 @@ This module defines the core domain entities that are persisted
 in the database using SQLAlchemy ORM.
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
 from app.database import Base
 
+# Sweets with fewer units than this are considered low on stock.
+LOW_STOCK_THRESHOLD = 10
+
 
 class User(Base):
     """
@@ -43,6 +56,51 @@ class User(Base):
         nullable=False,
     )
 
+    # Bumped whenever the user's existing tokens must stop working.
+    token_version = Column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
+
+class Category(Base):
+    """
+    A sweet category, interned so sweets refer to it by ID.
+
+    `key` is the trimmed, lowercased name: names differing only in case
+    or surrounding spaces ("Indian", "indian ") are one category, named
+    as first seen. Categories are never renamed or deleted.
+
+    `sweet_count` is kept by triggers on `sweets` (see `app.categories`).
+    """
+
+    __tablename__ = "categories"
+
+    id = Column(
+        Integer,
+        primary_key=True,
+    )
+
+    name = Column(
+        String,
+        nullable=False,
+    )
+
+    key = Column(
+        String,
+        unique=True,
+        nullable=False,
+    )
+
+    sweet_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
 
 class Sweet(Base):
     """
@@ -53,9 +111,28 @@ class Sweet(Base):
     - a category (e.g., Indian, Chocolate, Bakery)
     - a price
     - a quantity indicating current stock
+
+    `category_id` refers to the interned `Category`; `category` keeps a
+    copy of its name for the full-text index and the summary triggers.
+
+    Indexes cover the search filters (category and price ranges, in
+    stock), the search sorts (price, quantity) and the low stock
+    lookup. The low stock index is partial, so queries must compare
+    against the literal `LOW_STOCK_THRESHOLD` to use it.
     """
 
     __tablename__ = "sweets"
+    __table_args__ = (
+        Index("ix_sweets_category_id_price", "category_id", "price"),
+        Index("ix_sweets_price", "price"),
+        Index("ix_sweets_quantity", "quantity"),
+        Index(
+            "ix_sweets_low_stock",
+            "quantity",
+            sqlite_where=text(f"quantity < {LOW_STOCK_THRESHOLD}"),
+            postgresql_where=text(f"quantity < {LOW_STOCK_THRESHOLD}"),
+        ),
+    )
 
     id = Column(
         Integer,
@@ -73,6 +150,14 @@ class Sweet(Base):
         nullable=False,
     )
 
+    # Nullable only for rows older than the categories table, which are
+    # assigned one at startup.
+    category_id = Column(
+        Integer,
+        ForeignKey("categories.id"),
+        nullable=True,
+    )
+
     price = Column(
         Float,
         nullable=False,
@@ -83,3 +168,196 @@ class Sweet(Base):
         nullable=False,
         default=0,
     )
+
+
+class JournalCheckpoint(Base):
+    """
+    Records how far a write-behind journal has been applied.
+
+    `seq` is the sequence number of the last journal entry whose effect
+    is reflected in the database. It is updated in the same transaction
+    as the entries themselves, so replaying a journal after a crash
+    never applies an entry twice.
+    """
+
+    __tablename__ = "journal_checkpoints"
+
+    name = Column(
+        String,
+        primary_key=True,
+    )
+
+    seq = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+
+class Sale(Base):
+    """
+    One sale in the sales ledger.
+
+    Written in the same transaction as the stock change it records.
+    The category and unit price are copied from the sweet at the time
+    of sale, and rows are kept when the sweet is deleted, so there is
+    no foreign key. Times are naive UTC.
+    """
+
+    __tablename__ = "sales"
+    __table_args__ = (
+        Index("ix_sales_sweet_sold_at", "sweet_id", "sold_at"),
+        Index("ix_sales_sold_at", "sold_at"),
+    )
+
+    id = Column(
+        Integer,
+        primary_key=True,
+    )
+
+    sweet_id = Column(
+        Integer,
+        nullable=False,
+    )
+
+    category = Column(
+        String,
+        nullable=False,
+    )
+
+    units = Column(
+        Integer,
+        nullable=False,
+    )
+
+    unit_price = Column(
+        Float,
+        nullable=False,
+    )
+
+    sold_at = Column(
+        DateTime,
+        nullable=False,
+    )
+
+
+class SalesRollup(Base):
+    """
+    Sales totals of one sweet or category over one time bucket.
+
+    `dimension` is "sweet" (with the sweet ID as `key`) or "category";
+    `granularity` is "minute", "hour" or "day", and `bucket_start` the
+    naive UTC start of the bucket. Rows are updated incrementally in
+    the same transaction as the sales they count.
+    """
+
+    __tablename__ = "sales_rollups"
+    __table_args__ = (
+        Index(
+            "ix_sales_rollups_bucket", "dimension", "granularity", "bucket_start"
+        ),
+    )
+
+    dimension = Column(
+        String,
+        primary_key=True,
+    )
+
+    granularity = Column(
+        String,
+        primary_key=True,
+    )
+
+    key = Column(
+        String,
+        primary_key=True,
+    )
+
+    bucket_start = Column(
+        DateTime,
+        primary_key=True,
+    )
+
+    sales = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+    units = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+    revenue = Column(
+        Float,
+        nullable=False,
+        default=0,
+    )
+
+
+class InventoryTotals(Base):
+    """
+    Running stock totals of one category, for the admin summary.
+
+    Maintained by triggers on `sweets` (see `app.inventory`), so every
+    write path keeps it current in the same transaction. Stock value is
+    kept in integer cents, each sweet contributing its rounded
+    `quantity * price`, so additions and removals cancel out exactly.
+    """
+
+    __tablename__ = "inventory_totals"
+
+    category = Column(
+        String,
+        primary_key=True,
+    )
+
+    skus = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+    units = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+    stock_value_cents = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+    # Sweets with fewer than `LOW_STOCK_THRESHOLD` units.
+    low_stock = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+
+
+class CatalogRevision(Base):
+    """
+    Change counter for one aspect of the catalog.
+
+    Bumped by triggers on `sweets` (see `app.facets`) so in-memory
+    indexes in any worker can tell, with one cheap read, whether the
+    rows they were built from have changed.
+    """
+
+    __tablename__ = "catalog_revisions"
+
+    name = Column(
+        String,
+        primary_key=True,
+    )
+
+    revision = Column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
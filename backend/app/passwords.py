@@ -0,0 +1,112 @@
+"""
+Password hashing for the Sweet Shop API.
+
+bcrypt is deliberately slow, so hashing and verification are run on a
+dedicated, size-limited process pool instead of the request threadpool.
+This keeps a burst of logins from starving every other endpoint.
+
+The pool applies backpressure: once `MAX_PENDING` jobs are queued or
+running, new requests are rejected with 503 instead of piling up.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# -------------------------------------------------------------------
+# Pool configuration
+# -------------------------------------------------------------------
+PASSWORD_WORKERS = int(
+    os.getenv("SWEETSHOP_PASSWORD_WORKERS", str(min(os.cpu_count() or 1, 4)))
+)
+MAX_PENDING = int(
+    os.getenv("SWEETSHOP_PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 8))
+)
+RETRY_AFTER_SECONDS = 1
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# -------------------------------------------------------------------
+# Synchronous helpers (run inside the worker processes)
+# -------------------------------------------------------------------
+def hash_password(password: str) -> str:
+    """Hash a plaintext password."""
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Verify a plaintext password against its hash."""
+    return pwd_context.verify(password, hashed_password)
+
+
+# -------------------------------------------------------------------
+# Bounded process pool
+# -------------------------------------------------------------------
+class PasswordPool:
+    """
+    Runs password jobs on a lazily started process pool.
+
+    At most `max_pending` jobs may be in flight at once; further jobs
+    are rejected immediately so callers can shed load.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    async def run(self, func, *args):
+        """
+        Run `func(*args)` on the pool, or raise 503 if it is saturated.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent password operations",
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+                )
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, if they were started."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, MAX_PENDING)
+
+
+# -------------------------------------------------------------------
+# Async helpers used by the auth endpoints
+# -------------------------------------------------------------------
+async def hash_password_async(password: str) -> str:
+    """Hash a plaintext password on the password pool."""
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Verify a plaintext password on the password pool."""
+    return await password_pool.run(verify_password, password, hashed_password)
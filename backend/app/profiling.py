@@ -0,0 +1,332 @@
+"""
+Opt-in profiling of single requests.
+
+An admin can ask for any request to be profiled by adding `?profile=1`
+to its URL or sending an `X-Profile: 1` header. The request is served
+as usual; its profile is stored on disk and the response carries an
+`X-Profile-Id` header naming it. Stored profiles are listed and
+downloaded through `/api/admin/profiles`.
+
+Two formats are supported (`?profile_format=` or `X-Profile-Format`):
+- `pstats` (default): a cProfile dump, readable with `pstats`,
+  snakeviz and similar tools
+- `speedscope`: a sampled profile in speedscope's JSON format, which
+  needs the optional `pyinstrument` package
+
+cProfile profiles the whole thread, so work the event loop does for
+other requests at the same time appears in `pstats` profiles too;
+pyinstrument only follows the profiled request.
+
+Profiling is rate limited so it is safe to leave enabled under load:
+only one request is profiled at a time and at most
+`SWEETSHOP_PROFILE_MAX_PER_MINUTE` per minute. Requests over the limit
+run unprofiled with an `X-Profile-Skipped` header. Requests from
+non-admins simply run unprofiled.
+"""
+
+import asyncio
+import cProfile
+import collections
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.auth import authenticate, get_current_admin
+from app.database import AsyncSessionLocal
+
+# -------------------------------------------------------------------
+# Profiler configuration
+# -------------------------------------------------------------------
+PROFILE_DIR = os.getenv(
+    "SWEETSHOP_PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "sweetshop-profiles"),
+)
+PROFILE_MAX_PER_MINUTE = int(os.getenv("SWEETSHOP_PROFILE_MAX_PER_MINUTE", "6"))
+# Older profiles are deleted once more than this many are stored.
+PROFILE_KEEP = 50
+
+FORMATS = {
+    "pstats": (".prof", "application/octet-stream"),
+    "speedscope": (".speedscope.json", "application/json"),
+}
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+
+class ProfileLimiter:
+    """
+    Allows one profile at a time and a bounded number per minute.
+    """
+
+    def __init__(self, max_per_minute: int):
+        self.max_per_minute = max_per_minute
+        self._started: collections.deque[float] = collections.deque()
+        self._active = False
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> str | None:
+        """
+        Reserve the profiler. Returns None on success, or the reason
+        the request cannot be profiled.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._started and now - self._started[0] >= 60:
+                self._started.popleft()
+
+            if self._active:
+                return "busy"
+            if len(self._started) >= self.max_per_minute:
+                return "rate-limited"
+
+            self._active = True
+            self._started.append(now)
+            return None
+
+    def release(self) -> None:
+        with self._lock:
+            self._active = False
+
+
+limiter = ProfileLimiter(PROFILE_MAX_PER_MINUTE)
+
+
+# -------------------------------------------------------------------
+# Profiler backends
+# -------------------------------------------------------------------
+class CProfileSession:
+    """Deterministic profile of the thread, saved as pstats."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def save(self, path: str) -> None:
+        self.profile.dump_stats(path)
+
+
+class PyinstrumentSession:
+    """Sampled profile of the request's task, saved for speedscope."""
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError(
+                "The 'pyinstrument' package is required for speedscope profiles"
+            )
+        self.profiler = Profiler(interval=0.001, async_mode="enabled")
+
+    def start(self) -> None:
+        self.profiler.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+
+    def save(self, path: str) -> None:
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        with open(path, "w") as file:
+            file.write(self.profiler.output(renderer=SpeedscopeRenderer()))
+
+
+SESSIONS = {
+    "pstats": CProfileSession,
+    "speedscope": PyinstrumentSession,
+}
+
+
+# -------------------------------------------------------------------
+# Helper utilities
+# -------------------------------------------------------------------
+def profile_requested(scope) -> tuple[bool, str]:
+    """
+    Return whether a request asks to be profiled, and in which format.
+    """
+    query = {}
+    for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+        name, _, value = pair.partition("=")
+        query[name] = value
+
+    headers = {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in scope.get("headers", [])
+    }
+
+    requested = query.get("profile") == "1" or headers.get("x-profile") == "1"
+    fmt = query.get("profile_format") or headers.get("x-profile-format", "pstats")
+    return requested, fmt
+
+
+async def is_admin_request(scope) -> bool:
+    """
+    Check the request's bearer token belongs to an admin.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            break
+    else:
+        return False
+
+    if scheme.lower() != "bearer":
+        return False
+
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await authenticate(token, db)
+        except HTTPException:
+            return False
+    return user.is_admin
+
+
+def profile_path(profile_id: str, fmt: str) -> str:
+    return os.path.join(PROFILE_DIR, profile_id + FORMATS[fmt][0])
+
+
+def store_profile(session, path: str) -> None:
+    """
+    Save a stopped profiling session to `path` and prune old profiles.
+
+    Blocking; run it in a thread.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    session.save(path)
+    prune_profiles()
+
+
+def prune_profiles() -> None:
+    """Delete the oldest profiles beyond `PROFILE_KEEP`."""
+    names = sorted(os.listdir(PROFILE_DIR))
+    for name in names[:-PROFILE_KEEP]:
+        os.remove(os.path.join(PROFILE_DIR, name))
+
+
+def find_profile(profile_id: str) -> tuple[str, str] | None:
+    """Return `(path, format)` of a stored profile, if it exists."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    for fmt in FORMATS:
+        path = profile_path(profile_id, fmt)
+        if os.path.exists(path):
+            return path, fmt
+    return None
+
+
+# -------------------------------------------------------------------
+# Request middleware
+# -------------------------------------------------------------------
+class ProfilerMiddleware:
+    """
+    ASGI middleware profiling requests that ask for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested, fmt = profile_requested(scope)
+        if not requested or fmt not in FORMATS:
+            await self.app(scope, receive, send)
+            return
+
+        if not await is_admin_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        skipped = limiter.try_acquire()
+        if skipped:
+            await self.app(scope, receive, with_header(
+                send, b"x-profile-skipped", skipped
+            ))
+            return
+
+        try:
+            session = SESSIONS[fmt]()
+        except RuntimeError:
+            limiter.release()
+            await self.app(scope, receive, with_header(
+                send, b"x-profile-skipped", "unavailable"
+            ))
+            return
+
+        profile_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        session.start()
+        try:
+            await self.app(scope, receive, with_header(
+                send, b"x-profile-id", profile_id
+            ))
+        finally:
+            session.stop()
+            limiter.release()
+            await asyncio.to_thread(
+                store_profile, session, profile_path(profile_id, fmt)
+            )
+
+
+def with_header(send, name: bytes, value: str):
+    """Wrap `send` to add a header to the response."""
+    async def send_wrapper(message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", [])) + [
+                (name, value.encode()),
+            ]
+        await send(message)
+    return send_wrapper
+
+
+# -------------------------------------------------------------------
+# Stored profiles (Admin only)
+# -------------------------------------------------------------------
+router = APIRouter(prefix="/api/admin/profiles", tags=["Profiling"])
+
+
+@router.get("")
+def list_profiles(admin=Depends(get_current_admin)):
+    """
+    List stored profiles, newest first (admin only).
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        for fmt, (suffix, _) in FORMATS.items():
+            if name.endswith(suffix):
+                profiles.append({"id": name[:-len(suffix)], "format": fmt})
+                break
+    return profiles
+
+
+@router.get("/{profile_id}")
+def download_profile(profile_id: str, admin=Depends(get_current_admin)):
+    """
+    Download a stored profile (admin only).
+    """
+    found = find_profile(profile_id)
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+
+    path, fmt = found
+    return FileResponse(
+        path,
+        media_type=FORMATS[fmt][1],
+        filename=os.path.basename(path),
+    )
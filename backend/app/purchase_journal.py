@@ -0,0 +1,442 @@
+"""
+Write-behind purchase journal.
+
+In the default "direct" purchase mode every purchase runs and commits
+its own conditional UPDATE, so sales throughput is bounded by the
+number of transactions (and fsyncs) the database can do per second.
+
+With `SWEETSHOP_PURCHASE_MODE=journal` purchases instead:
+- are checked against an in-memory stock ledger
+- are appended to a journal file, which a background writer fsyncs
+  once per group of purchases before any of them is acknowledged
+- are applied to the `sweets` table in batches, one transaction per
+  group, together with a checkpoint of the last applied entry
+
+On startup `recover` replays every journal entry past the checkpoint,
+so acknowledged purchases survive a crash. Catalog reads see a
+purchase once its group has been applied, a few milliseconds later.
+
+Other stock changes (update, restock, delete, checkout) run inside
+`exclusive`, which drains the journal for the affected sweets and
+keeps purchases of them waiting until the change has committed.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog_cache import catalog_cache
+from app.columnar import catalog_engine
+from app.database import BASE_DIR, engine
+from app.models import JournalCheckpoint, Sweet
+from app.sales import SaleLine, record_sales, utcnow
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Journal configuration
+# -------------------------------------------------------------------
+PURCHASE_MODE = os.getenv("SWEETSHOP_PURCHASE_MODE", "direct")
+JOURNAL_PATH = os.getenv(
+    "SWEETSHOP_JOURNAL_PATH", os.path.join(BASE_DIR, "purchases.journal")
+)
+
+# How long the writer waits for more purchases before committing a group.
+GROUP_COMMIT_SECONDS = (
+    float(os.getenv("SWEETSHOP_JOURNAL_GROUP_COMMIT_MS", "5")) / 1000
+)
+
+# Applied entries are discarded once the journal grows past this size.
+JOURNAL_ROTATE_BYTES = 1024 * 1024
+
+CHECKPOINT_NAME = "purchases"
+
+
+class JournalEntry:
+    """
+    One journaled purchase waiting to be made durable and applied.
+    """
+
+    __slots__ = ("seq", "sweet_id", "amount", "sold_at", "durable")
+
+    def __init__(self, seq: int, sweet_id: int, amount: int):
+        self.seq = seq
+        self.sweet_id = sweet_id
+        self.amount = amount
+        # The journal file does not keep times: replayed entries are
+        # recorded as sold when they are recovered.
+        self.sold_at = utcnow()
+        self.durable: Future = Future()
+
+
+def parse_journal(path: str) -> list[tuple[int, int, int]]:
+    """
+    Read `(seq, sweet id, amount)` entries from a journal file.
+
+    A torn last line (from a crash mid-write) was never acknowledged
+    and is ignored. So are malformed lines before it, e.g. left by a
+    failed write that could not be rolled back: the entries after them
+    were acknowledged and must still be replayed.
+    """
+    if not os.path.exists(path):
+        return []
+
+    entries = []
+    with open(path, "rb") as journal:
+        for line in journal:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                seq, sweet_id, amount = (int(part) for part in line.split())
+            except ValueError:
+                logger.warning("Skipping malformed journal line %r", line)
+                continue
+            entries.append((seq, sweet_id, amount))
+    return entries
+
+
+# -------------------------------------------------------------------
+# Purchase journal
+# -------------------------------------------------------------------
+class PurchaseJournal:
+    """
+    In-memory stock ledger backed by a group-committed journal.
+    """
+
+    def __init__(self, path: str, bind: Engine, window: float, enabled: bool):
+        self.path = path
+        self.bind = bind
+        self.window = window
+        self.enabled = enabled
+
+        # Ledger of sweet ID -> quantity, loaded from the database lazily.
+        self._stock: dict[int, int] = {}
+        # Bumped whenever a ledger entry is dropped, to reject stale loads.
+        self._generation: dict[int, int] = {}
+        # Sweets currently being changed outside the journal.
+        self._fences: dict[int, int] = {}
+        # Purchases waiting for a fence to lift, with their event loops.
+        self._fence_waiters: dict[
+            int, list[tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+        ] = {}
+
+        self._seq = 0
+        self._pending: list[JournalEntry] = []
+        self._waiters: list[Future] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    # ---------------------------------------------------------------
+    # Recovery
+    # ---------------------------------------------------------------
+    def recover(self) -> int:
+        """
+        Apply journal entries missing from the database.
+
+        Must run before the journal accepts purchases. Returns the
+        number of entries replayed.
+        """
+        with self.bind.connect() as conn:
+            checkpoint = conn.execute(
+                select(JournalCheckpoint.seq)
+                .where(JournalCheckpoint.name == CHECKPOINT_NAME)
+            ).scalar_one_or_none() or 0
+
+        entries = parse_journal(self.path)
+        missing = [
+            JournalEntry(seq, sweet_id, amount)
+            for seq, sweet_id, amount in entries
+            if seq > checkpoint
+        ]
+        if missing:
+            self._apply(missing)
+            logger.info("Replayed %d journaled purchases", len(missing))
+
+        # Everything in the file is now applied.
+        if os.path.exists(self.path):
+            open(self.path, "wb").close()
+        self._seq = max([checkpoint] + [seq for seq, _, _ in entries])
+
+        return len(missing)
+
+    # ---------------------------------------------------------------
+    # Purchases
+    # ---------------------------------------------------------------
+    async def purchase(self, db: AsyncSession, sweet_id: int, amount: int) -> int:
+        """
+        Take `amount` units of a sweet and journal the purchase.
+
+        Returns the remaining quantity once the purchase is durable.
+        Raises a 404 error for unknown sweets and a 409 error if there
+        is not enough stock.
+        """
+        while True:
+            with self._cond:
+                fenced = sweet_id in self._fences
+                stock = self._stock.get(sweet_id)
+                generation = self._generation.get(sweet_id, 0)
+
+                if not fenced and stock is not None:
+                    if stock < amount:
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail="Not enough stock",
+                        )
+                    remaining = stock - amount
+                    self._stock[sweet_id] = remaining
+                    entry = self._append(sweet_id, amount)
+                    break
+
+                if fenced:
+                    released = asyncio.Event()
+                    self._fence_waiters.setdefault(sweet_id, []).append(
+                        (asyncio.get_running_loop(), released)
+                    )
+
+            if fenced:
+                # Another stock change is in progress; `exclusive` sets
+                # the event when it exits.
+                await released.wait()
+                continue
+
+            quantity = (await db.execute(
+                select(Sweet.quantity).where(Sweet.id == sweet_id)
+            )).scalar_one_or_none()
+            # Release the connection before waiting on the journal.
+            await db.rollback()
+
+            if quantity is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Sweet not found",
+                )
+
+            with self._cond:
+                if (
+                    self._generation.get(sweet_id, 0) == generation
+                    and sweet_id not in self._fences
+                ):
+                    self._stock.setdefault(sweet_id, quantity)
+
+        await asyncio.wrap_future(entry.durable)
+        return remaining
+
+    def _append(self, sweet_id: int, amount: int) -> JournalEntry:
+        """Queue an entry for the writer. Caller holds the lock."""
+        self._seq += 1
+        entry = JournalEntry(self._seq, sweet_id, amount)
+        self._pending.append(entry)
+        self._start()
+        self._cond.notify()
+        return entry
+
+    # ---------------------------------------------------------------
+    # Coordination with other stock changes
+    # ---------------------------------------------------------------
+    async def flush(self) -> None:
+        """
+        Wait until every purchase journaled so far is in the database.
+        """
+        with self._cond:
+            if self._thread is None:
+                return
+            waiter: Future = Future()
+            self._waiters.append(waiter)
+            self._cond.notify()
+        await asyncio.wrap_future(waiter)
+
+    @asynccontextmanager
+    async def exclusive(self, *sweet_ids: int):
+        """
+        Run a stock change on `sweet_ids` outside the journal.
+
+        Journaled purchases of those sweets are applied first, new ones
+        wait until the block exits, and the ledger reloads their stock
+        from the database afterwards.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        with self._cond:
+            for sweet_id in sweet_ids:
+                self._fences[sweet_id] = self._fences.get(sweet_id, 0) + 1
+
+        try:
+            await self.flush()
+            yield
+        finally:
+            with self._cond:
+                for sweet_id in sweet_ids:
+                    self._fences[sweet_id] -= 1
+                    if not self._fences[sweet_id]:
+                        del self._fences[sweet_id]
+                        waiters = self._fence_waiters.pop(sweet_id, [])
+                        for loop, released in waiters:
+                            loop.call_soon_threadsafe(released.set)
+                    self._stock.pop(sweet_id, None)
+                    self._generation[sweet_id] = (
+                        self._generation.get(sweet_id, 0) + 1
+                    )
+
+    # ---------------------------------------------------------------
+    # Background writer
+    # ---------------------------------------------------------------
+    def _start(self) -> None:
+        """Start the writer thread if needed. Caller holds the lock."""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="purchase-journal", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        unapplied: list[JournalEntry] = []
+
+        # Unbuffered, so a failed write leaves nothing behind to be
+        # flushed later, after the torn part has been truncated.
+        with open(self.path, "ab", buffering=0) as journal:
+            while True:
+                with self._cond:
+                    while not (self._pending or self._waiters or self._stopping):
+                        self._cond.wait()
+                    if self._stopping and not (self._pending or self._waiters):
+                        break
+                    grouping = bool(self._pending)
+
+                if grouping:
+                    # Let concurrent purchases join this group.
+                    time.sleep(self.window)
+
+                with self._cond:
+                    batch, self._pending = self._pending, []
+                    waiters, self._waiters = self._waiters, []
+
+                if batch and self._write(journal, batch):
+                    unapplied.extend(batch)
+
+                if unapplied:
+                    try:
+                        self._apply(unapplied)
+                        unapplied = []
+                    except Exception:
+                        # Still durable in the journal; retried next group.
+                        logger.exception("Applying journaled purchases failed")
+
+                if not unapplied and journal.tell() > JOURNAL_ROTATE_BYTES:
+                    journal.truncate(0)
+                    journal.seek(0)
+
+                for waiter in waiters:
+                    if unapplied:
+                        waiter.set_exception(
+                            RuntimeError("Journaled purchases not applied")
+                        )
+                    else:
+                        waiter.set_result(None)
+
+    def _write(self, journal, batch: list[JournalEntry]) -> bool:
+        """
+        Make a group of entries durable and acknowledge them.
+
+        On failure whatever part of the group reached the file is
+        truncated, so later groups do not follow a torn line, and the
+        purchases are refunded to the ledger and fail.
+        """
+        offset = journal.tell()
+        try:
+            data = memoryview(b"".join(
+                b"%d %d %d\n" % (entry.seq, entry.sweet_id, entry.amount)
+                for entry in batch
+            ))
+            while data:
+                data = data[journal.write(data):]
+            os.fsync(journal.fileno())
+        except OSError as exc:
+            logger.exception("Writing the purchase journal failed")
+            try:
+                journal.truncate(offset)
+                journal.seek(offset)
+            except OSError:
+                # Recovery skips the torn line.
+                logger.exception("Truncating the purchase journal failed")
+            with self._cond:
+                for entry in batch:
+                    if entry.sweet_id in self._stock:
+                        self._stock[entry.sweet_id] += entry.amount
+            for entry in batch:
+                entry.durable.set_exception(exc)
+            return False
+
+        for entry in batch:
+            entry.durable.set_result(None)
+        return True
+
+    def _apply(self, entries: list[JournalEntry]) -> None:
+        """
+        Apply entries to the database in one transaction.
+
+        Their sales are recorded in the same transaction.
+        """
+        totals: dict[int, int] = {}
+        for entry in entries:
+            totals[entry.sweet_id] = totals.get(entry.sweet_id, 0) + entry.amount
+        last_seq = max(entry.seq for entry in entries)
+
+        with catalog_engine.change() as change, self.bind.begin() as conn:
+            conn.execute(
+                update(Sweet)
+                .where(Sweet.id.in_(totals))
+                .values(quantity=Sweet.quantity - case(totals, value=Sweet.id))
+            )
+            change.stamp(conn)
+            for sweet_id, amount in totals.items():
+                change.adjust(sweet_id, -amount)
+            record_sales(conn, [
+                SaleLine(entry.sweet_id, entry.amount, entry.sold_at)
+                for entry in entries
+            ])
+            saved = conn.execute(
+                update(JournalCheckpoint)
+                .where(JournalCheckpoint.name == CHECKPOINT_NAME)
+                .values(seq=last_seq)
+            )
+            if saved.rowcount == 0:
+                conn.execute(
+                    insert(JournalCheckpoint)
+                    .values(name=CHECKPOINT_NAME, seq=last_seq)
+                )
+
+        catalog_cache.invalidate()
+
+    def shutdown(self) -> None:
+        """
+        Apply outstanding purchases and stop the writer thread.
+        """
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            self._thread = None
+
+
+purchase_journal = PurchaseJournal(
+    JOURNAL_PATH,
+    engine,
+    GROUP_COMMIT_SECONDS,
+    enabled=PURCHASE_MODE == "journal",
+)
@@ -0,0 +1,57 @@
+"""
+JSON responses for the Sweet Shop API.
+
+`FastJSONResponse` renders with orjson, which serializes dicts, lists
+and primitives several times faster than the standard library. It is
+the application's default response class; when orjson is not installed
+it falls back to the standard JSON encoder.
+
+`json_array_chunks` encodes a JSON array incrementally, for responses
+streamed from a database cursor.
+"""
+
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize `content` to compact JSON bytes."""
+    if orjson is None:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when it is available.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def json_array_chunks(
+    batches: AsyncIterable[list],
+) -> AsyncIterator[bytes]:
+    """
+    Encode batches of items as one JSON array, a chunk per batch.
+    """
+    yield b"["
+    first = True
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = b",".join(dumps(item) for item in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
@@ -0,0 +1,294 @@
+"""
+Sales ledger and pre-aggregated sales reports.
+
+Every purchase is recorded as a `Sale` row in the same transaction as
+its stock change, whichever purchase path served it:
+- direct purchases and checkouts, in the request's transaction
+- journaled purchases, when their group is applied
+- hot-stock purchases, when their reconciliation commits
+
+The same transaction adds each sale to `SalesRollup` buckets per sweet
+and per category, at minute, hour and day granularity. Reports read
+only those buckets, so their cost depends on the number of buckets in
+the requested range rather than on the number of sales.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_admin
+from app.database import get_async_db
+from app.models import Sale, SalesRollup, Sweet
+
+# -------------------------------------------------------------------
+# Rollup configuration
+# -------------------------------------------------------------------
+GRANULARITIES = ("minute", "hour", "day")
+
+# Range reported when a request gives no start.
+DEFAULT_WINDOWS = {
+    "minute": timedelta(hours=1),
+    "hour": timedelta(days=1),
+    "day": timedelta(days=30),
+}
+
+
+class SaleLine(NamedTuple):
+    """Units of one sweet sold at a (naive UTC) time."""
+
+    sweet_id: int
+    units: int
+    sold_at: datetime
+
+
+# -------------------------------------------------------------------
+# Helper utilities
+# -------------------------------------------------------------------
+def utcnow() -> datetime:
+    """Return the current time as naive UTC, as stored in the ledger."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_naive_utc(moment: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC; naive ones are kept."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Return the start of the bucket containing `moment`."""
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_upsert(dialect_name: str):
+    """
+    Build an INSERT adding to existing rollup rows on conflict.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    table = SalesRollup.__table__
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={
+            "sales": table.c.sales + statement.excluded.sales,
+            "units": table.c.units + statement.excluded.units,
+            "revenue": table.c.revenue + statement.excluded.revenue,
+        },
+    )
+
+
+# -------------------------------------------------------------------
+# Recording sales
+# -------------------------------------------------------------------
+def record_sales(conn, sales: list[SaleLine]) -> None:
+    """
+    Add sales to the ledger and to their rollup buckets.
+
+    `conn` is a Connection or Session inside the transaction that took
+    the stock; from an AsyncSession use `db.run_sync(record_sales, ...)`.
+    Sales of sweets that no longer exist are skipped.
+    """
+    if not sales:
+        return
+
+    sweet_ids = {sale.sweet_id for sale in sales}
+    details = {
+        row.id: row
+        for row in conn.execute(
+            select(Sweet.id, Sweet.category, Sweet.price)
+            .where(Sweet.id.in_(sweet_ids))
+        )
+    }
+
+    rows = []
+    rollups: dict[tuple, list] = {}
+    for sale in sales:
+        sweet = details.get(sale.sweet_id)
+        if sweet is None:
+            continue
+
+        rows.append({
+            "sweet_id": sale.sweet_id,
+            "category": sweet.category,
+            "units": sale.units,
+            "unit_price": sweet.price,
+            "sold_at": sale.sold_at,
+        })
+
+        revenue = sale.units * sweet.price
+        for granularity in GRANULARITIES:
+            start = bucket_start(sale.sold_at, granularity)
+            for dimension, key in (
+                ("sweet", str(sale.sweet_id)),
+                ("category", sweet.category),
+            ):
+                totals = rollups.setdefault(
+                    (dimension, granularity, key, start), [0, 0, 0.0]
+                )
+                totals[0] += 1
+                totals[1] += sale.units
+                totals[2] += revenue
+
+    if not rows:
+        return
+
+    conn.execute(insert(Sale.__table__), rows)
+
+    dialect = getattr(conn, "dialect", None) or conn.get_bind().dialect
+    conn.execute(rollup_upsert(dialect.name), [
+        {
+            "dimension": dimension,
+            "granularity": granularity,
+            "key": key,
+            "bucket_start": start,
+            "sales": count,
+            "units": units,
+            "revenue": revenue,
+        }
+        for (dimension, granularity, key, start), (count, units, revenue)
+        in rollups.items()
+    ])
+
+
+# -------------------------------------------------------------------
+# Reports (Admin only)
+# -------------------------------------------------------------------
+router = APIRouter(prefix="/api/admin/sales", tags=["Sales"])
+
+
+def report_range(
+    granularity: str,
+    start: datetime | None,
+    end: datetime | None,
+) -> tuple[datetime, datetime]:
+    """
+    Resolve a report's `[start, end)` range, in naive UTC.
+    """
+    end = to_naive_utc(end) if end else utcnow()
+    start = to_naive_utc(start) if start else end - DEFAULT_WINDOWS[granularity]
+    return start, end
+
+
+def format_key(dimension: str, key: str):
+    return int(key) if dimension == "sweet" else key
+
+
+@router.get("")
+async def sales_report(
+    by: str = Query("category", pattern="^(sweet|category)$"),
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    key: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Sales per sweet or category over time (admin only).
+
+    Returns one entry per key and bucket with sales, for the buckets
+    overlapping `[start, end)`. `end` defaults to now and `start`
+    to one hour, day or 30 days earlier for minute, hour and day
+    buckets. `key` restricts the report to one sweet ID or category.
+    """
+    start, end = report_range(granularity, start, end)
+
+    query = (
+        select(
+            SalesRollup.key,
+            SalesRollup.bucket_start,
+            SalesRollup.sales,
+            SalesRollup.units,
+            SalesRollup.revenue,
+        )
+        .where(
+            SalesRollup.dimension == by,
+            SalesRollup.granularity == granularity,
+            SalesRollup.bucket_start >= bucket_start(start, granularity),
+            SalesRollup.bucket_start < end,
+        )
+        .order_by(SalesRollup.bucket_start, SalesRollup.key)
+    )
+    if key is not None:
+        query = query.where(SalesRollup.key == key)
+
+    buckets = [
+        {
+            "bucket": row.bucket_start.isoformat(),
+            "key": format_key(by, row.key),
+            "sales": row.sales,
+            "units": row.units,
+            "revenue": round(row.revenue, 2),
+        }
+        for row in await db.execute(query)
+    ]
+
+    return {
+        "by": by,
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets": buckets,
+    }
+
+
+@router.get("/top")
+async def top_sellers(
+    by: str = Query("sweet", pattern="^(sweet|category)$"),
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Best-selling sweets or categories by units sold (admin only).
+
+    Totals are summed from the `granularity` buckets overlapping the
+    range, as for the sales report; coarser buckets are cheaper to sum
+    over long ranges but round the range out to whole buckets.
+    """
+    start, end = report_range(granularity, start, end)
+
+    units = func.sum(SalesRollup.units)
+    query = (
+        select(
+            SalesRollup.key,
+            func.sum(SalesRollup.sales).label("sales"),
+            units.label("units"),
+            func.sum(SalesRollup.revenue).label("revenue"),
+        )
+        .where(
+            SalesRollup.dimension == by,
+            SalesRollup.granularity == granularity,
+            SalesRollup.bucket_start >= bucket_start(start, granularity),
+            SalesRollup.bucket_start < end,
+        )
+        .group_by(SalesRollup.key)
+        .order_by(units.desc(), SalesRollup.key)
+        .limit(limit)
+    )
+
+    return [
+        {
+            "key": format_key(by, row.key),
+            "sales": row.sales,
+            "units": row.units,
+            "revenue": round(row.revenue, 2),
+        }
+        for row in await db.execute(query)
+    ]
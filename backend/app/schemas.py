@@ -9,9 +9,9 @@ They help validate input, document endpoints in Swagger, and keep
 business logic and persistence models separate.
 """
 
-from typing import Optional
+from typing import Annotated, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, StringConstraints
 
 
 # -------------------------------------------------------------------
@@ -40,10 +40,15 @@ class TokenResponse(BaseModel):
 # -------------------------------------------------------------------
 # Sweet schemas
 # -------------------------------------------------------------------
+# Not stripped here: `category_cache.intern` strips the same whitespace
+# as the category triggers do. It must not be only whitespace.
+CategoryName = Annotated[str, StringConstraints(pattern=r"[^ \t\n\r\f\v]")]
+
+
 class SweetCreate(BaseModel):
     """Request body for creating a new sweet item."""
     name: str = Field(min_length=1)
-    category: str = Field(min_length=1)
+    category: CategoryName
     price: float = Field(gt=0, description="Price must be greater than 0")
     quantity: int = Field(ge=0, description="Quantity cannot be negative")
 
@@ -51,11 +56,75 @@ class SweetCreate(BaseModel):
 class SweetUpdate(BaseModel):
     """Request body for updating an existing sweet item."""
     name: str = Field(min_length=1)
-    category: str = Field(min_length=1)
+    category: CategoryName
     price: float = Field(gt=0, description="Price must be greater than 0")
     quantity: int = Field(ge=0, description="Quantity cannot be negative")
 
 
+class SweetOut(BaseModel):
+    """Response body describing a sweet item."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    category: str
+    price: float
+    quantity: int
+
+
+class SweetFields(BaseModel):
+    """
+    A sweet in the listing, projected by `fields`.
+
+    Items always have `id`; the other keys are present only when
+    requested (all of them when `fields` is not given).
+    """
+    id: int
+    name: Optional[str] = None
+    category: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+
+
+class SweetList(BaseModel):
+    """Response body for one page of the sweet listing."""
+    items: list[SweetFields]
+    next_cursor: Optional[str] = None
+
+
+class CategoryFacet(BaseModel):
+    """Number of matching sweets in one category."""
+    category: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    """Number of matching sweets priced within `[min, max]`."""
+    min: float
+    max: float
+    count: int
+
+
+class SearchFacets(BaseModel):
+    """Category counts and price histogram of a search's matches."""
+    total: int
+    categories: list[CategoryFacet]
+    price_histogram: list[PriceBucket]
+
+
+class FacetedSearchResult(BaseModel):
+    """Response body for a search requested with `facets=true`."""
+    facets: SearchFacets
+    items: list[SweetOut]
+
+
+class CategoryCount(BaseModel):
+    """A category and the number of sweets in it."""
+    id: int
+    name: str
+    count: int
+
+
 class RestockRequest(BaseModel):
     """Request body for restocking an existing sweet item."""
     amount: int = Field(gt=0, description="Amount must be greater than 0")
@@ -68,3 +137,18 @@ class PurchaseRequest(BaseModel):
     If omitted, the API defaults to purchasing 1 unit.
     """
     amount: Optional[int] = Field(default=1, gt=0, description="Units to purchase")
+
+
+class CheckoutLine(BaseModel):
+    """A single cart line in a checkout request."""
+    sweet_id: int
+    amount: int = Field(gt=0, description="Units to purchase")
+
+
+class CheckoutRequest(BaseModel):
+    """
+    Request body for purchasing a whole cart at once.
+
+    Either every line is purchased or none of them are.
+    """
+    items: list[CheckoutLine] = Field(min_length=1)
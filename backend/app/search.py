@@ -0,0 +1,152 @@
+"""
+Full-text search index for sweets.
+
+This module maintains an SQLite FTS5 index over sweet names and
+categories. The index is an external-content table backed by `sweets`
+and is kept in sync by triggers, so every write path (create, update,
+delete) updates it in the same transaction.
+
+Search terms are matched by token prefix ("jale" finds "Jalebi") and
+results are ranked with bm25. When FTS5 is not available the search
+endpoint falls back to substring matching.
+"""
+
+import re
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Select,
+    String,
+    Table,
+    false,
+    literal_column,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.models import Sweet
+
+# -------------------------------------------------------------------
+# Index definition
+# -------------------------------------------------------------------
+# Kept out of `Base.metadata` so `create_all` never tries to create it
+# as a regular table.
+sweets_fts = Table(
+    "sweets_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("name", String),
+    Column("category", String),
+    Column("rank"),
+)
+
+CREATE_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE sweets_fts USING fts5(
+        name,
+        category,
+        content='sweets',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sweets_fts_insert AFTER INSERT ON sweets
+    BEGIN
+        INSERT INTO sweets_fts(rowid, name, category)
+        VALUES (new.id, new.name, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sweets_fts_delete AFTER DELETE ON sweets
+    BEGIN
+        INSERT INTO sweets_fts(sweets_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sweets_fts_update
+    AFTER UPDATE OF name, category ON sweets
+    BEGIN
+        INSERT INTO sweets_fts(sweets_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO sweets_fts(rowid, name, category)
+        VALUES (new.id, new.name, new.category);
+    END
+    """,
+    # Index any rows that existed before the index was created.
+    "INSERT INTO sweets_fts(sweets_fts) VALUES ('rebuild')",
+]
+
+# Set by `create_search_index` once the index is known to exist.
+fts_enabled = False
+
+
+def create_search_index(bind: Engine) -> None:
+    """
+    Create the FTS5 index and its sync triggers if they do not exist.
+
+    Leaves full-text search disabled on databases without FTS5.
+    """
+    global fts_enabled
+
+    if bind.dialect.name != "sqlite":
+        return
+
+    try:
+        with bind.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sweets_fts'"
+            ).first()
+            if not exists:
+                for statement in CREATE_INDEX_SQL:
+                    conn.exec_driver_sql(statement)
+    except OperationalError:
+        # SQLite was built without FTS5.
+        return
+
+    fts_enabled = True
+
+
+# -------------------------------------------------------------------
+# Query helpers
+# -------------------------------------------------------------------
+def to_prefix_terms(text: str) -> str | None:
+    """
+    Turn free text into an FTS5 expression matching every word by prefix.
+
+    Returns None if the text contains no searchable words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def apply_text_search(query: Select, name: str | None) -> Select:
+    """
+    Restrict a `Sweet` query to rows whose name matches `name`.
+
+    Uses the FTS5 index ranked by relevance when it is available, and
+    substring matching otherwise. Categories are filtered by ID instead,
+    see `app.categories`.
+    """
+    if not name:
+        return query
+
+    if not fts_enabled:
+        return query.where(Sweet.name.ilike(f"%{name}%"))
+
+    terms = to_prefix_terms(name)
+    if terms is None:
+        # Nothing searchable (e.g. only punctuation) matches nothing.
+        return query.where(false())
+
+    return (
+        query.join(sweets_fts, sweets_fts.c.rowid == Sweet.id)
+        .where(literal_column("sweets_fts").op("MATCH")(f"name : ({terms})"))
+        .order_by(sweets_fts.c.rank)
+    )
@@ -0,0 +1,139 @@
+"""
+Live stock updates for connected clients.
+
+Mutating sweet endpoints publish compact `{id, quantity}` deltas to an
+in-process hub after they commit. The hub fans every delta out to the
+connected Server-Sent Events streams, each through its own bounded
+queue.
+
+A client that falls so far behind that its queue fills up is dropped:
+its pending deltas are discarded and it receives a single `reset`
+event, after which it should reconnect and refetch the catalog.
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+# -------------------------------------------------------------------
+# Stream configuration
+# -------------------------------------------------------------------
+STREAM_QUEUE_SIZE = int(os.getenv("SWEETSHOP_STREAM_QUEUE_SIZE", "256"))
+HEARTBEAT_SECONDS = 15.0
+
+# Tells a dropped subscriber to resynchronise.
+RESET = object()
+
+
+class Subscriber:
+    """
+    One connected stream and its bounded queue of pending events.
+    """
+
+    def __init__(self, maxsize: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class StockHub:
+    """
+    Fans stock deltas out to every subscriber.
+    """
+
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: set[Subscriber] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscriber:
+        """Register a new subscriber on the running event loop."""
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Forget a subscriber."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, deltas: list[dict]) -> None:
+        """
+        Queue `deltas` for every subscriber without blocking.
+        """
+        if not deltas:
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        for subscriber in subscribers:
+            if subscriber.loop is current_loop:
+                self._offer(subscriber, deltas)
+            else:
+                subscriber.loop.call_soon_threadsafe(
+                    self._offer, subscriber, deltas
+                )
+
+    def _offer(self, subscriber: Subscriber, deltas: list[dict]) -> None:
+        """
+        Enqueue deltas for one subscriber, dropping it if it is full.
+        """
+        if subscriber.dropped:
+            return
+
+        try:
+            subscriber.queue.put_nowait(deltas)
+        except asyncio.QueueFull:
+            subscriber.dropped = True
+            self.unsubscribe(subscriber)
+
+            # Discard the backlog so the reset notice fits.
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(RESET)
+
+
+stock_hub = StockHub()
+
+
+# -------------------------------------------------------------------
+# Server-Sent Events encoding
+# -------------------------------------------------------------------
+async def stream_events(subscriber: Subscriber):
+    """
+    Yield Server-Sent Events for a subscriber until it disconnects.
+    """
+    try:
+        # Ask browsers to wait a few seconds before reconnecting.
+        yield "retry: 3000\n\n"
+
+        while True:
+            try:
+                deltas = await asyncio.wait_for(
+                    subscriber.queue.get(), HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection.
+                yield ": keepalive\n\n"
+                continue
+
+            if deltas is RESET:
+                yield "event: reset\ndata: {}\n\n"
+                return
+
+            payload = json.dumps(deltas, separators=(",", ":"))
+            yield f"event: stock\ndata: {payload}\n\n"
+    finally:
+        stock_hub.unsubscribe(subscriber)
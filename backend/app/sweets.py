@@ -9,37 +9,98 @@ for sweets, including:
 - update
 - delete
 - purchase
+- checkout
 - restock
+- live stock stream
 
 Access control:
 - All endpoints require authentication
 - Some endpoints require admin privileges
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from app.auth import get_current_admin, get_current_user
-from app.database import get_db
+import base64
+import binascii
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import (
+    get_current_admin,
+    get_current_user,
+    get_current_user_from_query,
+)
+from app.cache import MISSING
+from app.catalog_cache import catalog_cache
+from app.categories import category_cache
+from app.columnar import SORT_COLUMNS, catalog_engine
+from app.database import AsyncSessionLocal, get_async_db
+from app.facets import search_facets
+from app.hot_stock import hot_stock
 from app.models import Sweet
+from app.purchase_journal import purchase_journal
+from app.responses import FastJSONResponse, dumps, json_array_chunks
+from app.sales import SaleLine, record_sales, utcnow
+from app.search import apply_text_search
+from app.stock_events import stock_hub, stream_events
 from app.schemas import (
+    CheckoutRequest,
+    FacetedSearchResult,
     PurchaseRequest,
     RestockRequest,
     SweetCreate,
+    SweetList,
+    SweetOut,
     SweetUpdate,
 )
 
 router = APIRouter(prefix="/api/sweets", tags=["Sweets"])
 
+# -------------------------------------------------------------------
+# Listing configuration
+# -------------------------------------------------------------------
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Listing and search responses are streamed from a database cursor in
+# batches of this many rows.
+STREAM_BATCH_SIZE = 500
+# Results up to this many rows are also stored in the catalog cache;
+# larger search results are only streamed.
+CATALOG_CACHE_MAX_ROWS = MAX_PAGE_SIZE
+
+# Search `sort` values: a sortable column, "-" prefixed for descending.
+SORT_PATTERN = f"^-?({'|'.join(SORT_COLUMNS)})$"
+
+# Columns a client may request through the `fields` projection.
+# `id` is always returned because it drives the pagination cursor.
+SWEET_FIELDS = ("id", "name", "category", "price", "quantity")
+
+# Cache-Control sent with catalog responses. The default lets clients
+# keep a copy but revalidate it (cheaply, via ETag) on every use; e.g.
+# "public, max-age=5" also lets a reverse proxy serve it for 5 seconds.
+CATALOG_CACHE_CONTROL = os.getenv("SWEETSHOP_CATALOG_CACHE_CONTROL", "no-cache")
+
 
 # -------------------------------------------------------------------
 # Helper utilities
 # -------------------------------------------------------------------
-def get_sweet_or_404(db: Session, sweet_id: int) -> Sweet:
+async def get_sweet_or_404(db: AsyncSession, sweet_id: int) -> Sweet:
     """
     Retrieve a sweet by ID or raise a 404 error.
     """
-    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    sweet = await db.get(Sweet, sweet_id)
     if not sweet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,13 +109,324 @@ def get_sweet_or_404(db: Session, sweet_id: int) -> Sweet:
     return sweet
 
 
+async def decrement_stock(db: AsyncSession, sweet_id: int, amount: int) -> int:
+    """
+    Atomically take `amount` units out of a sweet's stock.
+
+    The stock check and the decrement happen in a single conditional
+    UPDATE, so concurrent purchases can never oversell. Returns the
+    remaining quantity. The caller is responsible for committing.
+
+    Raises a 404 error if the sweet does not exist and a 409 error if
+    there is not enough stock.
+    """
+    remaining = (await db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet_id, Sweet.quantity >= amount)
+        .values(quantity=Sweet.quantity - amount)
+        .returning(Sweet.quantity)
+    )).scalar_one_or_none()
+
+    if remaining is None:
+        # Nothing matched: tell a missing sweet apart from a sold out one.
+        await get_sweet_or_404(db, sweet_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Not enough stock",
+        )
+
+    return remaining
+
+
+async def decrement_stock_bulk(
+    db: AsyncSession,
+    amounts: dict[int, int],
+) -> dict[int, int]:
+    """
+    Atomically take stock out of several sweets at once.
+
+    `amounts` maps sweet IDs to the units to remove. All rows are
+    updated by a single conditional UPDATE; if any sweet is missing or
+    short on stock, nothing is changed. Returns the remaining quantity
+    per sweet ID. The caller is responsible for committing.
+
+    Raises a 404 error for unknown sweets and a 409 error if any sweet
+    does not have enough stock.
+    """
+    amount_for_id = case(amounts, value=Sweet.id)
+
+    rows = (await db.execute(
+        update(Sweet)
+        .where(Sweet.id.in_(amounts), Sweet.quantity >= amount_for_id)
+        .values(quantity=Sweet.quantity - amount_for_id)
+        .returning(Sweet.id, Sweet.quantity)
+    )).all()
+
+    if len(rows) != len(amounts):
+        # Undo the lines that did succeed before reporting the failure.
+        await db.rollback()
+
+        existing = (await db.scalars(
+            select(Sweet.id).where(Sweet.id.in_(amounts))
+        )).all()
+        if len(existing) != len(amounts):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sweet not found",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Not enough stock",
+        )
+
+    return dict(rows)
+
+
+@asynccontextmanager
+async def exclusive_stock(*sweet_ids: int):
+    """
+    Change stock directly in the database, bypassing in-memory stock.
+
+    Holds off journaled and hot-stock purchases of `sweet_ids` until the
+    block exits, after applying the ones already accepted.
+    """
+    async with purchase_journal.exclusive(*sweet_ids):
+        async with hot_stock.exclusive(*sweet_ids):
+            yield
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+    """
+    if not if_none_match:
+        return False
+
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == etag for tag in candidates
+    )
+
+
+def conditional_get(request: Request, response: Response) -> Response | None:
+    """
+    Apply catalog validators to a GET response.
+
+    Returns a ready 304 response when the client's copy is current;
+    otherwise sets the ETag and Cache-Control headers on `response` and
+    returns None. Must be called before the catalog is queried.
+    """
+    headers = {
+        "ETag": catalog_cache.etag(),
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def catalog_response(content, response: Response) -> FastJSONResponse:
+    """
+    Serialize a catalog result straight to JSON.
+
+    Catalog rows are already plain dicts, so they skip response model
+    validation and `jsonable_encoder`. Headers set on `response` (ETag,
+    Cache-Control) are carried over.
+    """
+    return FastJSONResponse(content, headers=response.headers)
+
+
+def catalog_stream_response(chunks, response: Response) -> StreamingResponse:
+    """
+    Stream a catalog result produced by `chunks` as JSON.
+
+    Headers set on `response` (ETag, Cache-Control) are carried over.
+    """
+    return StreamingResponse(
+        chunks, media_type="application/json", headers=response.headers
+    )
+
+
+async def stream_rows(query):
+    """
+    Yield the rows of a catalog query as dicts, one batch at a time.
+
+    Uses its own session because the response body is produced after
+    the request's dependencies have been cleaned up.
+    """
+    query = query.execution_options(yield_per=STREAM_BATCH_SIZE)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.mappings().partitions():
+            yield [dict(row) for row in rows]
+
+
+async def stream_page(query, limit: int, cache_key):
+    """
+    Encode one listing page as it is read, then cache it.
+
+    `query` must be ordered by ID; one row beyond `limit` is read to
+    find out whether another page exists.
+    """
+    items, fetched = [], 0
+
+    async def batches():
+        nonlocal fetched
+        async for rows in stream_rows(query.limit(limit + 1)):
+            fetched += len(rows)
+            rows = rows[:limit - len(items)]
+            items.extend(rows)
+            yield rows
+
+    yield b'{"items":'
+    async for chunk in json_array_chunks(batches()):
+        yield chunk
+
+    next_cursor = encode_cursor(items[-1]["id"]) if fetched > limit else None
+    yield b',"next_cursor":' + dumps(next_cursor) + b"}"
+
+    catalog_cache.set(cache_key, {"items": items, "next_cursor": next_cursor})
+
+
+async def stream_results(query, cache_key):
+    """
+    Encode search results as they are read.
+
+    Results are cached when they turn out to be small enough; larger
+    ones are never held in memory as a whole.
+    """
+    kept = []
+
+    async def batches():
+        nonlocal kept
+        async for rows in stream_rows(query):
+            if kept is not None:
+                kept.extend(rows)
+                if len(kept) > CATALOG_CACHE_MAX_ROWS:
+                    kept = None
+            yield rows
+
+    async for chunk in json_array_chunks(batches()):
+        yield chunk
+
+    if kept is not None:
+        catalog_cache.set(cache_key, kept)
+
+
+async def with_facets(chunks, facets: dict):
+    """
+    Wrap a streamed array of search results with their facets.
+    """
+    yield b'{"facets":' + dumps(facets) + b',"items":'
+    async for chunk in chunks:
+        yield chunk
+    yield b"}"
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the last seen sweet ID into an opaque pagination cursor.
+    """
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a pagination cursor back into the last seen sweet ID.
+
+    Raises a 400 error if the cursor was not produced by `encode_cursor`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    """
+    Parse a comma separated `fields` projection into column names.
+
+    Returns every sweet column when no projection is given.
+    """
+    if not fields:
+        return list(SWEET_FIELDS)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in SWEET_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+
+    # Keep the declared column order and always include the cursor key.
+    return [f for f in SWEET_FIELDS if f == "id" or f in requested]
+
+
+def build_search_query(
+    name: str | None = None,
+    category_ids: list[int] | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    in_stock: bool = False,
+    sort: str | None = None,
+):
+    """
+    Build the SELECT behind `search_sweets` for the given filters.
+
+    `category_ids` are the IDs of the categories to match (see
+    `CategoryCache.match`); None matches any category.
+
+    Kept separate from the endpoint so the query plan of every filter
+    combination can be checked in tests.
+    """
+    columns = (getattr(Sweet, c) for c in SWEET_FIELDS)
+    query = apply_text_search(select(*columns), name)
+
+    if category_ids is not None:
+        query = query.where(Sweet.category_id.in_(category_ids))
+
+    if min_price is not None:
+        query = query.where(Sweet.price >= min_price)
+    if max_price is not None:
+        query = query.where(Sweet.price <= max_price)
+    if in_stock:
+        query = query.where(Sweet.quantity > 0)
+    if sort:
+        column = getattr(Sweet, sort.removeprefix("-"))
+        filtered = name or category_ids is not None or any(
+            bound is not None for bound in (min_price, max_price)
+        )
+        if filtered:
+            # "+ 0" keeps SQLite from walking the whole sort index to
+            # skip the sort: the filter's index finds fewer rows.
+            column = column + 0
+        if sort.startswith("-"):
+            # The reverse of the ascending order, so an index on the
+            # column (which ends with the ID) serves both directions.
+            order = (column.desc(), Sweet.id.desc())
+        else:
+            order = (column.asc(), Sweet.id.asc())
+        # Replaces the relevance order of text searches.
+        query = query.order_by(None).order_by(*order)
+
+    return query
+
+
 # -------------------------------------------------------------------
 # Create
 # -------------------------------------------------------------------
-@router.post("", status_code=status.HTTP_201_CREATED)
-def add_sweet(
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=SweetOut)
+async def add_sweet(
     payload: SweetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     """
@@ -63,16 +435,23 @@ def add_sweet(
     Any authenticated user can create a sweet.
     (This can be restricted to admins if needed.)
     """
+    category_id, category = await db.run_sync(
+        category_cache.intern, payload.category
+    )
     sweet = Sweet(
         name=payload.name,
-        category=payload.category,
+        category=category,
+        category_id=category_id,
         price=payload.price,
         quantity=payload.quantity,
     )
 
-    db.add(sweet)
-    db.commit()
-    db.refresh(sweet)
+    with catalog_engine.change() as change:
+        db.add(sweet)
+        await db.run_sync(change.stamp)
+        await db.commit()
+        change.put(sweet)
+    catalog_cache.invalidate()
 
     return sweet
 
@@ -80,24 +459,63 @@ def add_sweet(
 # -------------------------------------------------------------------
 # Read
 # -------------------------------------------------------------------
-@router.get("")
-def list_sweets(
-    db: Session = Depends(get_db),
+@router.get("", response_model=SweetList)
+async def list_sweets(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
     user=Depends(get_current_user),
 ):
     """
-    Retrieve a list of all available sweets.
+    Retrieve one page of sweets ordered by ID.
+
+    Pagination is keyset based: pass the returned `next_cursor` back as
+    `cursor` to fetch the following page. `next_cursor` is null on the
+    last page.
+
+    `fields` optionally restricts the returned columns, e.g.
+    `fields=name,quantity`. Only those columns are selected.
+
+    Pages are streamed from the database as they are read, and served
+    from the catalog cache until the next write. Responses carry an
+    ETag; a matching If-None-Match gets a 304.
     """
-    return db.query(Sweet).all()
+    columns = parse_fields(fields)
+
+    not_modified = conditional_get(request, response)
+    if not_modified:
+        return not_modified
+
+    cache_key = catalog_cache.key("list", limit, cursor, columns)
+    cached = catalog_cache.get(cache_key)
+    if cached is not MISSING:
+        return catalog_response(cached, response)
 
+    query = select(*(getattr(Sweet, c) for c in columns))
+    if cursor:
+        query = query.where(Sweet.id > decode_cursor(cursor))
 
-@router.get("/search")
-def search_sweets(
+    return catalog_stream_response(
+        stream_page(query.order_by(Sweet.id), limit, cache_key), response
+    )
+
+
+@router.get("/search", response_model=list[SweetOut] | FacetedSearchResult)
+async def search_sweets(
+    request: Request,
+    response: Response,
     name: str | None = None,
     category: str | None = None,
+    category_match: str = Query("prefix", pattern="^(prefix|exact)$"),
     min_price: float | None = None,
     max_price: float | None = None,
-    db: Session = Depends(get_db),
+    in_stock: bool = False,
+    sort: str | None = Query(None, pattern=SORT_PATTERN),
+    facets: bool = False,
+    price_buckets: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     """
@@ -106,43 +524,133 @@ def search_sweets(
     - category
     - minimum price
     - maximum price
+    - in stock only
+
+    Name matches words by prefix through the full-text index, and
+    results are ordered by relevance. Category matches the same way by
+    default; with `category_match=exact` it must be the category's name
+    (ignoring case). Either way it is resolved to category IDs first, so
+    sweets are looked up by category ID. `sort` orders results by
+    `price` or `quantity` instead ("-price" / "-quantity" descending),
+    ties by ID (descending too for descending sorts).
+    Results are streamed as they are read, so any number of matches is
+    served in constant memory. Results of up to `CATALOG_CACHE_MAX_ROWS`
+    rows are served from the catalog cache until the next write, and
+    revalidated with ETag / If-None-Match like the listing.
+
+    With the columnar catalog engine, searches without a name are served
+    from its in-memory snapshot, in ID order unless sorted.
+
+    With `facets=true` the response is an object holding the results as
+    `items` and, as `facets`, the number of matches per category and a
+    histogram of their prices in `price_buckets` equal-width buckets.
     """
-    query = db.query(Sweet)
+    not_modified = conditional_get(request, response)
+    if not_modified:
+        return not_modified
 
-    if name:
-        query = query.filter(Sweet.name.ilike(f"%{name}%"))
-    if category:
-        query = query.filter(Sweet.category.ilike(f"%{category}%"))
-    if min_price is not None:
-        query = query.filter(Sweet.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Sweet.price <= max_price)
+    exact = category_match == "exact"
+
+    facet_counts = None
+    if facets:
+        facet_counts = await search_facets(
+            db, name, category, min_price, max_price, price_buckets, exact,
+            in_stock,
+        )
+        # Release the connection; results are streamed from their own.
+        await db.rollback()
+
+    chunks = None
+    if catalog_engine.enabled and not name:
+        matches = await catalog_engine.search(
+            db, category, min_price, max_price, in_stock, sort, exact
+        )
+        await db.rollback()
+        if matches is not None:
+            chunks = json_array_chunks(matches.batches(STREAM_BATCH_SIZE))
+
+    if chunks is None:
+        cache_key = catalog_cache.key(
+            "search", name, category, exact, min_price, max_price,
+            in_stock, sort,
+        )
+        cached = catalog_cache.get(cache_key)
+        if cached is not MISSING:
+            if facet_counts is not None:
+                cached = {"facets": facet_counts, "items": cached}
+            return catalog_response(cached, response)
+
+        category_ids = None
+        if category:
+            await db.run_sync(category_cache.load)
+            category_ids = category_cache.match(category, exact)
+
+        query = build_search_query(
+            name, category_ids, min_price, max_price, in_stock, sort
+        )
+        chunks = stream_results(query, cache_key)
+
+    if facet_counts is not None:
+        chunks = with_facets(chunks, facet_counts)
+    return catalog_stream_response(chunks, response)
+
+
+@router.get("/stream")
+async def stream_stock(
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_from_query),
+):
+    """
+    Stream live stock changes as Server-Sent Events.
+
+    Each `stock` event carries a JSON list of `{id, quantity}` deltas
+    (`{id, deleted: true}` for removed sweets). A `reset` event means
+    the client fell behind and must refetch the catalog.
+
+    Authenticates with an `access_token` query parameter because
+    EventSource cannot send an Authorization header.
+    """
+    subscriber = stock_hub.subscribe()
+
+    # Do not hold a pooled connection for the lifetime of the stream.
+    await db.close()
 
-    return query.all()
+    return StreamingResponse(
+        stream_events(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -------------------------------------------------------------------
 # Update
 # -------------------------------------------------------------------
-@router.put("/{sweet_id}")
-def update_sweet(
+@router.put("/{sweet_id}", response_model=SweetOut)
+async def update_sweet(
     sweet_id: int,
     payload: SweetUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     """
     Update an existing sweet's details.
     """
-    sweet = get_sweet_or_404(db, sweet_id)
-
-    sweet.name = payload.name
-    sweet.category = payload.category
-    sweet.price = payload.price
-    sweet.quantity = payload.quantity
-
-    db.commit()
-    db.refresh(sweet)
+    with catalog_engine.change() as change:
+        async with exclusive_stock(sweet_id):
+            sweet = await get_sweet_or_404(db, sweet_id)
+
+            sweet.name = payload.name
+            sweet.category_id, sweet.category = await db.run_sync(
+                category_cache.intern, payload.category
+            )
+            sweet.price = payload.price
+            sweet.quantity = payload.quantity
+
+            await db.run_sync(change.stamp)
+            await db.commit()
+        change.put(sweet)
+    catalog_cache.invalidate()
+    stock_hub.publish([{"id": sweet.id, "quantity": sweet.quantity}])
 
     return sweet
 
@@ -151,18 +659,24 @@ def update_sweet(
 # Delete (Admin only)
 # -------------------------------------------------------------------
 @router.delete("/{sweet_id}")
-def delete_sweet(
+async def delete_sweet(
     sweet_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin),
 ):
     """
     Delete a sweet item (admin only).
     """
-    sweet = get_sweet_or_404(db, sweet_id)
+    with catalog_engine.change() as change:
+        async with exclusive_stock(sweet_id):
+            sweet = await get_sweet_or_404(db, sweet_id)
 
-    db.delete(sweet)
-    db.commit()
+            await db.delete(sweet)
+            await db.run_sync(change.stamp)
+            await db.commit()
+        change.remove(sweet_id)
+    catalog_cache.invalidate()
+    stock_hub.publish([{"id": sweet_id, "deleted": True}])
 
     return {"detail": "Sweet deleted"}
 
@@ -171,45 +685,104 @@ def delete_sweet(
 # Inventory operations
 # -------------------------------------------------------------------
 @router.post("/{sweet_id}/purchase")
-def purchase_sweet(
+async def purchase_sweet(
     sweet_id: int,
     payload: PurchaseRequest = PurchaseRequest(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     """
     Purchase a sweet, decreasing its stock quantity.
-    """
-    sweet = get_sweet_or_404(db, sweet_id)
 
+    Returns 409 if there is not enough stock left. The sale is recorded
+    in the sales ledger together with the stock change. In journal mode
+    the purchase is acknowledged once journaled and reaches the catalog
+    with the next group commit.
+    """
     amount = payload.amount or 1
-    if sweet.quantity < amount:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Not enough stock",
-        )
 
-    sweet.quantity -= amount
-    db.commit()
-    db.refresh(sweet)
+    if hot_stock.is_hot(sweet_id):
+        remaining = await hot_stock.purchase(db, sweet_id, amount)
+    elif purchase_journal.enabled:
+        remaining = await purchase_journal.purchase(db, sweet_id, amount)
+    else:
+        with catalog_engine.change() as change:
+            remaining = await decrement_stock(db, sweet_id, amount)
+            await db.run_sync(
+                record_sales, [SaleLine(sweet_id, amount, utcnow())]
+            )
+            await db.run_sync(change.stamp)
+            await db.commit()
+            change.adjust(sweet_id, -amount)
+        catalog_cache.invalidate()
+    stock_hub.publish([{"id": sweet_id, "quantity": remaining}])
+
+    return {"id": sweet_id, "quantity": remaining}
+
+
+@router.post("/checkout")
+async def checkout(
+    payload: CheckoutRequest,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    """
+    Purchase every line of a cart in a single transaction.
 
-    return {"id": sweet.id, "quantity": sweet.quantity}
+    Lines for the same sweet are combined. If any line cannot be
+    fulfilled the whole checkout fails and no stock is taken.
+    """
+    amounts: dict[int, int] = {}
+    for line in payload.items:
+        amounts[line.sweet_id] = amounts.get(line.sweet_id, 0) + line.amount
+
+    with catalog_engine.change() as change:
+        async with exclusive_stock(*amounts):
+            remaining = await decrement_stock_bulk(db, amounts)
+            sold_at = utcnow()
+            await db.run_sync(record_sales, [
+                SaleLine(sweet_id, amount, sold_at)
+                for sweet_id, amount in amounts.items()
+            ])
+            await db.run_sync(change.stamp)
+            await db.commit()
+        for sweet_id, amount in amounts.items():
+            change.adjust(sweet_id, -amount)
+    catalog_cache.invalidate()
+
+    items = [
+        {"id": sweet_id, "quantity": remaining[sweet_id]}
+        for sweet_id in amounts
+    ]
+    stock_hub.publish(items)
+
+    return {"items": items}
 
 
 @router.post("/{sweet_id}/restock")
-def restock_sweet(
+async def restock_sweet(
     sweet_id: int,
     payload: RestockRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin),
 ):
     """
     Restock a sweet, increasing its stock quantity (admin only).
     """
-    sweet = get_sweet_or_404(db, sweet_id)
-
-    sweet.quantity += payload.amount
-    db.commit()
-    db.refresh(sweet)
-
-    return {"id": sweet.id, "quantity": sweet.quantity}
+    if hot_stock.is_hot(sweet_id):
+        quantity = await hot_stock.restock(db, sweet_id, payload.amount)
+    else:
+        with catalog_engine.change() as change:
+            async with exclusive_stock(sweet_id):
+                sweet = await get_sweet_or_404(db, sweet_id)
+
+                sweet.quantity += payload.amount
+                await db.run_sync(change.stamp)
+                await db.commit()
+            change.put(sweet)
+        catalog_cache.invalidate()
+        quantity = sweet.quantity
+
+    stock_hub.publish([{"id": sweet_id, "quantity": quantity}])
+
+    return {"id": sweet_id, "quantity": quantity}
@@ -0,0 +1,100 @@
+"""
+Catalog engine benchmark.
+
+Times searches without a name filter along both catalog engines, over
+the database named by `SWEETSHOP_DATABASE_URL`:
+
+- sql         `build_search_query` executed on SQLite, rows as dicts
+              (categories resolved to IDs through `category_cache`)
+- columnar    the in-memory snapshot's mask, sort and row dicts
+
+Each path produces the full result as a list of dicts, so neither is
+charged for JSON encoding. The time to build the snapshot is reported
+too. Best of several runs, in milliseconds.
+
+Usage:
+    SWEETSHOP_DATABASE_URL=sqlite:////tmp/bench.db \\
+        python -m benchmarks.seed --sweets 1000000 --users 1
+    SWEETSHOP_DATABASE_URL=sqlite:////tmp/bench.db \\
+        python -m benchmarks.catalog_engine --repeat 5
+"""
+
+import argparse
+import json
+import time
+
+SEARCHES = {
+    "price-range": {"min_price": 20.0, "max_price": 22.0},
+    "category": {"category": "fudge"},
+    "category+in-stock": {"category": "fudge", "in_stock": True},
+    "price-sorted": {"min_price": 50.0, "max_price": 51.0, "sort": "price"},
+    "quantity-sorted": {"category": "halwa", "sort": "-quantity"},
+}
+
+
+def best_of(repeat: int, run) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Imported here so `SWEETSHOP_DATABASE_URL` can be set beforehand.
+    import app.main  # noqa: F401  (creates the schema and search index)
+    from app.columnar import CatalogEngine
+    from app.categories import category_cache
+    from app.database import engine
+    from app.sweets import build_search_query
+
+    columnar = CatalogEngine(engine, enabled=True)
+    start = time.perf_counter()
+    snapshot = columnar._rebuild(0)
+    build_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    with engine.connect() as conn:
+        category_cache.load(conn)
+
+    def run_sql(filters):
+        filters = dict(filters)
+        category = filters.pop("category", None)
+        if category:
+            filters["category_ids"] = category_cache.match(category)
+        with engine.connect() as conn:
+            result = conn.execute(build_search_query(**filters)).mappings()
+            return [dict(row) for row in result]
+
+    def run_columnar(filters):
+        category = filters.get("category")
+        mask = snapshot.mask(
+            category_cache.match(category) if category else None,
+            filters.get("min_price"),
+            filters.get("max_price"),
+            filters.get("in_stock", False),
+        )
+        matches = snapshot.select(mask, category_cache.name, filters.get("sort"))
+        return matches.rows(0, len(matches))
+
+    results = {}
+    for name, filters in SEARCHES.items():
+        results[name] = {
+            "rows": len(run_columnar(filters)),
+            "sql_ms": best_of(args.repeat, lambda: run_sql(filters)),
+            "columnar_ms": best_of(args.repeat, lambda: run_columnar(filters)),
+        }
+
+    print(json.dumps({
+        "sweets": len(snapshot),
+        "snapshot_build_ms": build_ms,
+        "searches": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
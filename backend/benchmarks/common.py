@@ -0,0 +1,64 @@
+"""
+Shared helpers for the API benchmarks.
+
+The benchmarks only use the standard library so they can be pointed at
+any running server without extra dependencies.
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+
+
+def request(url: str, method: str = "GET", body: dict | None = None,
+            token: str | None = None) -> tuple[int, float]:
+    """
+    Send one JSON request and return (status code, latency in seconds).
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as res:
+            res.read()
+            code = res.status
+    except urllib.error.HTTPError as exc:
+        code = exc.code
+    return code, time.perf_counter() - start
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return the `pct` percentile of `samples` in milliseconds."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index] * 1000
+
+
+def summarize(samples: list[float], codes: list[int], duration: float) -> dict:
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "status_codes": {str(c): codes.count(c) for c in sorted(set(codes))},
+    }
+
+
+def login(url: str, credentials: dict) -> str:
+    """Log in and return an access token."""
+    req = urllib.request.Request(
+        f"{url}/api/auth/login",
+        data=json.dumps(credentials).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req) as res:
+        return json.loads(res.read())["access_token"]
@@ -0,0 +1,89 @@
+"""
+Compare two benchmark suite results and flag regressions.
+
+A metric regresses when it is worse than the baseline by more than the
+threshold: lower throughput, or higher latency or peak RSS. Exits with
+status 1 if anything regressed, so it can gate a CI job.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+# Metric -> True if higher values are better.
+METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """
+    Compare every metric of the scenarios present in both runs.
+
+    `threshold` is the tolerated change in percent.
+    """
+    rows = []
+    for scenario, before in baseline["scenarios"].items():
+        after = current["scenarios"].get(scenario)
+        if after is None:
+            continue
+
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            rows.append({
+                "scenario": scenario,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change_pct": round(change, 1),
+                "regressed": worse > threshold,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="tolerated change in percent")
+    parser.add_argument("--json", action="store_true",
+                        help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    rows = compare(baseline, current, args.threshold)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for row in rows:
+            flag = "REGRESSION" if row["regressed"] else ""
+            print(
+                f"{row['scenario']:<10} {row['metric']:<15} "
+                f"{row['baseline']:>10} {row['current']:>10} "
+                f"{row['change_pct']:>+7.1f}%  {flag}"
+            )
+
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
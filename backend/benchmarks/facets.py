@@ -0,0 +1,68 @@
+"""
+Facet computation benchmark.
+
+Builds a catalog snapshot of a synthetic catalog (no database involved)
+and times the category counts and price histogram for a few filter
+sets, reporting the best of several runs in milliseconds.
+
+Usage:
+    python -m benchmarks.facets --sweets 1000000 --categories 40
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from app.columnar import CatalogSnapshot
+
+
+def build_snapshot(sweets: int, categories: int,
+                   seed: int = 42) -> CatalogSnapshot:
+    rng = np.random.default_rng(seed)
+    snapshot = CatalogSnapshot(revision=0, capacity=sweets)
+    snapshot.ids[:] = np.arange(1, sweets + 1)
+    snapshot.category_ids[:] = rng.integers(1, categories + 1, sweets)
+    snapshot.prices[:] = np.round(rng.uniform(1, 100, sweets), 2)
+    snapshot.quantities[:] = rng.integers(0, 100, sweets)
+    snapshot.live[:] = True
+    snapshot.size = sweets
+    return snapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sweets", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(args.sweets, args.categories)
+    name_matches = random.Random(42).sample(
+        range(1, args.sweets + 1), args.sweets // 100
+    )
+
+    filter_sets = {
+        "all": {},
+        "price-range": {"min_price": 20, "max_price": 40},
+        "category": {"category_ids": [7]},
+        "category+price": {"category_ids": [7], "max_price": 50},
+        "name-1pct": {"ids": name_matches},
+    }
+
+    results = {}
+    for label, filters in filter_sets.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            snapshot.facets(snapshot.mask(**filters), price_buckets=10)
+            best = min(best, time.perf_counter() - start)
+        results[label] = {"ms": round(best * 1000, 2)}
+
+    print(json.dumps({"sweets": args.sweets, "filters": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Mixed login / catalog read load benchmark.
+
+Runs concurrent login requests (bcrypt heavy) alongside concurrent
+catalog reads against a running API server and reports p50 / p99
+latency for each, so the effect of the password process pool on read
+latency can be measured.
+
+Usage:
+    uvicorn app.main:app --workers 1
+    python -m benchmarks.login_mixed_load --url http://127.0.0.1:8000
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from benchmarks.common import login, request, summarize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--login-threads", type=int, default=16)
+    parser.add_argument("--read-threads", type=int, default=8)
+    args = parser.parse_args()
+
+    email = f"bench_{uuid.uuid4().hex}@example.com"
+    credentials = {"email": email, "password": "bench1234"}
+    request(f"{args.url}/api/auth/register", "POST", credentials)
+    token = login(args.url, credentials)
+
+    results = {"login": ([], []), "read": ([], [])}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(kind: str) -> None:
+        while time.perf_counter() < deadline:
+            if kind == "login":
+                code, latency = request(
+                    f"{args.url}/api/auth/login", "POST", credentials
+                )
+            else:
+                code, latency = request(f"{args.url}/api/sweets", token=token)
+            with lock:
+                results[kind][0].append(latency)
+                results[kind][1].append(code)
+
+    threads = [
+        threading.Thread(target=worker, args=("login",))
+        for _ in range(args.login_threads)
+    ] + [
+        threading.Thread(target=worker, args=("read",))
+        for _ in range(args.read_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {
+        kind: summarize(samples, codes, args.duration)
+        for kind, (samples, codes) in results.items()
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
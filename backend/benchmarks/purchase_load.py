@@ -0,0 +1,93 @@
+"""
+Purchase throughput benchmark.
+
+Creates a well-stocked sweet on a running API server, then fires
+concurrent single-unit purchases at it for a fixed duration and reports
+purchases per second and p50 / p99 latency. Run it once per purchase
+mode to compare per-request commits with the write-behind journal.
+
+Usage:
+    SWEETSHOP_DB_PROFILE=production uvicorn app.main:app --workers 1
+    python -m benchmarks.purchase_load --url http://127.0.0.1:8000
+
+    SWEETSHOP_DB_PROFILE=production SWEETSHOP_PURCHASE_MODE=journal \\
+        uvicorn app.main:app --workers 1
+    python -m benchmarks.purchase_load --url http://127.0.0.1:8000
+
+On a fresh database the benchmark's sweet gets ID 1, so
+`SWEETSHOP_HOT_SWEETS=1` serves it from sharded hot stock instead.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+import uuid
+
+from benchmarks.common import login, request, summarize
+
+
+def create_sweet(url: str, token: str, quantity: int) -> int:
+    """Create a sweet to buy from and return its ID."""
+    req = urllib.request.Request(
+        f"{url}/api/sweets",
+        data=json.dumps({
+            "name": f"Bench {uuid.uuid4().hex[:8]}",
+            "category": "Benchmark",
+            "price": 1.0,
+            "quantity": quantity,
+        }).encode(),
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {token}",
+        },
+        method="POST",
+    )
+    with urllib.request.urlopen(req) as res:
+        return json.loads(res.read())["id"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    credentials = {
+        "email": f"bench_{uuid.uuid4().hex}@example.com",
+        "password": "bench1234",
+    }
+    request(f"{args.url}/api/auth/register", "POST", credentials)
+    token = login(args.url, credentials)
+    sweet_id = create_sweet(args.url, token, 10**9)
+
+    samples: list[float] = []
+    codes: list[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker() -> None:
+        while time.perf_counter() < deadline:
+            code, latency = request(
+                f"{args.url}/api/sweets/{sweet_id}/purchase",
+                "POST",
+                {"amount": 1},
+                token,
+            )
+            with lock:
+                samples.append(latency)
+                codes.append(code)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps(summarize(samples, codes, args.duration), indent=2))
+
+
+if __name__ == "__main__":
+    main()
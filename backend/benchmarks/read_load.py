@@ -0,0 +1,60 @@
+"""
+Catalog read throughput benchmark.
+
+Fires concurrent `GET /api/sweets` requests at a running API server for
+a fixed duration and reports throughput and p50 / p99 latency. Run it
+with a concurrency above the server's threadpool size to see the effect
+of async request handling.
+
+Usage:
+    uvicorn app.main:app --workers 1
+    python -m benchmarks.read_load --url http://127.0.0.1:8000 --concurrency 64
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from benchmarks.common import login, request, summarize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--path", default="/api/sweets")
+    args = parser.parse_args()
+
+    credentials = {
+        "email": f"bench_{uuid.uuid4().hex}@example.com",
+        "password": "bench1234",
+    }
+    request(f"{args.url}/api/auth/register", "POST", credentials)
+    token = login(args.url, credentials)
+
+    samples: list[float] = []
+    codes: list[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker() -> None:
+        while time.perf_counter() < deadline:
+            code, latency = request(f"{args.url}{args.path}", token=token)
+            with lock:
+                samples.append(latency)
+                codes.append(code)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps(summarize(samples, codes, args.duration), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Seed a database with a large synthetic catalog and many users.
+
+Data is generated from a fixed random seed, so two runs with the same
+arguments produce the same catalog. Rows are inserted in batches with
+one executemany per batch.
+
+Usage:
+    SWEETSHOP_DATABASE_URL=sqlite:////tmp/bench.db \\
+        python -m benchmarks.seed --sweets 100000 --users 1000
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+# -------------------------------------------------------------------
+# Seed data
+# -------------------------------------------------------------------
+CATEGORIES = (
+    "Indian", "Chocolate", "Bakery", "Candy", "Toffee", "Fudge",
+    "Gummies", "Lollipops", "Marzipan", "Nougat", "Halwa", "Pastry",
+)
+ADJECTIVES = (
+    "Royal", "Golden", "Classic", "Spiced", "Crunchy", "Silky", "Smoky",
+    "Roasted", "Honey", "Saffron", "Minty", "Salted", "Double", "Tiny",
+)
+NAMES = (
+    "Ladoo", "Barfi", "Jalebi", "Truffle", "Brownie", "Macaron", "Toffee",
+    "Fudge", "Peda", "Rasgulla", "Eclair", "Praline", "Caramel", "Kaju Katli",
+)
+
+# Search terms that match seeded sweets, for the search scenarios.
+SEARCH_TERMS = tuple(word.lower() for word in ADJECTIVES + NAMES)
+
+USER_PASSWORD = "bench1234"
+BATCH_SIZE = 10_000
+
+
+def user_email(index: int) -> str:
+    """Return the email of the seeded user number `index`."""
+    return f"bench_user_{index}@example.com"
+
+
+def generate_sweets(count: int, rng: random.Random):
+    """Yield `count` sweet rows."""
+    for index in range(count):
+        yield {
+            "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NAMES)} {index}",
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(1, 100), 2),
+            "quantity": rng.randint(100, 10_000),
+        }
+
+
+def insert_batches(bind: Engine, table, rows) -> None:
+    """Insert `rows` into `table` in batches of `BATCH_SIZE`."""
+    batch = []
+    with bind.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                conn.execute(insert(table), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(table), batch)
+
+
+def seed(bind: Engine, sweets: int, users: int, admins: int = 1,
+         random_seed: int = 42) -> None:
+    """
+    Insert `sweets` sweets and `users` users (the first `admins` of
+    them administrators) into an empty database.
+
+    Every user's password is `USER_PASSWORD`.
+    """
+    # Imported here so `SWEETSHOP_DATABASE_URL` can be set beforehand.
+    from app.models import Sweet, User
+    from app.passwords import hash_password
+
+    rng = random.Random(random_seed)
+    insert_batches(bind, Sweet, generate_sweets(sweets, rng))
+
+    # bcrypt is slow; every user shares one hash.
+    password = hash_password(USER_PASSWORD)
+    insert_batches(bind, User, (
+        {
+            "email": user_email(index),
+            "password": password,
+            "is_admin": index < admins,
+            "token_version": 0,
+        }
+        for index in range(users)
+    ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sweets", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--admins", type=int, default=1)
+    args = parser.parse_args()
+
+    # Creates the schema, search index and triggers.
+    from app.database import engine
+    import app.main  # noqa: F401
+
+    start = time.perf_counter()
+    seed(engine, args.sweets, args.users, args.admins)
+    print(
+        f"Seeded {args.sweets} sweets and {args.users} users "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Response serialization benchmark.
+
+Measures what it costs to turn 10k catalog rows into a JSON response
+body, without any I/O, along the paths the API has used:
+
+- orm-jsonable      ORM instances through `jsonable_encoder` and the
+                    standard JSONResponse (the original endpoints)
+- orm-model         ORM instances validated into `SweetOut` and dumped
+                    by pydantic (typed endpoints returning ORM objects)
+- rows-jsonable     row mappings through `jsonable_encoder` and the
+                    standard JSONResponse
+- rows-orjson       row mappings rendered directly by FastJSONResponse
+                    (the list and search endpoints)
+
+Usage:
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models import Sweet
+from app.responses import FastJSONResponse
+from app.schemas import SweetOut
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "name": f"Sweet {i}",
+            "category": ("Chocolate", "Candy", "Pastry")[i % 3],
+            "price": round(1 + (i % 500) * 0.25, 2),
+            "quantity": i % 100,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def make_orm(rows: list[dict]) -> list[Sweet]:
+    return [Sweet(**row) for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    orm = make_orm(rows)
+    adapter = TypeAdapter(list[SweetOut])
+
+    paths = {
+        "orm-jsonable": lambda: JSONResponse(jsonable_encoder(orm)).body,
+        "orm-model": lambda: adapter.dump_json(adapter.validate_python(orm)),
+        "rows-jsonable": lambda: JSONResponse(jsonable_encoder(rows)).body,
+        "rows-orjson": lambda: FastJSONResponse(rows).body,
+    }
+
+    results = {}
+    for name, render in paths.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            render()
+            best = min(best, time.perf_counter() - start)
+        results[name] = {
+            "ms_per_10k_rows": round(best * 1000 * 10_000 / args.rows, 2),
+        }
+
+    print(json.dumps({"rows": args.rows, "paths": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+End-to-end benchmark suite for the Sweet Shop API.
+
+Seeds a fresh database with a synthetic catalog and users, then drives
+the real application with concurrent clients, one scenario at a time:
+
+- list      paginated catalog listing from a random cursor
+- search    name search with a price filter
+- purchase  single-unit purchases of random sweets
+- checkout  bursts of multi-line checkouts
+- login     password logins of random users
+- restock   admin restocks of random sweets
+
+The app runs either in process (through the ASGI test client, which
+leaves out HTTP parsing) or as a uvicorn server started by the suite.
+Results are printed and optionally written as JSON: throughput and
+p50 / p95 / p99 latency per scenario, plus the peak RSS of the process
+serving requests. Compare two result files with `benchmarks.compare`.
+
+Usage:
+    python -m benchmarks.suite --target inprocess --sweets 10000 \\
+        --output baseline.json
+    python -m benchmarks.suite --target uvicorn --sweets 1000000 \\
+        --users 10000 --scenarios list,search --output current.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+
+from benchmarks.common import login, request, summarize
+from benchmarks.seed import SEARCH_TERMS, USER_PASSWORD, seed, user_email
+
+
+# -------------------------------------------------------------------
+# Targets
+# -------------------------------------------------------------------
+class InProcessTarget:
+    """
+    Serves requests from the app in this process.
+    """
+
+    name = "inprocess"
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        self.client = TestClient(app)
+        # Entering the client runs the lifespan and keeps one event loop.
+        self.client.__enter__()
+
+    def request(self, method: str, path: str, body: dict | None = None,
+                token: str | None = None) -> tuple[int, float]:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        res = self.client.request(method, path, json=body, headers=headers)
+        return res.status_code, time.perf_counter() - start
+
+    def login(self, email: str) -> str:
+        res = self.client.post(
+            "/api/auth/login",
+            json={"email": email, "password": USER_PASSWORD},
+        )
+        return res.json()["access_token"]
+
+    def peak_rss_mb(self) -> float | None:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and in KiB elsewhere.
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(peak / divisor, 1)
+
+    def close(self) -> None:
+        self.client.__exit__(None, None, None)
+
+
+class UvicornTarget:
+    """
+    Serves requests from a uvicorn server started for the run.
+    """
+
+    name = "uvicorn"
+
+    def __init__(self, port: int, workers: int):
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--port", str(port),
+                "--workers", str(workers),
+                "--log-level", "warning",
+            ],
+            env=os.environ.copy(),
+        )
+        self._wait_until_ready()
+
+    def _wait_until_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                with urllib.request.urlopen(f"{self.url}/"):
+                    return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.1)
+        raise RuntimeError("uvicorn did not start in time")
+
+    def request(self, method: str, path: str, body: dict | None = None,
+                token: str | None = None) -> tuple[int, float]:
+        return request(f"{self.url}{path}", method, body, token)
+
+    def login(self, email: str) -> str:
+        return login(self.url, {"email": email, "password": USER_PASSWORD})
+
+    def peak_rss_mb(self) -> float | None:
+        """Peak RSS of the server process (Linux only)."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return None
+
+    def close(self) -> None:
+        self.process.terminate()
+        self.process.wait()
+
+
+# -------------------------------------------------------------------
+# Scenarios
+# -------------------------------------------------------------------
+@dataclass
+class Context:
+    """What scenarios need to know about the seeded data."""
+
+    max_sweet_id: int
+    users: int
+    user_token: str
+    admin_token: str
+
+
+def scenario_list(target, ctx: Context, rng: random.Random):
+    from app.sweets import encode_cursor
+
+    cursor = encode_cursor(rng.randint(0, ctx.max_sweet_id))
+    return target.request(
+        "GET", f"/api/sweets?limit=100&cursor={cursor}", token=ctx.user_token
+    )
+
+
+def scenario_search(target, ctx: Context, rng: random.Random):
+    term = rng.choice(SEARCH_TERMS)
+    max_price = rng.randint(5, 100)
+    return target.request(
+        "GET",
+        f"/api/sweets/search?name={term}&max_price={max_price}",
+        token=ctx.user_token,
+    )
+
+
+def scenario_purchase(target, ctx: Context, rng: random.Random):
+    sweet_id = rng.randint(1, ctx.max_sweet_id)
+    return target.request(
+        "POST", f"/api/sweets/{sweet_id}/purchase", {"amount": 1},
+        ctx.user_token,
+    )
+
+
+def scenario_checkout(target, ctx: Context, rng: random.Random):
+    items = [
+        {"sweet_id": rng.randint(1, ctx.max_sweet_id), "amount": 1}
+        for _ in range(rng.randint(2, 5))
+    ]
+    return target.request(
+        "POST", "/api/sweets/checkout", {"items": items}, ctx.user_token
+    )
+
+
+def scenario_login(target, ctx: Context, rng: random.Random):
+    credentials = {
+        "email": user_email(rng.randrange(ctx.users)),
+        "password": USER_PASSWORD,
+    }
+    return target.request("POST", "/api/auth/login", credentials)
+
+
+def scenario_restock(target, ctx: Context, rng: random.Random):
+    sweet_id = rng.randint(1, ctx.max_sweet_id)
+    return target.request(
+        "POST", f"/api/sweets/{sweet_id}/restock", {"amount": 5},
+        ctx.admin_token,
+    )
+
+
+SCENARIOS = {
+    "list": scenario_list,
+    "search": scenario_search,
+    "purchase": scenario_purchase,
+    "checkout": scenario_checkout,
+    "login": scenario_login,
+    "restock": scenario_restock,
+}
+
+
+def run_scenario(target, ctx: Context, scenario, duration: float,
+                 concurrency: int) -> dict:
+    """
+    Run one scenario from `concurrency` threads for `duration` seconds.
+    """
+    samples: list[float] = []
+    codes: list[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            code, latency = scenario(target, ctx, rng)
+            with lock:
+                samples.append(latency)
+                codes.append(code)
+
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = summarize(samples, codes, duration)
+    result["peak_rss_mb"] = target.peak_rss_mb()
+    return result
+
+
+# -------------------------------------------------------------------
+# Entry point
+# -------------------------------------------------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"),
+                        default="inprocess")
+    parser.add_argument("--sweets", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--database-url",
+                        help="reuse a database seeded by a previous run")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Must be set before the app is imported.
+    must_seed = args.database_url is None
+    if must_seed:
+        workdir = tempfile.mkdtemp(prefix="sweetshop-bench-")
+        args.database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["SWEETSHOP_DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import func, select
+
+    import app.main  # noqa: F401  (creates the schema)
+    from app.database import engine
+    from app.models import Sweet
+
+    if must_seed:
+        start = time.perf_counter()
+        seed(engine, args.sweets, args.users)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    with engine.connect() as conn:
+        max_sweet_id = conn.execute(select(func.max(Sweet.id))).scalar() or 0
+
+    if args.target == "uvicorn":
+        target = UvicornTarget(args.port, args.workers)
+    else:
+        target = InProcessTarget()
+
+    try:
+        ctx = Context(
+            max_sweet_id=max_sweet_id,
+            users=args.users,
+            user_token=target.login(user_email(min(1, args.users - 1))),
+            admin_token=target.login(user_email(0)),
+        )
+
+        results = {}
+        for name in scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = run_scenario(
+                target, ctx, SCENARIOS[name], args.duration, args.concurrency
+            )
+    finally:
+        target.close()
+
+    report = {
+        "meta": {
+            "target": target.name,
+            "sweets": max_sweet_id,
+            "users": args.users,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers if target.name == "uvicorn" else None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "scenarios": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
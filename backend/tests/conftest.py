@@ -0,0 +1,47 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Before the app is imported: keep the journal out of the source tree.
+os.environ.setdefault(
+    "SWEETSHOP_JOURNAL_PATH",
+    os.path.join(tempfile.mkdtemp(prefix="sweetshop-"), "purchases.journal"),
+)
+
+import app.sweets as sweets_module  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.purchase_journal import PurchaseJournal  # noqa: E402
+
+client = TestClient(app)
+
+
+def create_sweet(headers, name=None, quantity=10, category="Indian", price=10.0):
+    """Create a sweet through the API and return its ID."""
+    res = client.post(
+        "/api/sweets",
+        json={
+            "name": name or f"Sweet {uuid.uuid4().hex[:8]}",
+            "category": category,
+            "price": price,
+            "quantity": quantity,
+        },
+        headers=headers,
+    )
+    assert res.status_code == 201
+    return res.json()["id"]
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """A purchase journal in a temporary file, used by the purchase routes."""
+    journal = PurchaseJournal(
+        str(tmp_path / "purchases.journal"), engine, 0.002, enabled=True
+    )
+    journal.recover()
+    monkeypatch.setattr(sweets_module, "purchase_journal", journal)
+    yield journal
+    journal.shutdown()
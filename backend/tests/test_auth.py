@@ -1,5 +1,14 @@
+import asyncio
+from contextlib import contextmanager
+
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import auth
+from app.cache import MISSING
 from app.main import app
+from app.database import SessionLocal, async_engine
+from app.models import User
+from app.passwords import password_pool
 import uuid
 
 client = TestClient(app)
@@ -26,3 +35,107 @@ def test_register_and_login():
     data = res.json()
     assert "access_token" in data
     assert data["token_type"] == "bearer"
+
+
+def register_and_login(email, password="test1234"):
+    client.post("/api/auth/register", json={
+        "email": email,
+        "password": password
+    })
+    res = client.post("/api/auth/login", json={
+        "email": email,
+        "password": password
+    })
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@contextmanager
+def recorded_statements():
+    """Collect the SQL statements run by requests inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # Requests run on the async engine; its events fire on `sync_engine`.
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_claims_mode_uses_user_cache(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_MODE", "claims")
+    headers = register_and_login(f"claims_{uuid.uuid4().hex}@example.com")
+
+    # First request misses the cache and loads the user record.
+    with recorded_statements() as cold:
+        assert client.get("/api/sweets", headers=headers).status_code == 200
+    assert any("FROM users" in s for s in cold), cold
+
+    # Second request must not touch the users table at all.
+    with recorded_statements() as warm:
+        assert client.get("/api/sweets", headers=headers).status_code == 200
+    assert not any("FROM users" in s for s in warm), warm
+
+
+def test_revoke_invalidates_existing_tokens(monkeypatch):
+    for mode in ("database", "claims"):
+        monkeypatch.setattr(auth, "AUTH_MODE", mode)
+        headers = register_and_login(f"revoke_{uuid.uuid4().hex}@example.com")
+
+        assert client.get("/api/sweets", headers=headers).status_code == 200
+        assert client.post("/api/auth/revoke", headers=headers).status_code == 200
+
+        res = client.get("/api/sweets", headers=headers)
+        assert res.status_code == 401
+        assert res.json()["detail"] == "Token has been revoked"
+
+
+def test_user_loaded_across_an_invalidation_is_not_cached():
+    class RevokedWhileLoading:
+        async def get(self, model, user_id):
+            auth.invalidate_user(user_id)
+            return User(id=user_id, email="late@example.com",
+                        is_admin=False, token_version=0)
+
+    user_id = 10**9 + uuid.uuid4().int % 10**9
+    user = asyncio.run(auth.get_cached_user(RevokedWhileLoading(), user_id))
+
+    assert user.id == user_id
+    assert auth.user_cache.get(user_id) is MISSING
+
+
+def test_orm_changes_invalidate_cached_users_on_commit(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_MODE", "claims")
+    email = f"commit_{uuid.uuid4().hex}@example.com"
+    headers = register_and_login(email)
+    assert client.get("/api/sweets", headers=headers).status_code == 200
+
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == email).one()
+        user.token_version += 1
+        db.flush()
+        assert auth.user_cache.get(user.id) is not MISSING
+
+        db.commit()
+        assert auth.user_cache.get(user.id) is MISSING
+
+
+def test_login_sheds_load_when_password_pool_is_full(monkeypatch):
+    email = f"busy_{uuid.uuid4().hex}@example.com"
+    client.post("/api/auth/register", json={
+        "email": email,
+        "password": "test1234"
+    })
+
+    monkeypatch.setattr(password_pool, "max_pending", 0)
+
+    res = client.post("/api/auth/login", json={
+        "email": email,
+        "password": "test1234"
+    })
+
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
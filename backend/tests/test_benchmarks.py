@@ -0,0 +1,18 @@
+from benchmarks.compare import compare
+
+
+def run(throughput, p99):
+    return {"scenarios": {"list": {"throughput_rps": throughput, "p99_ms": p99}}}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    rows = compare(run(100, 50), run(85, 52), threshold=10)
+    regressed = {row["metric"]: row["regressed"] for row in rows}
+
+    assert regressed == {"throughput_rps": True, "p99_ms": False}
+
+
+def test_compare_treats_improvements_as_passing():
+    rows = compare(run(100, 50), run(150, 20), threshold=10)
+
+    assert not any(row["regressed"] for row in rows)
@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.test_auth import register_and_login
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def search(headers, name):
+    res = client.get(f"/api/sweets/search?name={name}", headers=headers)
+    return res.json()
+
+
+def test_import_csv():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+    upload = (
+        "name,category,price,quantity\n"
+        f"Csv{tag} Ladoo,Indian,10.5,20\n"
+        f"Csv{tag} Barfi,Indian,12,0\n"
+    )
+
+    res = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", upload, "text/csv")},
+        headers=headers
+    )
+
+    assert res.status_code == 200
+    assert res.json() == {"imported": 2}
+    assert len(search(headers, f"csv{tag}")) == 2
+
+
+def test_import_ndjson():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+    upload = "\n".join(
+        json.dumps({
+            "name": f"Nd{tag} {i}",
+            "category": "Bakery",
+            "price": 3,
+            "quantity": i
+        })
+        for i in range(5)
+    )
+
+    res = client.post(
+        "/api/sweets/import?format=ndjson",
+        files={"file": ("upload.txt", upload)},
+        headers=headers
+    )
+
+    assert res.json() == {"imported": 5}
+    assert len(search(headers, f"nd{tag}")) == 5
+
+
+def test_import_is_rejected_when_any_row_is_invalid():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+    upload = (
+        "name,category,price,quantity\n"
+        f"Bad{tag} Ladoo,Indian,10,5\n"
+        f"Bad{tag} Barfi,Indian,-1,5\n"
+    )
+
+    res = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", upload)},
+        headers=headers
+    )
+
+    assert res.status_code == 422
+    assert res.json()["detail"]["errors"][0]["line"] == 3
+    assert search(headers, f"bad{tag}") == []
+
+
+def test_import_requires_admin():
+    headers = register_and_login(f"user_{uuid.uuid4().hex}@example.com")
+
+    res = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", "name,category,price,quantity\n")},
+        headers=headers
+    )
+
+    assert res.status_code == 403
+
+
+def test_export_streams_whole_catalog():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+    client.post(
+        "/api/sweets/import",
+        files={"file": (
+            "sweets.csv",
+            f"name,category,price,quantity\nExport{tag},Indian,4,2\n",
+        )},
+        headers=headers
+    )
+
+    res = client.get("/api/sweets/export", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    exported = [r for r in rows if r["name"] == f"Export{tag}"]
+    assert exported[0]["quantity"] == "2"
+
+    res = client.get("/api/sweets/export?format=ndjson", headers=headers)
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert len(lines) == len(rows)
+    assert any(line["name"] == f"Export{tag}" for line in lines)
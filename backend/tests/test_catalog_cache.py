@@ -0,0 +1,117 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.cache import MISSING
+from app.catalog_cache import CatalogCache, LocalCacheBackend
+from app.database import async_engine
+from app.main import app
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def count_sweet_queries(action):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM sweets" in statement:
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        action()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+def test_repeated_search_is_served_from_cache():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+    create_sweet(headers, f"Cached{tag}", 10)
+
+    url = f"/api/sweets/search?name=cached{tag}"
+    first = client.get(url, headers=headers).json()
+
+    queries = count_sweet_queries(lambda: client.get(url, headers=headers))
+    assert queries == 0
+
+    second = client.get(url, headers=headers).json()
+    assert first == second
+
+
+def test_writes_invalidate_cached_results():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+    sweet_id = create_sweet(headers, f"Fresh{tag}", 10)
+
+    url = f"/api/sweets/search?name=fresh{tag}"
+    assert client.get(url, headers=headers).json()[0]["quantity"] == 10
+
+    client.post(f"/api/sweets/{sweet_id}/purchase", headers=headers)
+    assert client.get(url, headers=headers).json()[0]["quantity"] == 9
+
+    client.post(
+        f"/api/sweets/{sweet_id}/restock",
+        json={"amount": 5},
+        headers=headers
+    )
+    assert client.get(url, headers=headers).json()[0]["quantity"] == 14
+
+    client.delete(f"/api/sweets/{sweet_id}", headers=headers)
+    assert client.get(url, headers=headers).json() == []
+
+
+def test_local_backend_evicts_least_recently_used():
+    cache = CatalogCache(LocalCacheBackend(maxsize=2))
+
+    first = cache.key("search", "a")
+    cache.set(first, ["a"])
+    cache.set(cache.key("search", "b"), ["b"])
+    cache.get(first)
+    cache.set(cache.key("search", "c"), ["c"])
+
+    assert cache.get(first) == ["a"]
+    assert cache.get(cache.key("search", "b")) is MISSING
+
+
+def test_invalidate_changes_keys():
+    cache = CatalogCache(LocalCacheBackend(maxsize=10))
+
+    key = cache.key("list", 100, None)
+    cache.set(key, {"items": []})
+    cache.invalidate()
+
+    assert cache.key("list", 100, None) != key
+    assert cache.get(cache.key("list", 100, None)) is MISSING
+
+
+def test_conditional_get_returns_304_until_catalog_changes():
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Etag{uuid.uuid4().hex[:8]}", 10)
+
+    for url in ("/api/sweets?limit=5", "/api/sweets/search?name=etag"):
+        res = client.get(url, headers=headers)
+        etag = res.headers["ETag"]
+        assert res.status_code == 200
+        assert res.headers["Cache-Control"] == "no-cache"
+
+        conditional = {**headers, "If-None-Match": etag}
+        queries = []
+
+        def revalidate():
+            queries.append(client.get(url, headers=conditional))
+
+        assert count_sweet_queries(revalidate) == 0
+        assert queries[0].status_code == 304
+        assert queries[0].content == b""
+        assert queries[0].headers["ETag"] == etag
+
+        client.post(f"/api/sweets/{sweet_id}/purchase", headers=headers)
+
+        res = client.get(url, headers=conditional)
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
@@ -0,0 +1,119 @@
+import sqlite3
+import uuid
+from contextlib import closing
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+from app.categories import CategoryCache
+from app.database import engine
+from app.main import app
+from app.models import Category, Sweet
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def category_counts(headers):
+    res = client.get("/api/categories", headers=headers)
+    assert res.status_code == 200
+    return {c["name"]: c["count"] for c in res.json()}
+
+
+def search_ids(headers, **params):
+    res = client.get("/api/sweets/search", params=params, headers=headers)
+    assert res.status_code == 200
+    return sorted(s["id"] for s in res.json())
+
+
+def test_spellings_of_a_category_are_interned_once():
+    headers = get_admin_headers()
+    category = f"Intern{uuid.uuid4().hex[:8]}"
+
+    first = create_sweet(headers, category=category)
+    second = create_sweet(headers, category=f"  {category.lower()} ")
+
+    assert category_counts(headers)[category] == 2
+    assert search_ids(headers, category=category.upper()) == sorted(
+        [first, second]
+    )
+    res = client.get("/api/sweets/search", params={"category": category},
+                     headers=headers)
+    assert {s["category"] for s in res.json()} == {category}
+
+
+def test_exact_category_match_excludes_prefixes():
+    headers = get_admin_headers()
+    word = f"Exact{uuid.uuid4().hex[:8]}"
+    short = create_sweet(headers, category=word)
+    longer = create_sweet(headers, category=f"{word}er Fudge")
+
+    assert search_ids(headers, category=word) == [short, longer]
+    assert search_ids(headers, category=word.lower(),
+                      category_match="exact") == [short]
+    assert search_ids(headers, category=f"{word} toffee",
+                      category_match="exact") == []
+
+
+def test_counts_follow_moves_and_deletes():
+    headers = get_admin_headers()
+    old = f"Old{uuid.uuid4().hex[:8]}"
+    new = f"New{uuid.uuid4().hex[:8]}"
+    sweet_id = create_sweet(headers, category=old)
+    create_sweet(headers, category=old)
+
+    client.put(
+        f"/api/sweets/{sweet_id}",
+        json={"name": "Moved Barfi", "category": new,
+              "price": 2.0, "quantity": 5},
+        headers=headers,
+    )
+    counts = category_counts(headers)
+    assert (counts[old], counts[new]) == (1, 1)
+
+    client.delete(f"/api/sweets/{sweet_id}", headers=headers)
+    assert new not in category_counts(headers)
+
+
+def test_rows_inserted_by_other_sqlite_clients_are_assigned_a_category():
+    # A plain sqlite3 connection has none of the app's SQL functions;
+    # the triggers trim and fold ASCII case as the API does.
+    category = f"Eclair{uuid.uuid4().hex[:8]}"
+    with closing(sqlite3.connect(engine.url.database)) as conn, conn:
+        conn.execute(
+            "INSERT INTO sweets (name, category, price, quantity) "
+            "VALUES ('Raw Barfi', ?, 1.0, 1)",
+            (f" {category}\t",),
+        )
+
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(Sweet.category_id, Category.name, Category.sweet_count)
+            .join(Category, Category.id == Sweet.category_id)
+            .where(Sweet.name == "Raw Barfi")
+            .order_by(Sweet.id.desc())
+        ).first()
+
+    assert (row.name, row.sweet_count) == (category, 1)
+
+    create_sweet(get_admin_headers(), category=f"{category.upper()}\n")
+    assert category_counts(get_admin_headers())[category] == 2
+
+
+def test_cache_loads_categories_committed_out_of_id_order():
+    cache = CategoryCache()
+    with engine.begin() as conn:
+        conn.execute(insert(Category).values(
+            name="Late", key=f"late{uuid.uuid4().hex}", sweet_count=0,
+        ))
+        cache.load(conn)
+        # Committed after a higher ID was already loaded.
+        low_id = conn.execute(select(func.min(Category.id))).scalar_one() - 1
+        conn.execute(insert(Category).values(
+            id=low_id, name="Early", key=f"early{uuid.uuid4().hex}",
+            sweet_count=0,
+        ))
+        cache.load(conn)
+
+    assert cache.name(low_id) == "Early"
@@ -0,0 +1,142 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.columnar import CatalogSnapshot, catalog_engine
+from app.main import app
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def columnar(monkeypatch):
+    monkeypatch.setattr(catalog_engine, "enabled", True)
+    catalog_engine.discard()
+    yield catalog_engine
+    catalog_engine.discard()
+
+
+INDIAN, CHOCOLATE, FROZEN = 1, 2, 3
+CATEGORIES = {INDIAN: "Indian", CHOCOLATE: "Chocolate", FROZEN: "Frozen"}
+
+
+def make_snapshot():
+    return CatalogSnapshot.from_rows([
+        (1, "Ladoo", INDIAN, 2.5, 10),
+        (2, "Truffle", CHOCOLATE, 4.0, 0),
+        (4, "Barfi", INDIAN, 1.0, 3),
+        (7, "Fudge", CHOCOLATE, 4.0, 8),
+    ], revision=0)
+
+
+def select(snapshot, mask, sort=None):
+    return snapshot.select(mask, CATEGORIES.get, sort)
+
+
+def ids(matches):
+    return [int(i) for i in matches.ids]
+
+
+def test_snapshot_filters_and_sorts():
+    snapshot = make_snapshot()
+
+    indian = select(snapshot, snapshot.mask(category_ids=[INDIAN]))
+    assert ids(indian) == [1, 4]
+    assert indian.rows(0, 1) == [{
+        "id": 1, "name": "Ladoo", "category": "Indian",
+        "price": 2.5, "quantity": 10,
+    }]
+
+    in_stock = snapshot.mask(min_price=2, in_stock=True)
+    assert ids(select(snapshot, in_stock, "price")) == [1, 7]
+    # Ties are in ID order, reversed for descending sorts.
+    assert ids(select(snapshot, snapshot.mask(), "-price")) == [7, 2, 1, 4]
+    assert ids(select(snapshot, snapshot.mask(), "quantity")) == [2, 4, 7, 1]
+
+
+def test_snapshot_applies_deltas_in_place():
+    snapshot = make_snapshot()
+
+    snapshot.apply([
+        ("put", {"id": 9, "name": "Kulfi", "category_id": FROZEN,
+                 "price": 3.0, "quantity": 5}),
+        ("put", {"id": 3, "name": "Peda", "category_id": INDIAN,
+                 "price": 1.5, "quantity": 2}),
+        ("put", {"id": 1, "name": "Motichoor Ladoo", "category_id": INDIAN,
+                 "price": 2.5, "quantity": 10}),
+        ("adjust", 4, -3),
+        ("remove", 2),
+    ])
+
+    everything = select(snapshot, snapshot.mask())
+    assert ids(everything) == [1, 3, 4, 7, 9]
+    assert everything.rows(0, 1)[0]["name"] == "Motichoor Ladoo"
+    assert ids(select(snapshot, snapshot.mask(in_stock=True))) == [1, 3, 7, 9]
+    assert ids(select(snapshot, snapshot.mask(category_ids=[FROZEN]))) == [9]
+
+
+def test_snapshot_grows_past_its_capacity():
+    snapshot = CatalogSnapshot(revision=0, capacity=2)
+
+    for sweet_id in range(1, 6):
+        snapshot.put({"id": sweet_id, "name": f"Sweet {sweet_id}",
+                      "category_id": INDIAN, "price": 1.0,
+                      "quantity": sweet_id})
+
+    assert len(snapshot) == 5
+    assert ids(select(snapshot, snapshot.mask(), "-quantity")) == [5, 4, 3, 2, 1]
+
+
+def search(headers, **params):
+    res = client.get("/api/sweets/search", params=params, headers=headers)
+    assert res.status_code == 200
+    return res.json()
+
+
+def test_search_follows_writes_without_rebuilding(columnar):
+    headers = get_admin_headers()
+    category = f"Col{uuid.uuid4().hex[:8]}"
+    cheap = create_sweet(headers, quantity=1, category=category, price=1.5)
+    dear = create_sweet(headers, quantity=4, category=category, price=9.0)
+
+    assert [s["id"] for s in search(headers, category=category,
+                                    sort="-price")] == [dear, cheap]
+    snapshot = columnar._snapshot
+
+    client.post(f"/api/sweets/{cheap}/purchase", json={"amount": 1},
+                headers=headers)
+    client.put(
+        f"/api/sweets/{dear}",
+        json={"name": "Columnar Dear", "category": category,
+              "price": 0.5, "quantity": 4},
+        headers=headers,
+    )
+    added = create_sweet(headers, quantity=2, category=category, price=5.0)
+
+    results = search(headers, category=category, in_stock="true", sort="price")
+    assert [(s["id"], s["price"]) for s in results] == [(dear, 0.5), (added, 5.0)]
+    assert columnar._snapshot is snapshot
+
+    client.delete(f"/api/sweets/{added}", headers=headers)
+    assert [s["id"] for s in search(headers, category=category)] == [cheap, dear]
+    assert columnar._snapshot is snapshot
+
+
+def test_search_matches_the_sql_engine(columnar):
+    headers = get_admin_headers()
+    category = f"Same{uuid.uuid4().hex[:8]}"
+    for price, quantity in ((3.0, 0), (1.0, 5), (3.0, 2), (7.5, 1)):
+        create_sweet(headers, quantity=quantity, category=category, price=price)
+
+    shapes = [
+        {"category": category, "sort": "price"},
+        {"category": category, "sort": "-quantity", "in_stock": "true"},
+        {"category": category, "min_price": 2, "max_price": 7, "sort": "-price"},
+    ]
+    columnar_results = [search(headers, **params) for params in shapes]
+
+    columnar.enabled = False
+    assert [search(headers, **params) for params in shapes] == columnar_results
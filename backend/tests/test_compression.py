@@ -0,0 +1,81 @@
+import gzip
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import sweets
+from app.compression import negotiate_encoding
+from app.main import app
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def test_negotiate_encoding_follows_q_values():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("deflate") is None
+    assert negotiate_encoding("") is None
+
+
+def test_large_responses_are_gzipped_small_ones_are_not():
+    headers = get_admin_headers()
+    for i in range(30):
+        create_sweet(headers, f"Bulky {i}", 1)
+
+    res = client.get(
+        "/api/sweets",
+        params={"limit": 30},
+        headers={**headers, "Accept-Encoding": "gzip"},
+    )
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert res.headers["etag"].startswith("W/")
+    assert len(res.json()["items"]) == 30
+
+    res = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+    assert res.json() == {"message": "Sweet Shop API running"}
+
+
+def test_gzipped_body_decodes_to_the_plain_body():
+    headers = get_admin_headers()
+    for i in range(30):
+        create_sweet(headers, f"Bulky {i}", 1)
+    params = {"name": "bulky"}
+
+    plain = client.get(
+        "/api/sweets/search", params=params,
+        headers={**headers, "Accept-Encoding": "identity"},
+    )
+    with client.stream(
+        "GET", "/api/sweets/search", params=params,
+        headers={**headers, "Accept-Encoding": "gzip"},
+    ) as res:
+        raw = b"".join(res.iter_raw())
+
+    assert "content-encoding" not in plain.headers
+    assert gzip.decompress(raw) == plain.content
+
+
+def test_search_streams_results_larger_than_the_cache_limit(monkeypatch):
+    monkeypatch.setattr(sweets, "STREAM_BATCH_SIZE", 2)
+    monkeypatch.setattr(sweets, "CATALOG_CACHE_MAX_ROWS", 3)
+    headers = get_admin_headers()
+    word = f"Stream{uuid.uuid4().hex[:8]}"
+    ids = [create_sweet(headers, f"{word} {i}", 1) for i in range(5)]
+
+    stored = []
+    monkeypatch.setattr(
+        sweets.catalog_cache, "set", lambda key, value: stored.append(value)
+    )
+
+    res = client.get("/api/sweets/search", params={"name": word}, headers=headers)
+    assert res.status_code == 200
+    assert sorted(item["id"] for item in res.json()) == sorted(ids)
+    assert stored == []
+
+    res = client.get("/api/sweets", params={"limit": 3}, headers=headers)
+    assert len(res.json()["items"]) == 3
+    assert stored == [res.json()]
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+
+from app.database import build_engines, to_async_url
+
+
+def read_pragmas(engine, names):
+    with engine.connect() as conn:
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in names
+        }
+
+
+def test_to_async_url():
+    assert to_async_url("sqlite:///tmp/x.db") == "sqlite+aiosqlite:///tmp/x.db"
+    assert (
+        to_async_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+    )
+
+
+def test_production_profile_applies_pragmas(tmp_path):
+    url = f"sqlite:///{tmp_path / 'prod.db'}"
+    engine, async_engine = build_engines(url, to_async_url(url), "production")
+
+    pragmas = read_pragmas(
+        engine,
+        ["journal_mode", "synchronous", "busy_timeout", "cache_size"],
+    )
+
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,  # NORMAL
+        "busy_timeout": 5000,
+        "cache_size": -65536,
+    }
+    engine.dispose()
+
+
+def test_default_profile_keeps_rollback_journal(tmp_path):
+    url = f"sqlite:///{tmp_path / 'dev.db'}"
+    engine, async_engine = build_engines(url, to_async_url(url), "default")
+
+    pragmas = read_pragmas(engine, ["journal_mode", "busy_timeout"])
+
+    assert pragmas == {"journal_mode": "delete", "busy_timeout": 5000}
+    engine.dispose()
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    url = f"sqlite:///{tmp_path / 'x.db'}"
+
+    with pytest.raises(ValueError):
+        build_engines(url, to_async_url(url), "turbo")
@@ -0,0 +1,111 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.columnar import CatalogSnapshot, catalog_engine
+from app.main import app
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def test_facets_count_categories_and_prices():
+    chocolate, gummy, hard_candy = 1, 2, 3
+    snapshot = CatalogSnapshot.from_rows([
+        (1, "Truffle", chocolate, 1.0, 1),
+        (2, "Bear", gummy, 2.0, 1),
+        (3, "Worm", gummy, 3.0, 1),
+        (4, "Fudge", chocolate, 4.0, 1),
+        (5, "Ring", gummy, 5.0, 1),
+        (6, "Drop", hard_candy, 10.0, 1),
+    ], revision=0)
+
+    facets = snapshot.facets(snapshot.mask(max_price=5), price_buckets=2)
+
+    assert facets["total"] == 5
+    assert facets["categories"] == [
+        {"category_id": gummy, "count": 3},
+        {"category_id": chocolate, "count": 2},
+    ]
+    assert facets["price_histogram"] == [
+        {"min": 1.0, "max": 3.0, "count": 2},
+        {"min": 3.0, "max": 5.0, "count": 3},
+    ]
+
+
+def test_search_returns_facets_with_results():
+    headers = get_admin_headers()
+    category = f"Facet{uuid.uuid4().hex[:8]}"
+    word = f"fz{uuid.uuid4().hex[:8]}"
+    create_sweet(headers, f"{word} Bar", category=category, price=2)
+    create_sweet(headers, f"{word} Drop", category=category, price=4)
+    create_sweet(headers, "Plain Bar", category=category, price=6)
+
+    res = client.get(
+        "/api/sweets/search",
+        params={"category": category, "facets": "true", "price_buckets": 2},
+        headers=headers,
+    )
+    body = res.json()
+
+    assert res.status_code == 200
+    assert len(body["items"]) == 3
+    assert body["facets"]["total"] == 3
+    assert body["facets"]["categories"] == [{"category": category, "count": 3}]
+    assert [b["count"] for b in body["facets"]["price_histogram"]] == [1, 2]
+
+    res = client.get(
+        "/api/sweets/search",
+        params={"name": word, "category": category, "facets": "true"},
+        headers=headers,
+    )
+    assert res.json()["facets"]["total"] == 2
+    assert len(res.json()["items"]) == 2
+
+
+def test_in_stock_facets_count_only_the_returned_items():
+    headers = get_admin_headers()
+    category = f"Stock{uuid.uuid4().hex[:8]}"
+    create_sweet(headers, "Stocked Drop", category=category, price=2)
+    create_sweet(headers, "Sold Out Drop", 0, category=category, price=4)
+
+    res = client.get(
+        "/api/sweets/search",
+        params={"category": category, "in_stock": "true", "facets": "true"},
+        headers=headers,
+    )
+    body = res.json()
+
+    assert [s["name"] for s in body["items"]] == ["Stocked Drop"]
+    assert body["facets"]["total"] == 1
+    assert body["facets"]["categories"] == [{"category": category, "count": 1}]
+
+
+def test_facets_follow_writes_without_rebuilding():
+    headers = get_admin_headers()
+    category = f"Rev{uuid.uuid4().hex[:8]}"
+    sweet_id = create_sweet(headers, "Revision Drop", category=category, price=1.5)
+    params = {"category": category, "facets": "true", "in_stock": "true"}
+
+    client.get("/api/sweets/search", params=params, headers=headers)
+    snapshot = catalog_engine._snapshot
+
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 10},
+                headers=headers)
+    facets = client.get(
+        "/api/sweets/search", params=params, headers=headers
+    ).json()["facets"]
+    assert facets["total"] == 0
+
+    client.put(
+        f"/api/sweets/{sweet_id}",
+        json={"name": "Revision Drop", "category": category,
+              "price": 9.5, "quantity": 10},
+        headers=headers,
+    )
+    facets = client.get(
+        "/api/sweets/search", params=params, headers=headers
+    ).json()["facets"]
+    assert facets["price_histogram"][0]["min"] == 9.5
+    assert catalog_engine._snapshot is snapshot
@@ -0,0 +1,104 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.sweets as sweets_module
+from app.database import SessionLocal, engine
+from app.hot_stock import HotStockEngine, ShardedStock, ShardsClosed
+from app.main import app
+from app.models import Sweet
+from app.sales import SaleLine, utcnow
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def hot_stock(monkeypatch):
+    hot_stock = HotStockEngine(engine, set(), shards=4, interval=0.002)
+    monkeypatch.setattr(sweets_module, "hot_stock", hot_stock)
+    yield hot_stock
+    hot_stock.shutdown()
+
+
+def stored_quantity(sweet_id):
+    db = SessionLocal()
+    try:
+        return db.get(Sweet, sweet_id).quantity
+    finally:
+        db.close()
+
+
+def test_sharded_stock_rebalances_when_shards_run_dry():
+    stock = ShardedStock(10, 4)
+    assert [shard.quantity for shard in stock.shards] == [3, 3, 2, 2]
+
+    # No single shard holds 5 units, so the shards are pooled.
+    sale = SaleLine(1, 5, utcnow())
+    assert stock.take(5, start=0, sale=sale)
+    assert stock.total() == 5
+    quantities = [shard.quantity for shard in stock.shards]
+    assert max(quantities) - min(quantities) <= 1
+
+    assert not stock.take(6, start=1)
+    stock.add(2, start=3)
+    # The sale is drained with the stock change it came from.
+    assert stock.drain() == (-3, [sale])
+    assert stock.drain() == (0, [])
+
+    stock.close()
+    with pytest.raises(ShardsClosed):
+        stock.take(1, start=0)
+
+
+def test_hot_purchases_do_not_oversell(hot_stock):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Hot {uuid.uuid4().hex}", 10)
+    hot_stock.hot_ids.add(sweet_id)
+
+    def buy(_):
+        return client.post(
+            f"/api/sweets/{sweet_id}/purchase", headers=headers
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(buy, range(20)))
+
+    assert codes.count(200) == 10
+    assert codes.count(409) == 10
+    assert stored_quantity(sweet_id) == 0
+
+
+def test_hot_restock_and_update_reconcile(hot_stock):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Hot {uuid.uuid4().hex}", 5)
+    hot_stock.hot_ids.add(sweet_id)
+
+    res = client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 4},
+                      headers=headers)
+    assert res.json() == {"id": sweet_id, "quantity": 1}
+
+    res = client.post(f"/api/sweets/{sweet_id}/restock", json={"amount": 10},
+                      headers=headers)
+    assert res.json() == {"id": sweet_id, "quantity": 11}
+    assert stored_quantity(sweet_id) == 11
+
+    # A direct update replaces the in-memory counters.
+    client.put(f"/api/sweets/{sweet_id}", json={
+        "name": "Hot",
+        "category": "Indian",
+        "price": 10.0,
+        "quantity": 3
+    }, headers=headers)
+
+    res = client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 4},
+                      headers=headers)
+    assert res.status_code == 409
+
+    res = client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 3},
+                      headers=headers)
+    assert res.json()["quantity"] == 0
+    assert stored_quantity(sweet_id) == 0
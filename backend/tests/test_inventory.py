@@ -0,0 +1,101 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.database import engine
+from app.main import app
+from app.models import InventoryTotals
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def category_totals(headers, category):
+    summary = client.get("/api/admin/summary", headers=headers).json()
+    for row in summary["categories"]:
+        if row["category"] == category:
+            return row
+    return None
+
+
+def test_summary_follows_every_stock_change():
+    headers = get_admin_headers()
+    category = f"Sum{uuid.uuid4().hex[:8]}"
+    other = f"Sum{uuid.uuid4().hex[:8]}"
+
+    first = create_sweet(headers, quantity=20, category=category, price=2.5)
+    second = create_sweet(headers, quantity=3, category=category, price=0.1)
+    assert category_totals(headers, category) == {
+        "category": category,
+        "skus": 2,
+        "units": 23,
+        "stock_value": 50.3,
+        "low_stock": 1,
+    }
+
+    client.post(f"/api/sweets/{first}/purchase", json={"amount": 15},
+                headers=headers)
+    client.post(f"/api/sweets/{second}/restock", json={"amount": 10},
+                headers=headers)
+    assert category_totals(headers, category) == {
+        "category": category,
+        "skus": 2,
+        "units": 18,
+        "stock_value": 13.8,
+        "low_stock": 1,
+    }
+
+    client.put(
+        f"/api/sweets/{second}",
+        json={"name": "Moved", "category": other, "price": 0.1, "quantity": 13},
+        headers=headers,
+    )
+    assert category_totals(headers, other)["skus"] == 1
+    assert category_totals(headers, category)["units"] == 5
+
+    client.delete(f"/api/sweets/{first}", headers=headers)
+    assert category_totals(headers, category) is None
+
+    res = client.post("/api/admin/summary/rebuild", headers=headers)
+    assert res.json() == {"consistent": True, "drift": []}
+
+
+def test_summary_lists_lowest_stock_first():
+    headers = get_admin_headers()
+    category = f"Low{uuid.uuid4().hex[:8]}"
+    ids = [
+        create_sweet(headers, quantity=quantity, category=category, price=1)
+        for quantity in (3, 0)
+    ]
+
+    summary = client.get(
+        "/api/admin/summary", params={"low_stock_limit": 100}, headers=headers
+    ).json()
+    lowest = [row for row in summary["lowest_stock"] if row["category"] == category]
+
+    assert [row["id"] for row in lowest] == ids[::-1]
+    quantities = [row["quantity"] for row in summary["lowest_stock"]]
+    assert quantities == sorted(quantities)
+    assert all(q < summary["low_stock_threshold"] for q in quantities)
+
+
+def test_rebuild_reports_and_repairs_drift():
+    headers = get_admin_headers()
+    category = f"Drift{uuid.uuid4().hex[:8]}"
+    create_sweet(headers, quantity=7, category=category, price=1)
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(InventoryTotals)
+            .where(InventoryTotals.category == category)
+            .values(units=InventoryTotals.units + 5)
+        )
+
+    res = client.post("/api/admin/summary/rebuild", headers=headers)
+    assert res.json() == {
+        "consistent": False,
+        "drift": [{"category": category, "units": {"stored": 12, "actual": 7}}],
+    }
+    assert category_totals(headers, category)["units"] == 7
@@ -0,0 +1,63 @@
+import logging
+import uuid
+
+from fastapi.testclient import TestClient
+
+import app.metrics as metrics
+from app.main import app
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def test_debug_header_reports_query_count(monkeypatch):
+    monkeypatch.setattr(metrics, "DEBUG_QUERY_HEADERS", True)
+
+    res = client.post("/api/auth/register", json={
+        "email": f"metrics_{uuid.uuid4().hex}@example.com",
+        "password": "secret123"
+    })
+
+    # Duplicate check, first-user check and the insert.
+    assert res.headers["x-query-count"] == "3"
+    assert float(res.headers["x-query-time-ms"]) >= 0
+
+
+def test_debug_header_excludes_queries_of_a_streamed_body(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "DEBUG_QUERY_HEADERS", True)
+    headers = get_admin_headers()
+    create_sweet(headers, f"Metrics {uuid.uuid4().hex}", 1)
+
+    # Uncompressed, so the headers go out before the body is read.
+    headers["Accept-Encoding"] = "identity"
+    with caplog.at_level(logging.INFO, logger="app.metrics"):
+        res = client.get("/api/sweets", params={"limit": 5}, headers=headers)
+
+    # The page is read while the body streams, after the headers.
+    logged = [r.args for r in caplog.records if r.args[1] == "/api/sweets"]
+    assert res.status_code == 200
+    assert len(logged) == 1
+    assert logged[0][2] == int(res.headers["x-query-count"]) + 1
+
+
+def test_debug_header_is_off_by_default():
+    res = client.get("/")
+
+    assert "x-query-count" not in res.headers
+
+
+def test_metrics_are_labelled_by_route_template():
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Metrics {uuid.uuid4().hex}", 5)
+    client.post(f"/api/sweets/{sweet_id}/purchase", headers=headers)
+    client.get("/no-such-page")
+
+    body = client.get("/metrics").text
+
+    route = 'method="POST",route="/api/sweets/{sweet_id}/purchase"'
+    assert f'sweetshop_http_request_duration_seconds_bucket{{{route},le="+Inf"}}' in body
+    assert f'sweetshop_http_requests_total{{{route},status="200"}}' in body
+    assert f"sweetshop_db_queries_per_request_count{{{route}}}" in body
+    assert 'route="unmatched",status="404"' in body
+    assert f"sweetshop_http_requests_in_flight{{{route}}} 0" in body
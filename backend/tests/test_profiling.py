@@ -0,0 +1,65 @@
+import pstats
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.profiling as profiling
+from app.main import app
+from tests.test_auth import register_and_login
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "limiter", profiling.ProfileLimiter(2))
+    return tmp_path
+
+
+def test_admin_can_profile_a_request(profile_dir):
+    headers = get_admin_headers()
+
+    res = client.get("/api/sweets/search?name=ladoo&profile=1", headers=headers)
+    assert res.status_code == 200
+    profile_id = res.headers["x-profile-id"]
+
+    listed = client.get("/api/admin/profiles", headers=headers).json()
+    assert listed[0] == {"id": profile_id, "format": "pstats"}
+
+    res = client.get(f"/api/admin/profiles/{profile_id}", headers=headers)
+    path = profile_dir / "downloaded.prof"
+    path.write_bytes(res.content)
+    stats = pstats.Stats(str(path))
+    assert any("search_sweets" in func[2] for func in stats.stats)
+
+
+def test_profiling_is_ignored_for_non_admins(profile_dir):
+    headers = register_and_login(f"user_{uuid.uuid4().hex}@example.com")
+
+    res = client.get("/api/sweets", headers={**headers, "X-Profile": "1"})
+
+    assert res.status_code == 200
+    assert "x-profile-id" not in res.headers
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_profiling_is_rate_limited(profile_dir):
+    headers = {**get_admin_headers(), "X-Profile": "1"}
+
+    ids = [client.get("/api/sweets", headers=headers).headers for _ in range(3)]
+
+    assert "x-profile-id" in ids[0] and "x-profile-id" in ids[1]
+    assert ids[2]["x-profile-skipped"] == "rate-limited"
+    assert len(list(profile_dir.iterdir())) == 2
+
+
+def test_unknown_profile_returns_404():
+    headers = get_admin_headers()
+
+    res = client.get("/api/admin/profiles/../../etc", headers=headers)
+    assert res.status_code == 404
+    res = client.get("/api/admin/profiles/1-deadbeef", headers=headers)
+    assert res.status_code == 404
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models import Sweet
+from app.purchase_journal import JournalEntry, PurchaseJournal, parse_journal
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def stored_quantity(sweet_id):
+    db = SessionLocal()
+    try:
+        return db.get(Sweet, sweet_id).quantity
+    finally:
+        db.close()
+
+
+def test_journaled_purchases_are_applied(journal):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Journal {uuid.uuid4().hex}", 5)
+
+    res = client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 3},
+                      headers=headers)
+    assert res.json() == {"id": sweet_id, "quantity": 2}
+
+    res = client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 3},
+                      headers=headers)
+    assert res.status_code == 409
+
+    asyncio.run(journal.flush())
+    assert stored_quantity(sweet_id) == 2
+    assert [entry[1:] for entry in parse_journal(journal.path)] == [
+        (sweet_id, 3)
+    ]
+
+
+def test_journal_does_not_oversell(journal):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Journal {uuid.uuid4().hex}", 10)
+
+    def buy(_):
+        return client.post(
+            f"/api/sweets/{sweet_id}/purchase", headers=headers
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(buy, range(20)))
+
+    assert codes.count(200) == 10
+    assert codes.count(409) == 10
+
+    asyncio.run(journal.flush())
+    assert stored_quantity(sweet_id) == 0
+
+
+def test_restock_sees_journaled_purchases(journal):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Journal {uuid.uuid4().hex}", 4)
+
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 4},
+                headers=headers)
+    res = client.post(f"/api/sweets/{sweet_id}/restock", json={"amount": 5},
+                      headers=headers)
+    assert res.json()["quantity"] == 5
+
+    res = client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 2},
+                      headers=headers)
+    assert res.json()["quantity"] == 3
+
+
+def test_fenced_purchase_waits_for_the_stock_change(journal):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Journal {uuid.uuid4().hex}", 4)
+    fenced, release = threading.Event(), threading.Event()
+
+    async def hold_fence():
+        async with journal.exclusive(sweet_id):
+            fenced.set()
+            await asyncio.to_thread(release.wait)
+
+    holder = threading.Thread(target=asyncio.run, args=(hold_fence(),))
+    holder.start()
+    fenced.wait()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        purchase = pool.submit(
+            client.post, f"/api/sweets/{sweet_id}/purchase", headers=headers
+        )
+        assert not wait([purchase], timeout=0.2).done
+
+        release.set()
+        holder.join()
+        assert purchase.result(timeout=5).json()["quantity"] == 3
+
+
+def test_recover_replays_unapplied_entries(tmp_path):
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, f"Journal {uuid.uuid4().hex}", 10)
+    path = tmp_path / "purchases.journal"
+
+    # Learn the current checkpoint, then fake a crash after fsync.
+    first = PurchaseJournal(str(path), engine, 0.002, enabled=True)
+    first.recover()
+    seq = first._seq
+    lines = f"{seq + 1} {sweet_id} 2\n{seq + 2} {sweet_id} 3\n"
+    path.write_text(lines + f"{seq + 3} {sweet_id}")
+
+    assert PurchaseJournal(str(path), engine, 0.002, enabled=True).recover() == 2
+    assert stored_quantity(sweet_id) == 5
+    assert path.read_text() == ""
+
+    # Crashing again before the journal was cleared must not re-apply.
+    path.write_text(lines)
+    assert PurchaseJournal(str(path), engine, 0.002, enabled=True).recover() == 0
+    assert stored_quantity(sweet_id) == 5
+
+
+class FailingWrites:
+    """A journal file whose next write stops halfway and fails."""
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.fail = True
+
+    def write(self, data):
+        if self.fail:
+            self.fail = False
+            self.journal.write(data[:len(data) // 2])
+            raise OSError("disk full")
+        return self.journal.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.journal, name)
+
+
+def test_failed_write_does_not_tear_later_entries(tmp_path):
+    path = tmp_path / "purchases.journal"
+    journal = PurchaseJournal(str(path), engine, 0.002, enabled=False)
+
+    with open(path, "ab", buffering=0) as raw:
+        failing = FailingWrites(raw)
+        rejected = [JournalEntry(1, 7, 2), JournalEntry(2, 7, 3)]
+        assert not journal._write(failing, rejected)
+        assert isinstance(rejected[0].durable.exception(), OSError)
+
+        assert journal._write(failing, [JournalEntry(3, 8, 1)])
+
+    assert parse_journal(str(path)) == [(3, 8, 1)]
+
+
+def test_parse_journal_skips_malformed_lines(tmp_path):
+    path = tmp_path / "purchases.journal"
+    path.write_bytes(b"1 7 2\n2 7\n3 8 x\n4 8 1\n5 9")
+
+    assert parse_journal(str(path)) == [(1, 7, 2), (4, 8, 1)]
@@ -0,0 +1,99 @@
+import itertools
+
+import pytest
+from sqlalchemy import literal_column, select
+
+from app import search
+from app.database import engine
+from app.main import app  # noqa: F401  (creates tables, indexes and FTS)
+from app.inventory import build_low_stock_query
+from app.models import LOW_STOCK_THRESHOLD, Sweet
+from app.sweets import build_search_query
+
+SEARCH_FILTERS = {
+    "name": "ladoo",
+    "category_ids": [1, 2],
+    "min_price": 5.0,
+    "max_price": 50.0,
+    "in_stock": True,
+}
+
+SEARCH_SORTS = [None, "price", "-price", "quantity", "-quantity"]
+
+# Every combination of search filters and sort, except those without
+# a selective filter (none, or only `in_stock`, which most sweets pass):
+# they return (nearly) the whole table and are checked separately.
+SEARCH_SHAPES = [
+    {**dict(combo), "sort": sort}
+    for size in range(1, len(SEARCH_FILTERS) + 1)
+    for combo in itertools.combinations(SEARCH_FILTERS.items(), size)
+    if [name for name, _ in combo] != ["in_stock"]
+    for sort in SEARCH_SORTS
+]
+
+
+def explain(query):
+    compiled = query.compile(
+        dialect=engine.dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return [row[-1] for row in rows]
+
+
+def full_table_scans(plan):
+    # "SCAN sweets_fts VIRTUAL TABLE ..." is an FTS index lookup, not a scan.
+    return [
+        step for step in plan
+        if step.startswith("SCAN") and "VIRTUAL TABLE" not in step
+    ]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    SEARCH_SHAPES,
+    ids=lambda f: "+".join(k for k in f if k != "sort") + f":{f['sort']}",
+)
+def test_search_query_shapes_use_indexes(filters):
+    assert search.fts_enabled
+
+    plan = explain(build_search_query(**filters))
+
+    assert full_table_scans(plan) == [], plan
+
+
+def test_in_stock_search_uses_quantity_index():
+    plan = explain(build_search_query(in_stock=True))
+
+    assert full_table_scans(plan) == [], plan
+    assert any("ix_sweets_quantity" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("in_stock", [False, True])
+@pytest.mark.parametrize("sort", SEARCH_SORTS[1:])
+def test_unfiltered_sorts_walk_an_index_in_order(sort, in_stock):
+    # These return (nearly) every sweet, so walking the whole sort
+    # index is expected; sorting the table in a temp B-tree is not.
+    plan = explain(build_search_query(in_stock=in_stock, sort=sort))
+
+    index = f"ix_sweets_{sort.removeprefix('-')}"
+    assert any(index in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_low_stock_query_uses_partial_index():
+    plan = explain(
+        select(Sweet).where(
+            Sweet.quantity < literal_column(str(LOW_STOCK_THRESHOLD))
+        )
+    )
+
+    assert any("ix_sweets_low_stock" in step for step in plan), plan
+
+
+def test_lowest_stock_query_uses_partial_index():
+    plan = explain(build_low_stock_query(10))
+
+    assert any("ix_sweets_low_stock" in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
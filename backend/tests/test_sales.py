@@ -0,0 +1,165 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.sweets as sweets_module
+from app.database import SessionLocal, engine
+from app.hot_stock import HotStockEngine
+from app.main import app
+from app.models import Sale, SalesRollup
+from app.sales import SaleLine, bucket_start, record_sales
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def create_priced_sweet(headers, category, price, quantity=100):
+    res = client.post(
+        "/api/sweets",
+        json={
+            "name": f"Sale {uuid.uuid4().hex[:8]}",
+            "category": category,
+            "price": price,
+            "quantity": quantity,
+        },
+        headers=headers,
+    )
+    return res.json()["id"]
+
+
+def sales_of(sweet_id):
+    db = SessionLocal()
+    try:
+        return db.scalars(select(Sale).where(Sale.sweet_id == sweet_id)).all()
+    finally:
+        db.close()
+
+
+def test_bucket_start_truncates_to_granularity():
+    moment = datetime(2024, 5, 17, 13, 42, 7, 123)
+
+    assert bucket_start(moment, "minute") == datetime(2024, 5, 17, 13, 42)
+    assert bucket_start(moment, "hour") == datetime(2024, 5, 17, 13)
+    assert bucket_start(moment, "day") == datetime(2024, 5, 17)
+
+
+def test_record_sales_adds_to_existing_buckets():
+    headers = get_admin_headers()
+    category = f"Roll{uuid.uuid4().hex[:8]}"
+    first = create_priced_sweet(headers, category, 2.5)
+    second = create_priced_sweet(headers, category, 4.0)
+    moment = datetime(2024, 5, 17, 13, 42, 7)
+
+    with engine.begin() as conn:
+        record_sales(conn, [SaleLine(first, 2, moment)])
+    with engine.begin() as conn:
+        record_sales(conn, [
+            SaleLine(first, 1, moment.replace(minute=50)),
+            SaleLine(second, 3, moment),
+        ])
+
+    db = SessionLocal()
+    try:
+        rollups = {
+            (row.granularity, row.bucket_start): (row.sales, row.units, row.revenue)
+            for row in db.scalars(
+                select(SalesRollup).where(
+                    SalesRollup.dimension == "category",
+                    SalesRollup.key == category,
+                )
+            )
+        }
+    finally:
+        db.close()
+
+    assert rollups == {
+        ("minute", datetime(2024, 5, 17, 13, 42)): (2, 5, 17.0),
+        ("minute", datetime(2024, 5, 17, 13, 50)): (1, 1, 2.5),
+        ("hour", datetime(2024, 5, 17, 13)): (3, 6, 19.5),
+        ("day", datetime(2024, 5, 17)): (3, 6, 19.5),
+    }
+
+
+def test_purchases_and_checkouts_are_recorded_and_reported():
+    headers = get_admin_headers()
+    category = f"Report{uuid.uuid4().hex[:8]}"
+    cheap = create_priced_sweet(headers, category, 1.5)
+    dear = create_priced_sweet(headers, category, 10)
+
+    client.post(f"/api/sweets/{cheap}/purchase", json={"amount": 2},
+                headers=headers)
+    client.post(
+        "/api/sweets/checkout",
+        json={"items": [
+            {"sweet_id": cheap, "amount": 1},
+            {"sweet_id": dear, "amount": 3},
+        ]},
+        headers=headers,
+    )
+
+    assert [(s.units, s.unit_price, s.category) for s in sales_of(cheap)] == [
+        (2, 1.5, category), (1, 1.5, category),
+    ]
+
+    res = client.get(
+        "/api/admin/sales",
+        params={"by": "category", "granularity": "minute", "key": category},
+        headers=headers,
+    )
+    assert res.status_code == 200
+    buckets = res.json()["buckets"]
+    assert sum(b["units"] for b in buckets) == 6
+    assert sum(b["revenue"] for b in buckets) == 34.5
+
+    res = client.get(
+        "/api/admin/sales/top",
+        params={"by": "sweet", "granularity": "day", "limit": 100},
+        headers=headers,
+    )
+    top = {row["key"]: row["units"] for row in res.json()}
+    assert top[cheap] == 3 and top[dear] == 3
+
+
+def test_sales_reports_are_admin_only():
+    client.post("/api/auth/register",
+                json={"email": "salesuser@test.com", "password": "secret"})
+    token = client.post(
+        "/api/auth/login",
+        json={"email": "salesuser@test.com", "password": "secret"},
+    ).json()["access_token"]
+
+    res = client.get("/api/admin/sales",
+                     headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 403
+
+
+def test_journaled_purchases_are_recorded_when_applied(journal):
+    headers = get_admin_headers()
+    sweet_id = create_priced_sweet(headers, "Journaled", 3)
+
+    for _ in range(3):
+        client.post(f"/api/sweets/{sweet_id}/purchase", headers=headers)
+    asyncio.run(journal.flush())
+
+    assert [sale.units for sale in sales_of(sweet_id)] == [1, 1, 1]
+
+
+def test_hot_purchases_are_recorded_when_reconciled(monkeypatch):
+    hot_stock = HotStockEngine(engine, set(), shards=2, interval=0.002)
+    monkeypatch.setattr(sweets_module, "hot_stock", hot_stock)
+    headers = get_admin_headers()
+    sweet_id = create_priced_sweet(headers, "Hot", 3)
+    hot_stock.hot_ids.add(sweet_id)
+
+    try:
+        client.post(f"/api/sweets/{sweet_id}/purchase", json={"amount": 2},
+                    headers=headers)
+        client.post(f"/api/sweets/{sweet_id}/restock", json={"amount": 5},
+                    headers=headers)
+    finally:
+        hot_stock.shutdown()
+
+    assert [sale.units for sale in sales_of(sweet_id)] == [2]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.stock_events import RESET, StockHub, stock_hub, stream_events
+from tests.conftest import create_sweet
+from tests.test_sweets import get_admin_headers
+
+client = TestClient(app)
+
+
+def test_hub_fans_out_to_every_subscriber():
+    async def scenario():
+        hub = StockHub(queue_size=4)
+        first, second = hub.subscribe(), hub.subscribe()
+
+        hub.publish([{"id": 1, "quantity": 3}])
+
+        assert first.queue.get_nowait() == [{"id": 1, "quantity": 3}]
+        assert second.queue.get_nowait() == [{"id": 1, "quantity": 3}]
+
+    asyncio.run(scenario())
+
+
+def test_hub_drops_slow_consumers():
+    async def scenario():
+        hub = StockHub(queue_size=2)
+        slow = hub.subscribe()
+
+        for quantity in range(3):
+            hub.publish([{"id": 1, "quantity": quantity}])
+
+        assert slow.dropped
+        assert len(hub) == 0
+        assert slow.queue.get_nowait() is RESET
+        assert slow.queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_purchase_is_pushed_to_subscribers():
+    headers = get_admin_headers()
+    sweet_id = create_sweet(headers, "Streamed Ladoo", 5)
+
+    async def scenario():
+        subscriber = stock_hub.subscribe()
+        events = stream_events(subscriber)
+
+        assert await anext(events) == "retry: 3000\n\n"
+
+        # The purchase runs on the test client's own event loop.
+        await asyncio.to_thread(
+            client.post, f"/api/sweets/{sweet_id}/purchase", headers=headers
+        )
+
+        event = await asyncio.wait_for(anext(events), 5)
+        await events.aclose()
+        return event
+
+    event = asyncio.run(scenario())
+
+    name, data = event.strip().split("\n")
+    assert name == "event: stock"
+    assert json.loads(data.removeprefix("data: ")) == [
+        {"id": sweet_id, "quantity": 4}
+    ]
+    assert len(stock_hub) == 0
+
+
+def test_stream_requires_token():
+    res = client.get("/api/sweets/stream")
+
+    assert res.status_code == 422
+
+
+def test_stream_rejects_invalid_token():
+    res = client.get("/api/sweets/stream?access_token=nope")
+
+    assert res.status_code == 401
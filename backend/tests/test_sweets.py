@@ -209,10 +209,12 @@
 #     assert len(res.json()) >= 1
 
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
 from app.main import app
 from app.database import SessionLocal
-from app.models import User
+from app.models import Sweet, User
+from tests.conftest import create_sweet
 
 client = TestClient(app)
 
@@ -246,6 +248,26 @@ def get_admin_headers():
     return {"Authorization": f"Bearer {token}"}
 
 
+# ---------------------------
+# Helper: walk every catalog page
+# ---------------------------
+def list_all_sweets(headers):
+    sweets = []
+    cursor = None
+
+    while True:
+        params = {"limit": 1000}
+        if cursor:
+            params["cursor"] = cursor
+
+        body = client.get("/api/sweets", params=params, headers=headers).json()
+        sweets.extend(body["items"])
+
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return sweets
+
+
 # ---------------------------
 # SWEETS TESTS
 # ---------------------------
@@ -270,13 +292,107 @@ def test_add_sweet_success():
     assert body["name"] == "Ladoo"
 
 
+def test_sweet_responses_match_schemas():
+    headers = get_admin_headers()
+    created = client.post(
+        "/api/sweets",
+        json={"name": "Peda", "category": "Indian", "price": 8, "quantity": 5},
+        headers=headers,
+    ).json()
+
+    assert created == {
+        "id": created["id"],
+        "name": "Peda",
+        "category": "Indian",
+        "price": 8.0,
+        "quantity": 5,
+    }
+
+    res = client.get("/api/sweets", params={"limit": 1}, headers=headers)
+    assert res.headers["content-type"] == "application/json"
+    assert set(res.json()["items"][0]) == set(created)
+
+    schema = client.get("/openapi.json").json()["components"]["schemas"]
+    assert "SweetOut" in schema and "SweetList" in schema
+
+
 def test_list_sweets():
     headers = get_admin_headers()
 
     res = client.get("/api/sweets", headers=headers)
 
     assert res.status_code == 200
-    assert isinstance(res.json(), list)
+    body = res.json()
+    assert isinstance(body["items"], list)
+    assert "next_cursor" in body
+
+
+def test_list_sweets_cursor_pagination():
+    headers = get_admin_headers()
+
+    for i in range(3):
+        client.post(
+            "/api/sweets",
+            json={
+                "name": f"Page Sweet {i}",
+                "category": "Indian",
+                "price": 5.0,
+                "quantity": 10
+            },
+            headers=headers
+        )
+
+    first = client.get("/api/sweets?limit=2", headers=headers).json()
+    assert len(first["items"]) == 2
+    assert first["next_cursor"] is not None
+
+    second = client.get(
+        f"/api/sweets?limit=2&cursor={first['next_cursor']}",
+        headers=headers
+    ).json()
+
+    first_ids = [s["id"] for s in first["items"]]
+    second_ids = [s["id"] for s in second["items"]]
+    assert first_ids == sorted(first_ids)
+    assert min(second_ids) > max(first_ids)
+
+
+def test_list_sweets_invalid_cursor():
+    headers = get_admin_headers()
+
+    res = client.get("/api/sweets?cursor=not-a-cursor", headers=headers)
+
+    assert res.status_code == 400
+
+
+def test_list_sweets_field_projection():
+    headers = get_admin_headers()
+
+    client.post(
+        "/api/sweets",
+        json={
+            "name": "Soan Papdi",
+            "category": "Indian",
+            "price": 9.0,
+            "quantity": 12
+        },
+        headers=headers
+    )
+
+    res = client.get("/api/sweets?fields=name,quantity", headers=headers)
+
+    assert res.status_code == 200
+    for sweet in res.json()["items"]:
+        assert set(sweet) == {"id", "name", "quantity"}
+
+    res = client.get("/api/sweets?fields=name,secret", headers=headers)
+    assert res.status_code == 400
+
+    # Projected items are documented with only `id` required.
+    schema = client.get("/openapi.json").json()["components"]["schemas"]
+    items = schema["SweetList"]["properties"]["items"]["items"]
+    assert items["$ref"].endswith("/SweetFields")
+    assert schema["SweetFields"]["required"] == ["id"]
 
 
 def test_search_sweets_by_name():
@@ -365,8 +481,7 @@ def test_delete_sweet_success():
     assert delete_res.json()["detail"] == "Sweet deleted"
 
     # verify deletion
-    list_res = client.get("/api/sweets", headers=headers)
-    sweets = list_res.json()
+    sweets = list_all_sweets(headers)
     assert all(s["id"] != sweet_id for s in sweets)
 
 
@@ -421,3 +536,204 @@ def test_restock_sweet_success():
     assert restock_res.status_code == 200
     body = restock_res.json()
     assert body["quantity"] == 8
+
+
+def test_purchase_sweet_not_enough_stock():
+    headers = get_admin_headers()
+
+    res = client.post(
+        "/api/sweets",
+        json={
+            "name": "Kalakand",
+            "category": "Indian",
+            "price": 14.0,
+            "quantity": 2
+        },
+        headers=headers
+    )
+    sweet_id = res.json()["id"]
+
+    purchase_res = client.post(
+        f"/api/sweets/{sweet_id}/purchase",
+        json={"amount": 3},
+        headers=headers
+    )
+
+    assert purchase_res.status_code == 409
+    assert purchase_res.json()["detail"] == "Not enough stock"
+
+
+def test_purchase_missing_sweet_returns_404():
+    headers = get_admin_headers()
+
+    res = client.post("/api/sweets/999999999/purchase", headers=headers)
+
+    assert res.status_code == 404
+
+
+def test_concurrent_purchases_never_oversell():
+    headers = get_admin_headers()
+    stock = 20
+    attempts = 60
+
+    res = client.post(
+        "/api/sweets",
+        json={
+            "name": "Flash Sale Ladoo",
+            "category": "Indian",
+            "price": 5.0,
+            "quantity": stock
+        },
+        headers=headers
+    )
+    sweet_id = res.json()["id"]
+
+    def buy(_):
+        return client.post(
+            f"/api/sweets/{sweet_id}/purchase",
+            headers=headers
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        codes = list(pool.map(buy, range(attempts)))
+
+    assert codes.count(200) == stock
+    assert codes.count(409) == attempts - stock
+
+    db = SessionLocal()
+    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    db.close()
+    assert sweet.quantity == 0
+
+
+def test_checkout_cart_success():
+    headers = get_admin_headers()
+    ladoo_id = create_sweet(headers, "Checkout Ladoo", 10)
+    barfi_id = create_sweet(headers, "Checkout Barfi", 5)
+
+    res = client.post(
+        "/api/sweets/checkout",
+        json={"items": [
+            {"sweet_id": ladoo_id, "amount": 3},
+            {"sweet_id": barfi_id, "amount": 5},
+            {"sweet_id": ladoo_id, "amount": 1}
+        ]},
+        headers=headers
+    )
+
+    assert res.status_code == 200
+    assert res.json()["items"] == [
+        {"id": ladoo_id, "quantity": 6},
+        {"id": barfi_id, "quantity": 0}
+    ]
+
+
+def test_checkout_is_all_or_nothing():
+    headers = get_admin_headers()
+    ladoo_id = create_sweet(headers, "Atomic Ladoo", 10)
+    barfi_id = create_sweet(headers, "Atomic Barfi", 1)
+
+    res = client.post(
+        "/api/sweets/checkout",
+        json={"items": [
+            {"sweet_id": ladoo_id, "amount": 4},
+            {"sweet_id": barfi_id, "amount": 2}
+        ]},
+        headers=headers
+    )
+
+    assert res.status_code == 409
+
+    db = SessionLocal()
+    quantities = dict(
+        db.query(Sweet.id, Sweet.quantity)
+        .filter(Sweet.id.in_([ladoo_id, barfi_id]))
+        .all()
+    )
+    db.close()
+    assert quantities == {ladoo_id: 10, barfi_id: 1}
+
+    res = client.post(
+        "/api/sweets/checkout",
+        json={"items": [
+            {"sweet_id": ladoo_id, "amount": 1},
+            {"sweet_id": 999999999, "amount": 1}
+        ]},
+        headers=headers
+    )
+    assert res.status_code == 404
+
+
+def test_search_matches_word_prefixes_ranked():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+
+    create_sweet(headers, f"Motichoor{tag} Ladoo", 10)
+    create_sweet(headers, f"Besan Ladoo Motichoor{tag}", 10)
+
+    res = client.get(
+        f"/api/sweets/search?name=motichoor{tag[:4]} lad",
+        headers=headers
+    )
+
+    assert res.status_code == 200
+    names = [s["name"] for s in res.json()]
+    assert sorted(names) == sorted([
+        f"Motichoor{tag} Ladoo",
+        f"Besan Ladoo Motichoor{tag}",
+    ])
+
+
+def test_search_combines_text_and_price_filters():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+
+    cheap_id = create_sweet(headers, f"Gulab{tag} Jamun", 10)
+    client.put(
+        f"/api/sweets/{cheap_id}",
+        json={
+            "name": f"Gulab{tag} Jamun",
+            "category": "Indian",
+            "price": 5.0,
+            "quantity": 10
+        },
+        headers=headers
+    )
+    create_sweet(headers, f"Gulab{tag} Royale", 10)
+
+    res = client.get(
+        f"/api/sweets/search?name=gulab{tag}&max_price=6",
+        headers=headers
+    )
+
+    assert [s["id"] for s in res.json()] == [cheap_id]
+
+
+def test_search_index_follows_updates_and_deletes():
+    headers = get_admin_headers()
+    tag = uuid.uuid4().hex[:8]
+
+    sweet_id = create_sweet(headers, f"Rabri{tag}", 10)
+    client.put(
+        f"/api/sweets/{sweet_id}",
+        json={
+            "name": f"Kulfi{tag}",
+            "category": "Frozen",
+            "price": 10.0,
+            "quantity": 10
+        },
+        headers=headers
+    )
+
+    old = client.get(f"/api/sweets/search?name=rabri{tag}", headers=headers)
+    new = client.get(
+        f"/api/sweets/search?name=kulfi{tag}&category=froz",
+        headers=headers
+    )
+    assert old.json() == []
+    assert [s["id"] for s in new.json()] == [sweet_id]
+
+    client.delete(f"/api/sweets/{sweet_id}", headers=headers)
+
+    res = client.get(f"/api/sweets/search?name=kulfi{tag}", headers=headers)
+    assert res.json() == []
@@ -23,7 +23,7 @@ import {
 } from "@mui/material";
 
 import "./App.css";
-import { apiRequest, setToken } from "./api";
+import { apiRequest, openStockStream, setToken } from "./api";
 import ShoppingCartIcon from "@mui/icons-material/ShoppingCart";
 
 const CATEGORIES = [
@@ -81,6 +81,11 @@ function App() {
   const [editCategory, setEditCategory] = useState("General");
   const [restockAmounts, setRestockAmounts] = useState({});
 
+  // ------------------------------------------------------------------
+  // Inventory summary (admin)
+  // ------------------------------------------------------------------
+  const [summary, setSummary] = useState(null);
+
   // ------------------------------------------------------------------
   // Search & filters
   // ------------------------------------------------------------------
@@ -118,7 +123,22 @@ function App() {
 
   useEffect(() => {
     setPage(1);
-  }, [sweets]);
+  }, [sweets.length]);
+
+  // ---------- LIVE STOCK UPDATES ----------
+  useEffect(() => {
+    if (!loggedIn) return;
+
+    return openStockStream(applyStockDeltas, loadSweets);
+  }, [loggedIn]);
+
+  // ---------- INVENTORY SUMMARY ----------
+  // Computed by the backend; refreshed whenever the catalog changes.
+  useEffect(() => {
+    if (!loggedIn || !isAdmin) return;
+
+    loadSummary();
+  }, [loggedIn, isAdmin, sweets]);
 
 
   // ---------- API ----------
@@ -175,8 +195,24 @@ function App() {
   }
 
   async function loadSweets() {
-    const data = await apiRequest("/api/sweets");
-    setSweets(data);
+    // The catalog is served in cursor-based pages; follow them all.
+    const all = [];
+    let cursor = null;
+
+    do {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const page = await apiRequest(`/api/sweets${query}`);
+      if (!page) return;
+      all.push(...page.items);
+      cursor = page.next_cursor;
+    } while (cursor);
+
+    setSweets(all);
+  }
+
+  async function loadSummary() {
+    const data = await apiRequest("/api/admin/summary?low_stock_limit=5");
+    if (data) setSummary(data);
   }
 
   async function searchSweets() {
@@ -209,9 +245,23 @@ function App() {
     loadSweets();
   }
 
+  function applyStockDeltas(deltas) {
+    const changes = new Map(deltas.map((d) => [d.id, d]));
+
+    setSweets((prev) =>
+      prev
+        .filter((s) => !changes.get(s.id)?.deleted)
+        .map((s) =>
+          changes.has(s.id)
+            ? { ...s, quantity: changes.get(s.id).quantity }
+            : s
+        )
+    );
+  }
+
   async function purchaseSweet(id) {
+    // The new quantity arrives through the live stock stream.
     await apiRequest(`/api/sweets/${id}/purchase`, { method: "POST" });
-    loadSweets();
   }
 
   async function deleteSweet(id) {
@@ -249,7 +299,6 @@ function App() {
     });
 
     setRestockAmounts((prev) => ({ ...prev, [id]: "" }));
-    loadSweets();
   }
 
 
@@ -287,6 +336,22 @@ function App() {
     setCartQuantities((prev) => ({ ...prev, [sweet.id]: 1 }));
   }
 
+  async function checkoutCart() {
+    // One request for the whole cart; the backend applies it atomically.
+    const data = await apiRequest("/api/sweets/checkout", {
+      method: "POST",
+      body: JSON.stringify({
+        items: cart.map((item) => ({ sweet_id: item.id, amount: item.qty })),
+      }),
+    });
+
+    if (data && data.items) {
+      clearCart();
+    } else {
+      alert(data?.detail || "Checkout failed");
+    }
+  }
+
   function clearCart() {
     setCart([]);               // empty cart
     setCartQuantities({});     // reset all qty selectors
@@ -483,6 +548,39 @@ function App() {
           </Stack>
         </Card>
 
+        {/* ================= INVENTORY SUMMARY (ADMIN) ================= */}
+        {isAdmin && summary && (
+          <Card sx={{ p: 3, mb: 4 }}>
+            <Typography fontWeight="bold" mb={2}>
+              Inventory Summary
+            </Typography>
+
+            <Stack direction="row" spacing={1} flexWrap="wrap" useFlexGap>
+              <Chip label={`${summary.total_skus} sweets`} />
+              <Chip label={`${summary.total_units} units`} />
+              <Chip label={`Stock value ₹${summary.total_stock_value.toFixed(2)}`} />
+              <Chip
+                label={`${summary.low_stock_count} low on stock`}
+                color={summary.low_stock_count ? "warning" : "default"}
+              />
+            </Stack>
+
+            {summary.lowest_stock.length > 0 && (
+              <>
+                <Divider sx={{ my: 2 }} />
+                <Typography variant="body2" mb={1}>
+                  Lowest stock
+                </Typography>
+                {summary.lowest_stock.map((s) => (
+                  <Typography variant="body2" key={s.id}>
+                    {s.name} ({s.category}): {s.quantity} left
+                  </Typography>
+                ))}
+              </>
+            )}
+          </Card>
+        )}
+
         {/* ================= ADD SWEET (ADMIN) ================= */}
         {isAdmin && (
           <Card sx={{ p: 3, mb: 4 }}>
@@ -811,6 +909,16 @@ function App() {
                   )}
                 </Typography>
 
+                <Button
+                  fullWidth
+                  sx={{ mt: 2 }}
+                  variant="contained"
+                  color="success"
+                  onClick={checkoutCart}
+                >
+                  Checkout
+                </Button>
+
                 {/* ✅ CLEAR CART BUTTON */}
                 <Button
                   fullWidth
@@ -5,6 +5,7 @@
  * - Store and retrieve authentication token
  * - Attach auth headers automatically
  * - Handle unauthorized (401) responses gracefully
+ * - Subscribe to live stock updates
  *
  * This keeps network logic out of UI components
  * and follows separation of concerns.
@@ -60,3 +61,29 @@ export async function apiRequest(path, options = {}) {
 
   return response.json();
 }
+
+// -------------------------------------------------------------------
+// Live stock updates (Server-Sent Events)
+// -------------------------------------------------------------------
+/**
+ * Subscribe to stock changes pushed by the backend.
+ *
+ * `onDeltas` receives a list of `{id, quantity}` (or `{id, deleted}`)
+ * changes. `onReset` is called when the server asks the client to
+ * refetch the catalog. Returns a function that closes the stream.
+ *
+ * EventSource cannot send headers, so the token goes in the query.
+ */
+export function openStockStream(onDeltas, onReset) {
+  const token = getToken();
+  const source = new EventSource(
+    `${API_URL}/api/sweets/stream?access_token=${encodeURIComponent(token)}`
+  );
+
+  source.addEventListener("stock", (event) => {
+    onDeltas(JSON.parse(event.data));
+  });
+  source.addEventListener("reset", () => onReset());
+
+  return () => source.close();
+}